@@ -1,10 +1,12 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 import sys
 import os
+import json
 
-from src import create_rag_system, LocationService
+from src import create_rag_system, get_location_service
+from src.chat_pipeline import DEFAULT_HYDE_TIMEOUT, ChatPipeline
 
 app = Flask(__name__)
 CORS(app)  # Pozwala na połączenie z plikiem HTML otwieranym lokalnie
@@ -13,6 +15,7 @@ CORS(app)  # Pozwala na połączenie z plikiem HTML otwieranym lokalnie
 rag_chain = None
 search_and_rank = None
 location_service = None
+chat_pipeline = None
 
 # Inicjalizacja systemu w przestrzeni globalnej
 load_dotenv()
@@ -21,9 +24,31 @@ try:
     # Ścieżka domyślna z Twojego run_pipeline.py
     embedding_file = "output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl"
     
-    location_service = LocationService()
+    # Jedna instancja spaCy na proces – współdzielona z rag_chain
+    location_service = get_location_service()
+    # Flask obsługuje żądania w wątkach – mikro-batching łączy ich wywołania modeli
+    # (MICRO_BATCHING=0 wyłącza, MAX_BATCH_WAIT_MS ustala okno zbierania paczki)
     rag_chain, search_and_rank, _ = create_rag_system(
-        embeddings_file=embedding_file
+        embeddings_file=embedding_file,
+        location_service=location_service,
+        # Indeks wektorowy: "flat" (dokładny, domyślny), "hnsw", "ivfpq" lub "sq8"
+        index_backend=os.environ.get("INDEX_BACKEND", "flat"),
+        micro_batching=os.environ.get("MICRO_BATCHING", "1") != "0",
+        max_batch_wait_ms=float(os.environ.get("MAX_BATCH_WAIT_MS", 5.0)),
+        # Backend CPU modeli: "torch" (domyślny), "torch-int8" lub "onnx-int8"
+        inference_backend=os.environ.get("INFERENCE_BACKEND", "torch"),
+        # Proste zapytania ("pizza na Widzewie") analizowane regułami, bez LLM (INTENT_FAST_PATH=0 wyłącza)
+        intent_fast_path=os.environ.get("INTENT_FAST_PATH", "1") != "0",
+        # Podobne zapytania z tymi samymi filtrami dostają gotową listę wyników (SEMANTIC_CACHE=0 wyłącza)
+        semantic_cache=os.environ.get("SEMANTIC_CACHE", "1") != "0"
+    )
+    # Etapy żądania /chat (analiza LLM, HyDE, spaCy, geokodowanie, wyszukiwanie) równolegle
+    # (SPECULATIVE_SEARCH=0 wyłącza spekulatywne wyszukiwanie na surowym zapytaniu)
+    chat_pipeline = ChatPipeline(
+        rag_chain, location_service,
+        speculative_search=os.environ.get("SPECULATIVE_SEARCH", "1") != "0",
+        # Po tylu sekundach wyniki dla surowego zapytania zastępują spóźniony opis HyDE
+        hyde_timeout=float(os.environ.get("HYDE_TIMEOUT_S", DEFAULT_HYDE_TIMEOUT))
     )
     print("--- System gotowy do pracy ---")
 except Exception as e:
@@ -34,100 +59,30 @@ def index():
     """Serwowanie pliku HTML przy wejściu na stronę główną"""
     return send_file('chat_ui.html')
 
+def parse_chat_request(data):
+    """Zwraca (wiadomość, poziom ceny, promień w km) z JSON-a żądania czatu."""
+    user_input = data.get('message', '')
+    price_level = data.get('price_level', 0)  # 0=Dowolna, 1=Tanie, 2=Średnie, 3=Drogie
+    # Opcjonalny promień wyszukiwania (km) od wykrytej lokalizacji użytkownika
+    try:
+        max_distance_km = float(data['max_distance_km']) if data.get('max_distance_km') else None
+    except (TypeError, ValueError):
+        max_distance_km = None
+    if max_distance_km is not None and max_distance_km <= 0:
+        max_distance_km = None
+    return user_input, price_level, max_distance_km
+
 @app.route('/chat', methods=['POST'])
 def chat():
     """Endpoint odbierający wiadomości z frontend'u"""
-    data = request.json
-    user_input = data.get('message', '')
-    price_level = data.get('price_level', 0)  # 0=Dowolna, 1=Tanie, 2=Średnie, 3=Drogie
+    user_input, price_level, max_distance_km = parse_chat_request(request.json)
 
     if not user_input:
         return jsonify({"response": "Proszę wpisać wiadomość."})
 
-    # --- LOGIKA Z RUN_PIPELINE.PY ---
-    
-    # 1. Analiza intencji (LLM)
-    try:
-        analysis = rag_chain.analyze_user_intent(user_input)
-    except Exception as e:
-        print(f"Wyjątek podczas analizy LLM: {e}")
-        analysis = None
-
-    # NEW: Obsługa bezpośredniej odpowiedzi (chit-chat)
-    if analysis and analysis.get("direct_response"):
-        # Aktualizacja historii konwersacji dla spójności
-        rag_chain.conversation_history.append({"role": "user", "content": user_input})
-        rag_chain.conversation_history.append({"role": "assistant", "content": analysis["direct_response"]})
-        return jsonify({"response": analysis["direct_response"]})
-
-    if not analysis:
-        # Fallback: Jeśli LLM nie działa (np. błąd 503), kontynuujemy bez analizy
-        print("Błąd analizy LLM - używam trybu awaryjnego (surowe zapytanie + spaCy)")
-        analysis = {}
-
-    # Sprawdzenie intencji (czy to luźna rozmowa?)
-    is_chitchat = analysis.get("intent") == "chitchat"
-
-    # 2. Wykrywanie lokalizacji (uproszczone bez input() fallback)
-    user_location = None
-    
-    # Wykrywamy lokalizację TYLKO jeśli to nie jest chitchat
-    if not is_chitchat:
-        detected_location_llm = analysis.get("location")
-        if detected_location_llm:
-            user_location = location_service.geocode(detected_location_llm)
-            if not user_location:
-                spacy_from_llm = location_service.extract_location_name(detected_location_llm)
-                if spacy_from_llm:
-                    user_location = location_service.geocode(spacy_from_llm)
-        
-        # Fallback: spaCy bezpośrednio na zapytaniu
-        if not user_location:
-            spacy_direct = location_service.extract_location_name(user_input)
-            if spacy_direct:
-                user_location = location_service.geocode(spacy_direct)
-
-    # WAŻNE: Przekazanie wykrytej lokalizacji do systemu RAG
-    if user_location:
-        rag_chain.set_user_location(user_location)
-    else:
-        # Resetujemy lokalizację, aby nie używać tej z poprzedniego zapytania (bo rag_chain jest globalny)
-        rag_chain.set_user_location(None)
-
-    # 3. Parametry wyszukiwania
-    expanded_query = analysis.get("search_query") or user_input
-    cuisine_type = analysis.get("cuisine")
-    
-    # Obsługa suwaka cenowego (nadpisuje LLM)
-    price_map = {1: "0-40", 2: "40-80", 3: "80-1000"}
-    if price_level in price_map:
-        price_preference = price_map[price_level]
-        print(f"INFO: Wymuszam cenę z suwaka: {price_preference}")
-    else:
-        # Jeśli suwak na 0 (Dowolna), bierzemy to co wykrył LLM (lub None)
-        price_preference = analysis.get("price")
-
-    # 4. Ustalenie zapytania dla wyszukiwarki (HyDE)
-    # Jeśli analiza zwróciła search_query, używamy go. Jeśli zwróciła null (None),
-    # przekazujemy pusty string, aby ConversationalRAG wiedział, że ma NIE szukać (tryb chat).
-    # Jeśli analysis było puste (błąd), przekazujemy None, aby ConversationalRAG sam spróbował wygenerować.
-    search_query_override = None
-    if is_chitchat:
-        search_query_override = ""
-
+    # Analiza intencji, lokalizacja i wyszukiwanie – etapy niezależne liczone równolegle
     try:
-        # Wymuszenie formatu odpowiedzi (tylko lista, bez konwersacji)
-        final_input = user_input
-        if search_query_override != "":
-            final_input += " . Odpowiedz WYŁĄCZNIE listą znalezionych miejsc. Format: 1. **Nazwa** \n  Adres: [Adres] ([Odległość]) \n  Typ kuchni: [Max 3 typy po przecinku] \n  Ocena: [Ocena] \n  [Opis]. Nie dodawaj wstępu ani zakończenia."
-
-        response_text = rag_chain.generate_response(
-            final_input,
-            k=5,
-            price_preference=price_preference,
-            cuisine_filter=cuisine_type,
-            search_query_override=search_query_override
-        )
+        response_text = chat_pipeline.handle(user_input, price_level=price_level, max_distance_km=max_distance_km)
     except Exception as e:
         print(f"Błąd generowania odpowiedzi: {e}")
         return jsonify({"response": "Przepraszam, wystąpił błąd systemu."})
@@ -136,6 +91,46 @@ def chat():
     response_html = response_text.replace("\n", "<br>")
     return jsonify({"response": response_html})
 
+def sse_event(event_type, html=""):
+    """Jedno zdarzenie Server-Sent Events z fragmentem HTML odpowiedzi."""
+    return f"event: {event_type}\ndata: {json.dumps({'html': html}, ensure_ascii=False)}\n\n"
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Strumieniowa wersja /chat (Server-Sent Events): każda karta lokalu jest wysyłana zaraz
+    po rankingu, a odpowiedź LLM token po tokenie. Zdarzenia: message, card, token, done.
+    """
+    user_input, price_level, max_distance_km = parse_chat_request(request.json)
+
+    def generate():
+        if not user_input:
+            yield sse_event("message", "Proszę wpisać wiadomość.")
+        else:
+            try:
+                for event in chat_pipeline.handle_stream(user_input, price_level=price_level, max_distance_km=max_distance_km):
+                    yield sse_event(event["type"], event["text"].replace("\n", "<br>"))
+            except Exception as e:
+                print(f"Błąd generowania odpowiedzi: {e}")
+                yield sse_event("message", "Przepraszam, wystąpił błąd systemu.")
+        yield sse_event("done")
+
+    # X-Accel-Buffering wyłącza buforowanie odpowiedzi przez proxy (np. nginx)
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    """Statystyki obsługi żądań: udział analiz intencji bez LLM, cache wyników, spekulacja pipeline'u czatu"""
+    return jsonify({
+        "intent": rag_chain.intent_stats(),
+        "result_cache": rag_chain.result_cache.stats() if rag_chain.result_cache is not None else None,
+        "chat_pipeline": chat_pipeline.stats()
+    })
+
 if __name__ == '__main__':
     # use_reloader=False zapobiega podwójnemu ładowaniu modelu przy starcie (raz dla serwera, raz dla debuggera)
     # PORT jest odczytywany z env (np. w Hugging Face Spaces); lokalnie domyślnie 5000
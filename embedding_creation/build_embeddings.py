@@ -0,0 +1,403 @@
+"""
+build_embeddings.py
+
+Generowanie wszystkich wariantów embeddingów w jednym przebiegu.
+
+Wariant to kombinacja (model, pooling, źródło kontekstu, minimalna długość kontekstu).
+Skrypt:
+- wczytuje każdy model tylko raz i liczy wszystkie potrzebne poolingi (CLS / mean)
+  w jednym przebiegu transformera (moduł Pooling z kilkoma trybami naraz),
+- enkoduje unikalne teksty wszystkich wariantów danego modelu w dużych paczkach,
+  posortowanych według długości (mniej paddingu w paczce),
+- opcjonalnie rozdziela enkodowanie na pulę procesów (`--processes`),
+- zapisuje pliki `output_files/lodz_restaurants_cafes_embeddings_<wariant>.jsonl`
+  w tym samym formacie co dotychczasowe skrypty `create_embeddings_*`.
+
+Przebudowa jest przyrostowa: obok wyniku zapisywany jest plik `<nazwa>.hashes.json`
+ze skrótem (kontekst + model + pooling) każdego rekordu. Kolejne uruchomienie koduje
+tylko rekordy nowe lub zmienione, usuwa zniknięte `oms_id`, odświeża metadane pozostałych
+i aktualizuje skompilowany format (.npy) bez pełnego przebiegu przez korpus (`--full` wyłącza).
+
+Uruchamiasz z katalogu głównego projektu:
+    python -m embedding_creation.build_embeddings                       # wszystkie warianty
+    python -m embedding_creation.build_embeddings --variants cls_words mean_words
+    python -m embedding_creation.build_embeddings --processes 4 --batch-size 64 --compile
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+METADATA_FILE = "output_files/lodz_restaurants_cafes_with_key_words.jsonl"
+FULL_CONTEXT_FILE = "output_files/lodz_restaurants_cafes_emb_input.jsonl"
+WORDS_CONTEXT_FILE = "output_files/context_from_filtered_keywords.jsonl"
+OUTPUT_TEMPLATE = "output_files/lodz_restaurants_cafes_embeddings_{name}.jsonl"
+
+MMLW_MODEL = "sdadas/mmlw-retrieval-roberta-large"
+MMLW_V2_MODEL = "sdadas/mmlw-retrieval-roberta-large-v2"
+STELLA_MODEL = "sdadas/stella-pl-retrieval"
+
+DEFAULT_BATCH_SIZE = 32
+# Kolejność wektorów w wyjściu modułu Pooling z kilkoma trybami (sentence-transformers)
+POOLING_ORDER = ("cls", "mean")
+
+
+@dataclass(frozen=True)
+class EmbeddingVariant:
+    """Jeden plik z embeddingami do wygenerowania."""
+    name: str
+    model_name: str
+    pooling: str
+    context_file: str
+    min_context_length: int = 0
+    # Czy zapisać w rekordzie kontekst, który został zakodowany (zamiast kontekstu z metadanych)
+    store_context: bool = False
+
+    @property
+    def output_file(self) -> str:
+        return OUTPUT_TEMPLATE.format(name=self.name)
+
+
+# Macierz wariantów – odpowiada dawnym skryptom embedding_creation/create_embeddings_*.py
+VARIANTS: Dict[str, EmbeddingVariant] = {v.name: v for v in [
+    EmbeddingVariant("mean", MMLW_MODEL, "mean", FULL_CONTEXT_FILE),
+    EmbeddingVariant("cls", MMLW_MODEL, "cls", FULL_CONTEXT_FILE),
+    EmbeddingVariant("mean_words", MMLW_MODEL, "mean", WORDS_CONTEXT_FILE),
+    EmbeddingVariant("cls_words", MMLW_MODEL, "cls", WORDS_CONTEXT_FILE, store_context=True),
+    EmbeddingVariant("mean_stella", STELLA_MODEL, "mean", FULL_CONTEXT_FILE),
+    EmbeddingVariant("cls_stella", STELLA_MODEL, "cls", FULL_CONTEXT_FILE),
+    EmbeddingVariant("mean_words_stella", STELLA_MODEL, "mean", WORDS_CONTEXT_FILE),
+    EmbeddingVariant("cls_words_stella", STELLA_MODEL, "cls", WORDS_CONTEXT_FILE),
+    EmbeddingVariant("cls_words_v2", MMLW_V2_MODEL, "cls", WORDS_CONTEXT_FILE,
+                     min_context_length=70, store_context=True),
+]}
+
+
+def load_metadata(path: str = METADATA_FILE) -> Dict[int, dict]:
+    """Pełne metadane restauracji według oms_id."""
+    full_metadata: Dict[int, dict] = {}
+    with open(path, "r", encoding="utf-8") as f_meta:
+        for line in f_meta:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if rec.get("oms_id"):
+                full_metadata[rec["oms_id"]] = rec
+    return full_metadata
+
+
+def load_contexts(path: str) -> List[dict]:
+    """Rekordy {oms_id, context, ...} z pliku wejściowego (kolejność zachowana)."""
+    records = []
+    with open(path, "r", encoding="utf-8") as fin:
+        for line in fin:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def select_records(variant: EmbeddingVariant, contexts: List[dict], full_metadata: Dict[int, dict]):
+    """
+    Rekordy wariantu do zakodowania: (metadane, kontekst), z tymi samymi regułami
+    pomijania co dawne skrypty (brak ID / metadanych, pusty lub zbyt krótki kontekst).
+    """
+    selected = []
+    skipped_missing = skipped_short = 0
+    for context_rec in contexts:
+        oms_id = context_rec.get("oms_id")
+        metadata = full_metadata.get(oms_id)
+        if not oms_id or not metadata:
+            skipped_missing += 1
+            continue
+        context = context_rec.get("context", "")
+        if not isinstance(context, str) or not context or len(context) < variant.min_context_length:
+            skipped_short += 1
+            continue
+        selected.append((metadata, context))
+    if skipped_missing:
+        print(f"  Ostrzeżenie: [{variant.name}] pominięto {skipped_missing} rekordów bez ID lub metadanych.")
+    if skipped_short:
+        print(f"  Ostrzeżenie: [{variant.name}] pominięto {skipped_short} rekordów z pustym lub zbyt krótkim "
+              f"kontekstem (< {variant.min_context_length} znaków).")
+    return selected
+
+
+def build_multi_pooling_model(model_name: str, poolings: List[str]):
+    """
+    SentenceTransformer z jednym modułem Pooling obejmującym wszystkie `poolings`.
+
+    Wyjście to konkatenacja wektorów w kolejności POOLING_ORDER – jeden przebieg
+    transformera daje embeddingi CLS i mean jednocześnie.
+    """
+    from sentence_transformers import SentenceTransformer, models
+
+    base = SentenceTransformer(model_name)
+    word_model = base[0]
+    pooling = models.Pooling(
+        word_embedding_dimension=word_model.get_word_embedding_dimension(),
+        pooling_mode_cls_token="cls" in poolings,
+        pooling_mode_mean_tokens="mean" in poolings,
+        pooling_mode_max_tokens=False,
+    )
+    return SentenceTransformer(modules=[word_model, pooling])
+
+
+def encode_sorted(model, texts: List[str], batch_size: int, processes: int = 1) -> np.ndarray:
+    """
+    Enkoduje teksty w paczkach posortowanych malejąco według długości i przywraca
+    pierwotną kolejność. Przy `processes > 1` używa puli procesów sentence-transformers
+    (kolejne fragmenty posortowanej listy trafiają do różnych procesów).
+    """
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    sorted_texts = [texts[i] for i in order]
+
+    if processes > 1:
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * processes)
+        try:
+            chunk_size = max(batch_size, int(np.ceil(len(sorted_texts) / (processes * 4))))
+            encoded = model.encode_multi_process(
+                sorted_texts, pool, batch_size=batch_size, chunk_size=chunk_size, normalize_embeddings=False
+            )
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        encoded = model.encode(
+            sorted_texts, batch_size=batch_size, normalize_embeddings=False,
+            convert_to_numpy=True, show_progress_bar=True
+        )
+
+    embeddings = np.empty_like(np.asarray(encoded, dtype="float32"))
+    embeddings[order] = encoded
+    return embeddings
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def context_hash(model_name: str, pooling: str, context: str) -> str:
+    """Skrót tekstu kontekstu razem z modelem i poolingiem – zmiana dowolnego z nich wymusza ponowne kodowanie."""
+    return hashlib.sha256(f"{model_name}|{pooling}|{context}".encode("utf-8")).hexdigest()[:32]
+
+
+def hashes_path(variant: EmbeddingVariant) -> str:
+    base, _ = os.path.splitext(variant.output_file)
+    return base + ".hashes.json"
+
+
+def load_hashes(variant: EmbeddingVariant) -> Dict[int, str]:
+    """Skróty kontekstów z poprzedniego przebiegu ({oms_id: hash}); pusty słownik, jeśli ich brak."""
+    try:
+        with open(hashes_path(variant), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {int(oms_id): h for oms_id, h in data.get("hashes", {}).items()}
+
+
+def save_hashes(variant: EmbeddingVariant, hashes: Dict[int, str]):
+    path = hashes_path(variant)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "model_name": variant.model_name,
+            "pooling": variant.pooling,
+            "hashes": {str(oms_id): h for oms_id, h in hashes.items()},
+        }, f)
+    os.replace(tmp_path, path)
+
+
+def load_previous_vectors(variant: EmbeddingVariant, hashes: List[str], selected) -> Dict[int, np.ndarray]:
+    """
+    Wektory z poprzedniego przebiegu, które można użyć ponownie: rekord nadal istnieje,
+    a skrót jego kontekstu (z modelem i poolingiem) się nie zmienił.
+
+    Returns:
+        Słownik {pozycja w `selected`: wektor}
+    """
+    from src.embedding_store import load_embeddings
+
+    previous_hashes = load_hashes(variant)
+    if not previous_hashes:
+        return {}
+    try:
+        records, embeddings = load_embeddings(variant.output_file)
+    except (OSError, ValueError) as e:
+        print(f"  UWAGA: [{variant.name}] nie udało się wczytać poprzednich embeddingów ({e}).")
+        return {}
+
+    row_by_id = {rec.oms_id: row for row, rec in enumerate(records)}
+    reused = {}
+    for pos, ((metadata, _), h) in enumerate(zip(selected, hashes)):
+        oms_id = metadata["oms_id"]
+        if previous_hashes.get(oms_id) == h and oms_id in row_by_id:
+            reused[pos] = np.asarray(embeddings[row_by_id[oms_id]], dtype="float32")
+    return reused
+
+
+def write_variant(variant: EmbeddingVariant, selected, embeddings: np.ndarray) -> int:
+    """Zapisuje rekordy wariantu (metadane + embedding) do pliku wyjściowego (atomowo)."""
+    tmp_path = variant.output_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fout:
+        for (metadata, context), embedding in zip(selected, embeddings):
+            fout.write(json.dumps(_output_record(variant, metadata, context, embedding), ensure_ascii=False) + "\n")
+    os.replace(tmp_path, variant.output_file)
+    return len(selected)
+
+
+def _output_record(variant: EmbeddingVariant, metadata: dict, context: str, embedding: Optional[np.ndarray]) -> dict:
+    enriched_record = metadata.copy()
+    if variant.store_context:
+        enriched_record["context"] = context
+    if embedding is not None:
+        enriched_record["embedding"] = embedding.tolist()
+    return enriched_record
+
+
+def build_model_variants(
+    model_name: str,
+    variants: List[EmbeddingVariant],
+    full_metadata: Dict[int, dict],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    processes: int = 1,
+    incremental: bool = True,
+    compile_output: bool = False,
+    compile_dtype: Optional[str] = None
+) -> List[str]:
+    """
+    Generuje wszystkie warianty jednego modelu: model wczytywany jest raz, a każdy
+    unikalny tekst enkodowany raz – niezależnie od liczby wariantów, które go używają.
+
+    W trybie przyrostowym (`incremental`) kodowane są tylko rekordy nowe lub ze zmienionym
+    kontekstem (patrz `context_hash`), rekordy usunięte z danych wejściowych znikają z wyniku,
+    a metadane pozostałych są odświeżane. Model jest wczytywany tylko wtedy, gdy jest co kodować.
+    Skompilowany format (.npy) jest zapisywany bezpośrednio z macierzy – przy `compile_output`
+    albo gdy już istnieje (aby nie stał się nieaktualny).
+
+    Returns:
+        Lista zapisanych plików
+    """
+    from src.embedding_store import compiled_paths, save_compiled
+
+    contexts_by_file = {path: load_contexts(path) for path in sorted({v.context_file for v in variants})}
+
+    plans = []
+    text_ids: Dict[str, int] = {}
+    for variant in variants:
+        selected = select_records(variant, contexts_by_file[variant.context_file], full_metadata)
+        if not selected:
+            print(f"UWAGA: [{variant.name}] brak rekordów do zapisania – pomijam wariant.")
+            continue
+        hashes = [context_hash(variant.model_name, variant.pooling, context) for _, context in selected]
+        reused = load_previous_vectors(variant, hashes, selected) if incremental else {}
+        for pos, (_, context) in enumerate(selected):
+            if pos not in reused:
+                text_ids.setdefault(context, len(text_ids))
+        if incremental:
+            removed = len(set(load_hashes(variant)) - {metadata["oms_id"] for metadata, _ in selected})
+            print(f"  [{variant.name}] bez zmian: {len(reused)}, do zakodowania: {len(selected) - len(reused)}, "
+                  f"usunięte: {removed}")
+        plans.append((variant, selected, hashes, reused))
+    if not plans:
+        return []
+
+    texts = list(text_ids)
+    poolings = [p for p in POOLING_ORDER if any(v.pooling == p for v, *_ in plans)]
+    encoded = None
+    dim = None
+    if texts:
+        print(f"\nŁadowanie modelu embeddingów: {model_name} (pooling: {', '.join(poolings)})")
+        model = build_multi_pooling_model(model_name, poolings)
+        dim = model[0].get_word_embedding_dimension()
+
+        print(f"Enkoduję {len(texts)} unikalnych tekstów dla wariantów: {', '.join(v.name for v, *_ in plans)}")
+        start = time.time()
+        encoded = encode_sorted(model, texts, batch_size=batch_size, processes=processes)
+        elapsed = time.time() - start
+        print(f"Zakończono w {elapsed:.1f}s ({len(texts) / max(elapsed, 1e-9):.1f} tekstów/s)")
+    else:
+        print(f"\nINFO: Model {model_name}: wszystkie konteksty bez zmian, pomijam kodowanie.")
+
+    written = []
+    for variant, selected, hashes, reused in plans:
+        variant_dim = dim if dim is not None else len(next(iter(reused.values())))
+        embeddings = np.empty((len(selected), variant_dim), dtype="float32")
+        new_positions = [pos for pos in range(len(selected)) if pos not in reused]
+        if new_positions:
+            offset = poolings.index(variant.pooling) * dim
+            rows = np.fromiter((text_ids[selected[pos][1]] for pos in new_positions), dtype="int64",
+                               count=len(new_positions))
+            embeddings[new_positions] = _normalize(encoded[rows, offset:offset + dim])
+        for pos, vector in reused.items():
+            embeddings[pos] = vector
+
+        cnt = write_variant(variant, selected, embeddings)
+        if compile_output or os.path.exists(compiled_paths(variant.output_file)[0]):
+            records = [_output_record(variant, metadata, context, None) for metadata, context in selected]
+            save_compiled(variant.output_file, records, embeddings, dtype=compile_dtype)
+        save_hashes(variant, {metadata["oms_id"]: h for (metadata, _), h in zip(selected, hashes)})
+        print(f"Gotowe! Zapisano {cnt} rekordów do {variant.output_file}")
+        written.append(variant.output_file)
+    return written
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Generuje wybrane warianty embeddingów (domyślnie wszystkie), grupując je według modelu.
+    """
+    parser = argparse.ArgumentParser(
+        description="Generowanie wariantów embeddingów (model x pooling x źródło kontekstu).",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS),
+        help="Warianty do wygenerowania (domyślnie wszystkie)."
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Rozmiar paczki enkodera.")
+    parser.add_argument("--processes", type=int, default=1, help="Liczba procesów enkodujących (CPU).")
+    parser.add_argument("--metadata", default=METADATA_FILE, help="Plik z pełnymi metadanymi restauracji.")
+    parser.add_argument("--compile", action="store_true", help="Zapisz także format skompilowany (.npy + .meta.jsonl).")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default=None,
+                        help="Typ macierzy formatu skompilowanego (domyślnie: jak dotychczas lub float32).")
+    parser.add_argument("--full", action="store_true", help="Koduj wszystkie rekordy od nowa (bez trybu przyrostowego).")
+    args = parser.parse_args(argv)
+
+    print(f"Wczytuję pełne metadane z '{args.metadata}'...")
+    try:
+        full_metadata = load_metadata(args.metadata)
+    except FileNotFoundError:
+        print(f"Błąd: Plik z metadanymi '{args.metadata}' nie został znaleziony.")
+        return
+    print(f"Znaleziono {len(full_metadata)} rekordów z metadanymi.")
+
+    by_model: Dict[str, List[EmbeddingVariant]] = {}
+    for name in dict.fromkeys(args.variants):
+        variant = VARIANTS[name]
+        by_model.setdefault(variant.model_name, []).append(variant)
+
+    written = []
+    for model_name, variants in by_model.items():
+        try:
+            written.extend(build_model_variants(
+                model_name, variants, full_metadata, batch_size=args.batch_size, processes=args.processes,
+                incremental=not args.full, compile_output=args.compile, compile_dtype=args.dtype
+            ))
+        except FileNotFoundError as e:
+            print(f"Błąd: Brak pliku wejściowego dla modelu '{model_name}': {e}")
+
+    print("=" * 60)
+    print(f"Zapisano {len(written)} plików z embeddingami.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Dodaj katalog główny projektu do ścieżki, aby móc importować pakiet src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.embedding_store import load_embeddings
+from src.vector_index import load_or_build_index, INDEX_BACKENDS
+
+DEFAULT_PATTERN = "output_files/lodz_restaurants_cafes_embeddings_*.jsonl"
+
+# Mapowanie wariantu pliku na model, którym go zakodowano (zgodnie z embedding_creation/)
+MODEL_BY_SUFFIX = [
+    ("_stella", "sdadas/stella-pl-retrieval"),
+    ("_v2", "sdadas/mmlw-retrieval-roberta-large-v2"),
+]
+DEFAULT_MODEL = "sdadas/mmlw-retrieval-roberta-large"
+
+
+def infer_model_name(embeddings_file: str) -> str:
+    """Zgaduje nazwę modelu embeddingów na podstawie nazwy pliku."""
+    stem = os.path.splitext(os.path.basename(embeddings_file))[0]
+    for suffix, model_name in MODEL_BY_SUFFIX:
+        if stem.endswith(suffix):
+            return model_name
+    return DEFAULT_MODEL
+
+
+def infer_pooling(embeddings_file: str) -> str:
+    """Zgaduje pooling tak samo jak create_rag_system(pooling_type=None)."""
+    return "cls" if "cls" in embeddings_file else "mean"
+
+
+def main():
+    """
+    Buduje z wyprzedzeniem indeksy FAISS dla wszystkich wariantów embeddingów,
+    aby testy i workery serwera wczytywały je z cache zamiast budować od nowa.
+    """
+    parser = argparse.ArgumentParser(
+        description="Budowa cache indeksów FAISS dla wariantów embeddingów.",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help=f"Pliki z embeddingami (domyślnie: {DEFAULT_PATTERN})."
+    )
+    parser.add_argument("--model", type=str, default=None, help="Wymuś nazwę modelu (domyślnie: na podstawie nazwy pliku).")
+    parser.add_argument("--pooling", choices=["cls", "mean"], default=None, help="Wymuś pooling (domyślnie: na podstawie nazwy pliku).")
+    parser.add_argument("--backends", nargs="+", choices=INDEX_BACKENDS, default=["flat"], help="Typy indeksów do zbudowania.")
+    args = parser.parse_args()
+
+    files = [f for f in (args.files or sorted(glob.glob(DEFAULT_PATTERN))) if not f.endswith(".meta.jsonl")]
+    if not files:
+        print(f"Nie znaleziono plików pasujących do wzorca: {DEFAULT_PATTERN}")
+        sys.exit(1)
+
+    for path in files:
+        model_name = args.model or infer_model_name(path)
+        pooling = args.pooling or infer_pooling(path)
+        print(f"\n{path}\n  model={model_name} | pooling={pooling}")
+        try:
+            start = time.time()
+            _, embeddings = load_embeddings(path)
+            for backend in args.backends:
+                index = load_or_build_index(path, embeddings, model_name=model_name, pooling=pooling, backend=backend)
+                print(f"  [{backend}] Gotowe: {index.ntotal} wektorów w {time.time() - start:.2f}s")
+        except Exception as e:
+            print(f"  Błąd: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ from dotenv import load_dotenv
 
 # Dodajemy katalog główny projektu do ścieżki, aby móc importować pakiet src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src import get_config, list_profiles, create_rag_system, LocationService
+from src import get_config, list_profiles, create_rag_system, get_location_service
 
 
 def parse_arguments():
@@ -100,9 +100,13 @@ def main():
     try:
         # Inicjalizuj system RAG
         print("Inicjalizacja systemu RAG i serwisu lokalizacji...")
-        location_service = LocationService()
+        location_service = get_location_service()
         rag_chain, search_and_rank, filter_open = create_rag_system(
             embeddings_file=args.embedding_file,
+            location_service=location_service,
+            # Indeks wektorowy, backend modeli i mikro-batching z profilu konfiguracji
+            **config.index_kwargs(),
+            **config.inference_kwargs(),
             # Możesz tu nadpisać inne parametry, np. model embeddingu
         )
         # Ustawienie promptu z profilu
@@ -171,11 +175,12 @@ def main():
                     continue
 
                 # 1. Obsługa Lokalizacji
-                user_location = None
+                # 0. Offline gazetteer (bez sieci)
+                user_location = location_service.lookup_gazetteer(user_input)
                 
                 # A. Próba z LLM
                 detected_location = analysis.get("location")
-                if detected_location:
+                if detected_location and not user_location:
                     user_location = location_service.geocode(detected_location)
                     if not user_location:
                         # Fallback: SpaCy na wyniku LLM
@@ -196,8 +201,10 @@ def main():
                 elif not rag_chain.user_location:
                     loc_input = input("Nie wykryłem lokalizacji. Gdzie szukać? (Enter by pominąć): ").strip()
                     if loc_input:
-                        norm_loc = rag_chain.normalize_location(loc_input) or loc_input
-                        user_location = location_service.geocode(norm_loc)
+                        user_location = location_service.lookup_gazetteer(loc_input)
+                        if not user_location:
+                            norm_loc = rag_chain.normalize_location(loc_input) or loc_input
+                            user_location = location_service.geocode(norm_loc)
                         if user_location:
                             rag_chain.set_user_location(user_location)
                 
@@ -0,0 +1,49 @@
+import argparse
+import glob
+import os
+import sys
+
+# Dodaj katalog główny projektu do ścieżki, aby móc importować pakiet src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.embedding_store import compile_embeddings, compiled_paths, is_compiled_fresh, COMPILED_DTYPES
+
+DEFAULT_PATTERN = "output_files/lodz_restaurants_cafes_embeddings_*.jsonl"
+
+
+def main():
+    """
+    Kompiluje pliki `*_embeddings_*.jsonl` do formatu binarnego (.npy + .meta.jsonl),
+    który `create_rag_system` wczytuje automatycznie, jeśli jest nowszy niż JSONL.
+    """
+    parser = argparse.ArgumentParser(
+        description="Kompilacja plików z embeddingami do formatu memmap (.npy).",
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help=f"Pliki JSONL do skompilowania (domyślnie: {DEFAULT_PATTERN})."
+    )
+    parser.add_argument("--dtype", choices=COMPILED_DTYPES, default="float32", help="Typ danych macierzy embeddingów.")
+    parser.add_argument("--force", action="store_true", help="Kompiluj ponownie nawet aktualne pliki.")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob.glob(DEFAULT_PATTERN))
+    if not files:
+        print(f"Nie znaleziono plików pasujących do wzorca: {DEFAULT_PATTERN}")
+        sys.exit(1)
+
+    for path in files:
+        if path.endswith(".meta.jsonl"):
+            continue
+        if not args.force and is_compiled_fresh(path):
+            print(f"Pomijam (aktualny): {compiled_paths(path)[0]}")
+            continue
+        try:
+            compile_embeddings(path, dtype=args.dtype)
+        except Exception as e:
+            print(f"Błąd kompilacji '{path}': {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+
+# Dodaj katalog główny projektu do ścieżki, aby móc importować pakiet src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def current_rss_mb() -> float:
+    """Zwraca bieżące RSS procesu w MB (Linux: /proc, inne systemy: szczytowe RSS)."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS raportuje bajty, Linux kilobajty
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def load_legacy(embeddings_file: str):
+    """Stary sposób wczytywania: pełne rekordy z listą floatów + osobna macierz."""
+    import numpy as np
+
+    records = []
+    embeddings = []
+    with open(embeddings_file, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            records.append(rec)
+            embeddings.append(np.array(rec["embedding"], dtype="float32"))
+    return records, np.vstack(embeddings)
+
+
+def load_compact(embeddings_file: str):
+    """Nowy sposób: kompaktowe PlaceRecord bez embeddingów + macierz."""
+    from src.embedding_store import load_embeddings
+    return load_embeddings(embeddings_file)
+
+
+def measure(mode: str, embeddings_file: str):
+    """Mierzy przyrost RSS po wczytaniu korpusu w danym trybie (wywoływane w podprocesie)."""
+    import numpy as np  # noqa: F401 – import przed pomiarem bazowym
+
+    gc.collect()
+    before = current_rss_mb()
+    records, embeddings = load_legacy(embeddings_file) if mode == "legacy" else load_compact(embeddings_file)
+    gc.collect()
+    after = current_rss_mb()
+    print(json.dumps({
+        "mode": mode,
+        "records": len(records),
+        "rss_before_mb": round(before, 2),
+        "rss_after_mb": round(after, 2),
+        "rss_delta_mb": round(after - before, 2),
+        "matrix_mb": round(embeddings.nbytes / (1024 * 1024), 2),
+    }))
+
+
+def main():
+    """
+    Raport pamięci: porównuje RSS po wczytaniu embeddingów starą metodą
+    (rekordy z listą `embedding`) i nową (kompaktowe PlaceRecord).
+    Każdy tryb jest mierzony w osobnym procesie, aby wyniki się nie nakładały.
+    """
+    parser = argparse.ArgumentParser(description="Raport zużycia pamięci przez metadane rekordów.")
+    parser.add_argument(
+        "--embedding-file",
+        type=str,
+        default="output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl"
+    )
+    parser.add_argument("--mode", choices=["legacy", "compact"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        measure(args.mode, args.embedding_file)
+        return
+
+    results = []
+    for mode in ["legacy", "compact"]:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--mode", mode, "--embedding-file", args.embedding_file],
+            capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            print(f"Błąd pomiaru ({mode}):\n{out.stderr}")
+            return
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    print(f"\nRAPORT PAMIĘCI: {args.embedding_file}")
+    print(f"{'Tryb':<10} | {'Rekordy':<8} | {'RSS przed':<10} | {'RSS po':<10} | {'Przyrost':<10} | {'Macierz':<8}")
+    print("-" * 72)
+    for r in results:
+        print(f"{r['mode']:<10} | {r['records']:<8} | {r['rss_before_mb']:<7.1f} MB | {r['rss_after_mb']:<7.1f} MB | "
+              f"{r['rss_delta_mb']:<7.1f} MB | {r['matrix_mb']:.1f} MB")
+    saved = results[0]["rss_delta_mb"] - results[1]["rss_delta_mb"]
+    print("-" * 72)
+    print(f"Oszczędność: {saved:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ from dotenv import load_dotenv
 
 # Dodaj katalog główny projektu do ścieżki, aby móc importować pakiet src
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src import create_rag_system, LocationService
+from src import create_rag_system, get_location_service
 
 
 def main():
@@ -34,9 +34,10 @@ def main():
 
     print("Inicjalizacja systemu...")
     try:
-        location_service = LocationService()
+        location_service = get_location_service()
         rag_chain, search_and_rank, _filter_open = create_rag_system(
-            embeddings_file=args.embedding_file
+            embeddings_file=args.embedding_file,
+            location_service=location_service
         )
     except Exception as e:
         print(f"\nBłąd inicjalizacji: {e}")
@@ -66,12 +67,13 @@ def main():
             print("   System przechodzi w tryb awaryjny: Wyszukiwanie lokalne (RoBERTa) na podstawie surowego tekstu.")
 
         # 1. Lokalizacja - Wielostopniowa detekcja (zgodnie z prośbą o debugowanie)
-        user_location = None
+        # Krok 0: Offline gazetteer (dzielnice, ulice, punkty orientacyjne) – bez sieci
+        user_location = location_service.lookup_gazetteer(user_input)
 
         # Krok A: LLM Normalizacja
         detected_location_llm = analysis.get("location")
         
-        if detected_location_llm:
+        if detected_location_llm and not user_location:
             print(f"INFO: LLM wykrył lokalizację: '{detected_location_llm}'")
             # Próba geokodowania wyniku LLM
             user_location = location_service.geocode(detected_location_llm)
@@ -99,10 +101,13 @@ def main():
         if not user_location:
             location_input = input("Gdzie szukać? (Lokalizacja, np. 'Manufaktura' lub Enter by pominąć): ").strip()
             if location_input:
-                # Normalizujemy również input od użytkownika, na wszelki wypadek
-                normalized_input = rag_chain.normalize_location(location_input) or location_input
-                if normalized_input:
-                    user_location = location_service.geocode(normalized_input)
+                # Gazetteer zna potoczne nazwy – LLM i Nominatim tylko, gdy nic nie pasuje
+                user_location = location_service.lookup_gazetteer(location_input)
+                if not user_location:
+                    # Normalizujemy również input od użytkownika, na wszelki wypadek
+                    normalized_input = rag_chain.normalize_location(location_input) or location_input
+                    if normalized_input:
+                        user_location = location_service.geocode(normalized_input)
 
         # 2. HyDE (Otoczka zapytania)
         expanded_query = analysis.get("search_query")
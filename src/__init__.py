@@ -1,4 +1,4 @@
 from .conversational_rag import create_rag_system, ConversationalRAG, PLLuMLLM, distance_km
-from .location_service import LocationService
+from .location_service import LocationService, get_location_service
 from .config import get_config, list_profiles, RAGConfig
 from .embedding_model import ModelMeanPooling
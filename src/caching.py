@@ -0,0 +1,467 @@
+"""
+caching.py
+
+Pamięci podręczne dla gorącej ścieżki wyszukiwania.
+
+- `LRUCache` – ograniczony (liczba wpisów i bajty) cache LRU ze statystykami, bezpieczny wątkowo,
+- `QueryEmbeddingCache` – embeddingi zapytań (klucz: model + pooling + znormalizowany tekst)
+  z opcjonalną warstwą dyskową w SQLite, dzięki której kolejne uruchomienia ewaluacji
+  nie przepuszczają tych samych zapytań przez transformer,
+- `RerankerScoreCache` – znormalizowane (sigmoid) wyniki cross-encodera dla par
+  (zapytanie, lokal); do modelu trafiają tylko brakujące pary,
+- `SemanticResultCache` – gotowe listy rankingowe (wraz z ustalonym kontekstem żądania)
+  dla wiadomości podobnych semantycznie (cosinus embeddingów) przy tych samych filtrach;
+  unieważniany po zmianie wersji indeksu.
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_QUERY_CACHE_ENTRIES = 4096
+DEFAULT_QUERY_CACHE_BYTES = 32 * 1024 * 1024
+DEFAULT_RERANKER_CACHE_ENTRIES = 100_000
+DEFAULT_RESULT_CACHE_ENTRIES = 1024
+DEFAULT_RESULT_CACHE_TTL_SECONDS = 15 * 60
+# Próg cosinusa embeddingów wiadomości użytkownika ("dobra pizza w centrum" ~ "gdzie na pizzę w centrum?");
+# krótkie parafrazy są mniej podobne niż opisy HyDE, a różnice ceny/kuchni i miejsca rozstrzyga klucz filtrów
+DEFAULT_RESULT_CACHE_THRESHOLD = 0.90
+# Rozmiar komórki lokalizacji w kluczu cache (stopnie; ~250 m w Łodzi)
+DEFAULT_LOCATION_CELL_DEG = 0.0025
+
+
+def normalize_query_text(text: str) -> str:
+    """
+    Normalizacja tekstu zapytania do klucza cache: NFC, bez nadmiarowych spacji.
+
+    Wielkość liter zostaje – modele embeddingów są "cased" i zwracają dla
+    "Pizza" i "pizza" różne wektory.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def _default_size(value: Any) -> int:
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Cache LRU z limitem liczby wpisów i (opcjonalnie) łącznego rozmiaru w bajtach.
+
+    Najdawniej używane wpisy są usuwane, gdy któryś z limitów zostanie przekroczony.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        size_fn: Callable[[Any], int] = _default_size
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._size_fn = size_fn
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        size = self._size_fn(value)
+        with self._lock:
+            if key in self._data:
+                self.current_bytes -= self._sizes[key]
+                self._data.move_to_end(key)
+            self._data[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self.current_bytes > self.max_bytes)
+        ):
+            key, _ = self._data.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Liczniki trafień/chybień i zajętość cache."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.current_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+class QueryEmbeddingCache:
+    """
+    Cache embeddingów zapytań: LRU w pamięci + opcjonalny plik SQLite.
+
+    Klucz uwzględnia model i pooling, więc jedna instancja może obsługiwać
+    wiele wariantów systemu (np. w skryptach ewaluacyjnych).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_QUERY_CACHE_ENTRIES,
+        max_bytes: Optional[int] = DEFAULT_QUERY_CACHE_BYTES,
+        disk_path: Optional[str] = None
+    ):
+        """
+        Args:
+            max_entries: Maksymalna liczba wektorów w pamięci
+            max_bytes: Maksymalny rozmiar wektorów w pamięci (bajty)
+            disk_path: Ścieżka do pliku SQLite (None = tylko pamięć)
+        """
+        self.memory = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+        self.disk_path = disk_path
+        self.disk_hits = 0
+        self._disk_lock = threading.Lock()
+        self._conn = None
+        if disk_path:
+            try:
+                directory = os.path.dirname(disk_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._conn = sqlite3.connect(disk_path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"UWAGA: Nie udało się otworzyć cache embeddingów '{disk_path}' ({e}). Używam tylko pamięci.")
+                self._conn = None
+
+    @staticmethod
+    def make_key(model_name: str, pooling: str, text: str) -> str:
+        return f"{model_name}|{pooling}|{normalize_query_text(text)}"
+
+    def _disk_get(self, key: str) -> Optional[np.ndarray]:
+        if self._conn is None:
+            return None
+        with self._disk_lock:
+            row = self._conn.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype="float32")
+
+    def _disk_put(self, key: str, vector: np.ndarray):
+        if self._conn is None:
+            return
+        with self._disk_lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, vector) VALUES (?, ?)",
+                    (key, vector.tobytes())
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"UWAGA: Nie udało się zapisać embeddingu zapytania na dysk: {e}")
+
+    def get(self, model_name: str, pooling: str, text: str) -> Optional[np.ndarray]:
+        """Zwraca zapamiętany wektor (float32) lub None. Wektora nie należy modyfikować."""
+        key = self.make_key(model_name, pooling, text)
+        vector = self.memory.get(key)
+        if vector is None:
+            vector = self._disk_get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.memory.put(key, vector)
+        return vector
+
+    def put(self, model_name: str, pooling: str, text: str, vector: np.ndarray) -> np.ndarray:
+        """Zapisuje wektor i zwraca jego zapamiętaną kopię (float32)."""
+        key = self.make_key(model_name, pooling, text)
+        # Kopia – wektor w cache jest współdzielony i nie może zmieniać się razem z tablicą wywołującego
+        vector = np.array(vector, dtype="float32").ravel()
+        self.memory.put(key, vector)
+        self._disk_put(key, vector)
+        return vector
+
+    def get_or_encode(
+        self,
+        model_name: str,
+        pooling: str,
+        text: str,
+        encode_fn: Callable[[str], Any]
+    ) -> np.ndarray:
+        """Zwraca wektor z cache albo liczy go funkcją `encode_fn(text)` i zapamiętuje."""
+        vector = self.get(model_name, pooling, text)
+        if vector is None:
+            vector = self.put(model_name, pooling, text, encode_fn(text))
+        return vector
+
+    def stats(self) -> Dict[str, float]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def close(self):
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RerankerScoreCache:
+    """
+    Cache wyników rerankera (cross-encodera) dla par (zapytanie, lokal).
+
+    Klucz: (znormalizowane zapytanie, id rekordu, skrót kontekstu) – zmiana opisu
+    lokalu po przebudowie danych automatycznie unieważnia stary wynik.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_RERANKER_CACHE_ENTRIES):
+        # Wartości to pojedyncze floaty – limit bajtów nie jest potrzebny
+        self.memory = LRUCache(max_entries=max_entries, size_fn=lambda _: 0)
+        self.pairs_scored = 0
+
+    @staticmethod
+    def context_hash(context: str) -> str:
+        return hashlib.blake2b((context or "").encode("utf-8"), digest_size=8).hexdigest()
+
+    def score(
+        self,
+        query: str,
+        items: Sequence[Tuple[Hashable, str]],
+        predict_fn: Callable[[List[List[str]]], Any]
+    ) -> np.ndarray:
+        """
+        Zwraca wyniki (0-1) dla par (query, kontekst) w kolejności `items`.
+
+        Args:
+            query: Zapytanie użytkownika
+            items: Lista (id rekordu, kontekst)
+            predict_fn: Funkcja licząca znormalizowane wyniki dla listy par [zapytanie, kontekst]
+        """
+        query_key = normalize_query_text(query)
+        keys = [(query_key, record_id, self.context_hash(context)) for record_id, context in items]
+        scores = np.empty(len(items), dtype="float32")
+
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.memory.get(key)
+            if cached is None:
+                missing.append(i)
+            else:
+                scores[i] = cached
+
+        if missing:
+            new_scores = np.asarray(predict_fn([[query, items[i][1]] for i in missing]), dtype="float32").ravel()
+            self.pairs_scored += len(missing)
+            for i, value in zip(missing, new_scores):
+                scores[i] = value
+                self.memory.put(keys[i], float(value))
+        return scores
+
+    def stats(self) -> Dict[str, float]:
+        stats = self.memory.stats()
+        stats["pairs_scored"] = self.pairs_scored
+        return stats
+
+
+def location_cell(location: Optional[Tuple[float, float]], cell_deg: float = DEFAULT_LOCATION_CELL_DEG) -> Optional[Tuple[int, int]]:
+    """Komórka siatki (lat, lon) dla lokalizacji użytkownika – bliskie punkty dzielą wpis cache."""
+    if not location:
+        return None
+    return (int(np.floor(location[0] / cell_deg)), int(np.floor(location[1] / cell_deg)))
+
+
+class SemanticResultCache:
+    """
+    Cache wyników wyszukiwania dla wiadomości podobnych semantycznie.
+
+    Wpis to (embedding wiadomości, klucz filtrów, wyniki, poluzowane filtry, kontekst).
+    Kontekst to słownik parametrów ustalonych przy liczeniu wyników (np. lokalizacja
+    użytkownika, zapytanie wyszukiwania), dzięki którym trafienie pomija także analizę
+    intencji i geokodowanie. Trafienie wymaga identycznego klucza filtrów (np. komórka
+    lokalizacji, cena, kuchnia) i podobieństwa cosinusowego embeddingów co najmniej
+    `similarity_threshold`. Wpisy wygasają po `ttl_seconds`, nadmiarowe są usuwane
+    w kolejności LRU, a zmiana wersji indeksu czyści cały cache.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = DEFAULT_RESULT_CACHE_THRESHOLD,
+        max_entries: int = DEFAULT_RESULT_CACHE_ENTRIES,
+        ttl_seconds: Optional[float] = DEFAULT_RESULT_CACHE_TTL_SECONDS
+    ):
+        """
+        Args:
+            similarity_threshold: Minimalny cosinus embeddingów zapytań dla trafienia
+            max_entries: Maksymalna liczba zapamiętanych list wyników
+            ttl_seconds: Czas życia wpisu (None = bez wygasania)
+        """
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index_version: Optional[str] = None
+        # id wpisu -> (wektor, klucz filtrów, wyniki, poluzowane filtry, kontekst, czas zapisu); kolejność = LRU
+        self._entries: "OrderedDict[int, tuple]" = OrderedDict()
+        # klucz filtrów -> id wpisów (porównujemy tylko zapytania z tymi samymi filtrami)
+        self._buckets: Dict[Hashable, Dict[int, None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._hit_similarity_sum = 0.0
+
+    @staticmethod
+    def _copy(results: List[Dict]) -> List[Dict]:
+        # Wyniki są słownikami modyfikowanymi dalej (np. w testach) – cache trzyma własne kopie
+        return [dict(r) for r in results]
+
+    def _remove(self, entry_id: int):
+        _, key, _, _, _, _ = self._entries.pop(entry_id)
+        bucket = self._buckets[key]
+        del bucket[entry_id]
+        if not bucket:
+            del self._buckets[key]
+
+    def set_index_version(self, version: str):
+        """Ustawia wersję indeksu; inna niż dotychczasowa unieważnia wszystkie wpisy."""
+        with self._lock:
+            if self.index_version is not None and version != self.index_version and self._entries:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._buckets.clear()
+            self.index_version = version
+
+    def lookup(
+        self,
+        vector: np.ndarray,
+        filter_key: Hashable
+    ) -> Optional[Tuple[List[Dict], List[str], Dict[str, Any]]]:
+        """
+        Zwraca (wyniki, poluzowane filtry, kontekst) najbardziej podobnej wiadomości z tym
+        samym kluczem filtrów albo None. `vector` musi być znormalizowany (L2).
+        """
+        vector = np.asarray(vector, dtype="float32").ravel()
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_sim = None, -1.0
+            for entry_id in list(self._buckets.get(filter_key, ())):
+                cached_vector, _, _, _, _, created = self._entries[entry_id]
+                if self.ttl_seconds is not None and now - created > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                sim = float(np.dot(cached_vector, vector))
+                if sim > best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None or best_sim < self.similarity_threshold:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            self._hit_similarity_sum += best_sim
+            _, _, results, relaxed, context, _ = self._entries[best_id]
+            return self._copy(results), list(relaxed), dict(context)
+
+    def put(
+        self,
+        vector: np.ndarray,
+        filter_key: Hashable,
+        results: List[Dict],
+        relaxed: Sequence[str] = (),
+        context: Optional[Dict[str, Any]] = None
+    ):
+        """Zapamiętuje wyniki wyszukiwania (i kontekst żądania) dla wiadomości o danym embeddingu i filtrach."""
+        vector = np.array(vector, dtype="float32").ravel()
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (
+                vector, filter_key, self._copy(results), tuple(relaxed), dict(context or {}), time.monotonic()
+            )
+            self._buckets.setdefault(filter_key, {})[entry_id] = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Liczniki trafień/chybień, usunięć i średnie podobieństwo trafień."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0,
+                "mean_hit_similarity": self._hit_similarity_sum / self.hits if self.hits else 0.0,
+                "index_version": self.index_version,
+            }
+
+
+# Jeden cache na proces – wiele systemów RAG (np. warianty w ewaluacji) dzieli te same zapytania
+_shared_query_cache: Optional[QueryEmbeddingCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """
+    Zwraca współdzielony cache embeddingów zapytań.
+
+    Warstwę dyskową włącza zmienna środowiskowa QUERY_EMBEDDING_CACHE_PATH.
+    """
+    global _shared_query_cache
+    if _shared_query_cache is None:
+        with _shared_lock:
+            if _shared_query_cache is None:
+                _shared_query_cache = QueryEmbeddingCache(disk_path=os.getenv("QUERY_EMBEDDING_CACHE_PATH") or None)
+    return _shared_query_cache
@@ -0,0 +1,430 @@
+"""
+chat_pipeline.py
+
+Obsługa jednej wiadomości czatu (`/chat`) z równoległymi etapami.
+
+Dotychczas etapy szły po kolei: analiza intencji (LLM), geokodowanie lokalizacji z LLM
+(Nominatim), ewentualnie spaCy i drugie geokodowanie, a potem `generate_response`,
+który wołał LLM jeszcze raz – po hipotetyczny opis lokalu (HyDE) i po normalizację
+lokalizacji. `ChatPipeline` uruchamia niezależne etapy w puli wątków:
+
+- natychmiastowa analiza regułowa (`IntentParser`) rozpoznaje pewną luźną rozmowę –
+  wtedy opis HyDE, spaCy i wyszukiwanie w ogóle nie startują,
+- semantyczny cache wyników (`rag.result_cache`) jest sprawdzany jeszcze przed LLM:
+  klucz to embedding wiadomości użytkownika i filtry znane od razu (gazetteer, suwak ceny,
+  kuchnia i cena z reguł); trafienie pomija wszystkie pozostałe etapy,
+- analiza intencji (LLM) i opis HyDE (LLM) startują jednocześnie,
+- spaCy + geokodowanie surowego zapytania liczą się w trakcie analizy LLM
+  (tylko gdy offline gazetteer nic nie znalazł),
+- kandydaci lokalizacji (nazwa z LLM, spaCy na tej nazwie, spaCy na zapytaniu) są
+  geokodowani równolegle; wygrywa pierwszy sukces w kolejności dotychczasowego priorytetu,
+- spekulatywne wyszukiwanie na surowym zapytaniu startuje od razu, z filtrami z analizy
+  regułowej (gazetteer, kuchnia, cena; suwak ceny ma pierwszeństwo). Zapytaniem docelowym
+  pozostaje opis HyDE; wynik spekulatywny zastępuje go, gdy HyDE nie zdąży przed terminem
+  (`hyde_timeout`), a ostateczne filtry i lokalizacja są te same co spekulatywne,
+- normalizacja lokalizacji przez LLM (w `generate_response`) jest wołana tylko wtedy, gdy
+  żaden etap nie ustalił lokalizacji – nigdy dla luźnej rozmowy.
+
+Etapy, których wynik okazał się zbędny (np. geokodowanie po trafieniu w gazetteer,
+wyszukiwanie spekulatywne, gdy HyDE zdążyło), są anulowane. Zadania jeszcze nieuruchomione
+nie startują wcale (licznik `cancelled_stages`); te już trwające (zapytanie HTTP, model)
+kończą się w tle, a ich wynik jest odrzucany. Etapy pominięte jeszcze przed startem
+(HyDE dla luźnej rozmowy rozpoznanej regułami) liczy `skipped_stages`.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .caching import location_cell
+from .cuisine_index import terms_from_text
+from .location_service import LocationService
+from .record_store import parse_price_range
+
+DEFAULT_MAX_WORKERS = 16
+# Po tylu sekundach od początku żądania wyniki dla surowego zapytania zastępują spóźniony opis HyDE
+DEFAULT_HYDE_TIMEOUT = 8.0
+
+# Suwak ceny w interfejsie (0 = dowolna) -> przedział cenowy
+PRICE_LEVELS = {1: "0-40", 2: "40-80", 3: "80-1000"}
+
+# Wymuszenie formatu odpowiedzi (tylko lista, bez konwersacji)
+RESULTS_FORMAT_INSTRUCTION = (
+    " . Odpowiedz WYŁĄCZNIE listą znalezionych miejsc. Format: 1. **Nazwa** \n  Adres: [Adres] ([Odległość]) \n"
+    "  Typ kuchni: [Max 3 typy po przecinku] \n  Ocena: [Ocena] \n  [Opis]. Nie dodawaj wstępu ani zakończenia."
+)
+
+SearchKey = Tuple[str, Optional[tuple], Optional[str], Optional[str], Optional[float]]
+
+
+def _cancel(*futures: Optional[Future]) -> int:
+    """Anuluje zadania, które jeszcze nie wystartowały; zwraca liczbę anulowanych."""
+    return sum(1 for f in futures if f is not None and f.cancel())
+
+
+class ChatPipeline:
+    """
+    Orkiestrator żądania czatu nad współdzielonym `ConversationalRAG`.
+
+    Przykład:
+        pipeline = ChatPipeline(rag_chain, location_service)
+        response_text = pipeline.handle("sushi koło Manufaktury", price_level=0)
+        for event in pipeline.handle_stream("sushi koło Manufaktury"):
+            ...  # {"type": "message" | "card" | "token", "text": ...}
+    """
+
+    def __init__(
+        self,
+        rag_chain,
+        location_service: Optional[LocationService] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        speculative_search: bool = True,
+        hyde_timeout: float = DEFAULT_HYDE_TIMEOUT,
+        k: int = 5
+    ):
+        """
+        Args:
+            rag_chain: System ConversationalRAG (z `create_rag_system`)
+            location_service: Serwis lokalizacji (domyślnie: serwis systemu RAG)
+            max_workers: Rozmiar puli wątków etapów (wspólnej dla wszystkich żądań)
+            speculative_search: Czy od razu startować wyszukiwanie na surowym zapytaniu
+            hyde_timeout: Termin (s od początku żądania), po którym wyniki spekulatywne
+                zastępują jeszcze trwające generowanie opisu HyDE
+            k: Liczba rekomendacji w odpowiedzi
+        """
+        self.rag = rag_chain
+        self.location_service = location_service or rag_chain.location_service
+        self.speculative_search = speculative_search
+        self.hyde_timeout = hyde_timeout
+        self.k = k
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-pipeline")
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "speculative_hits": 0, "speculative_misses": 0,
+                       "cancelled_stages": 0, "skipped_stages": 0, "cache_hits": 0}
+
+    def _count(self, name: str, value: int = 1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Etapy -----------------------------------------------------------------
+
+    def _analyze_intent(self, user_input: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.rag.analyze_user_intent(user_input)
+        except Exception as e:
+            print(f"Wyjątek podczas analizy LLM: {e}")
+            return None
+
+    def _spacy_geocode(self, text: str, skip_name: Optional[str] = None) -> Optional[tuple]:
+        """spaCy NER na tekście, a potem geokodowanie znalezionej nazwy."""
+        name = self.location_service.extract_location_name(text)
+        if not name or (skip_name and name.strip().lower() == skip_name.strip().lower()):
+            # Ta sama nazwa jest już geokodowana przez inny etap
+            return None
+        return self.location_service.geocode(name)
+
+    def _search(self, key: SearchKey) -> Tuple[List[Dict], List[str]]:
+        search_query, user_location, price_preference, cuisine_filter, max_distance_km = key
+        relaxed_filters: List[str] = []
+        results = self.rag.search(
+            search_query, k=self.k, user_location=user_location,
+            price_preference=price_preference,
+            cuisine_filter=cuisine_filter,
+            max_distance_km=max_distance_km,
+            relaxed_filters=relaxed_filters
+        )
+        return results, relaxed_filters
+
+    @staticmethod
+    def _first_found(candidates: Sequence[Future]) -> Tuple[Optional[tuple], List[Future]]:
+        """
+        Pierwszy niepusty wynik w kolejności priorytetu (czeka na wyższy priorytet, nawet
+        jeśli niższy skończył wcześniej). Zwraca (wynik, zadania do anulowania).
+        """
+        for i, future in enumerate(candidates):
+            try:
+                coords = future.result()
+            except Exception as e:
+                print(f"Błąd podczas ustalania lokalizacji: {e}")
+                coords = None
+            if coords:
+                return coords, list(candidates[i + 1:])
+        return None, []
+
+    def _result_cache_key(
+        self,
+        rule_hint: Dict[str, Any],
+        gazetteer_location: Optional[tuple],
+        slider_price: Optional[str],
+        max_distance_km: Optional[float]
+    ) -> tuple:
+        """
+        Klucz filtrów semantycznego cache znany przed analizą LLM: komórka lokalizacji
+        z gazetteera, promień, przedział ceny (suwak lub reguły) i rdzenie kuchni z reguł.
+        Doprecyzowanie ("w centrum") dziedziczy kuchnię z rozmowy – ona też jest w kluczu.
+        """
+        price = slider_price or rule_hint.get("price")
+        cuisine = rule_hint.get("cuisine")
+        remembered = self.rag.user_preferences.get("cuisine") if self.rag.conversation_history else None
+        return (
+            self.k,
+            location_cell(gazetteer_location),
+            max_distance_km,
+            (parse_price_range(price) or price) if price else None,
+            frozenset(terms_from_text(cuisine)) if cuisine else None,
+            frozenset(terms_from_text(remembered)) if remembered else None,
+        )
+
+    def result_cache_key(self, user_input: str, price_level: int = 0, max_distance_km: Optional[float] = None) -> tuple:
+        """Klucz filtrów semantycznego cache dla wiadomości (jak w `handle`)."""
+        intent_parser = getattr(self.rag, "intent_parser", None)
+        rule_hint = intent_parser.parse(user_input) if intent_parser is not None else {}
+        return self._result_cache_key(
+            rule_hint, self.location_service.lookup_gazetteer(user_input), PRICE_LEVELS.get(price_level), max_distance_km
+        )
+
+    def _cached_request(
+        self,
+        final_input: str,
+        max_distance_km: Optional[float],
+        results: List[Dict],
+        relaxed: List[str],
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Argumenty generate_response dla trafienia w cache – kontekst jak przy pierwszym liczeniu."""
+        self._count("cache_hits")
+        print("INFO: Wyniki z semantycznego cache – pomijam analizę intencji, HyDE, geokodowanie i wyszukiwanie")
+        self.rag.set_user_location(context["user_location"])
+        if context["cuisine_filter"]:
+            self.rag.user_preferences["cuisine"] = context["cuisine_filter"]
+        return dict(
+            user_message=final_input,
+            k=self.k,
+            price_preference=context["price_preference"],
+            cuisine_filter=context["cuisine_filter"],
+            search_query_override=context["search_query"],
+            max_distance_km=max_distance_km,
+            resolve_location=False,
+            prefetched_results=(results, relaxed)
+        )
+
+    # --- Żądanie ----------------------------------------------------------------
+
+    def handle(self, user_input: str, price_level: int = 0, max_distance_km: Optional[float] = None) -> str:
+        """
+        Obsługuje jedną wiadomość użytkownika i zwraca tekst odpowiedzi.
+
+        Args:
+            user_input: Wiadomość użytkownika
+            price_level: Suwak ceny (0 = dowolna, 1 = tanie, 2 = średnie, 3 = drogie) – nadpisuje LLM
+            max_distance_km: Opcjonalny promień wyszukiwania (km) od lokalizacji użytkownika
+        """
+        start = time.perf_counter()
+        direct_response, request = self._prepare(user_input, price_level, max_distance_km)
+        if direct_response is not None:
+            return direct_response
+        response = self.rag.generate_response(**request)
+        self._log_timing(start, request)
+        return response
+
+    def handle_stream(
+        self,
+        user_input: str,
+        price_level: int = 0,
+        max_distance_km: Optional[float] = None
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Jak `handle`, ale zwraca zdarzenia odpowiedzi w miarę ich powstawania
+        (`ConversationalRAG.generate_stream`): komunikaty, karty lokali i tokeny LLM.
+        """
+        start = time.perf_counter()
+        direct_response, request = self._prepare(user_input, price_level, max_distance_km)
+        if direct_response is not None:
+            yield {"type": "message", "text": direct_response}
+            return
+        first_event = True
+        for event in self.rag.generate_stream(**request):
+            if first_event:
+                print(f"INFO: Pipeline czatu: pierwszy fragment po {(time.perf_counter() - start) * 1000:.0f} ms")
+                first_event = False
+            yield event
+        self._log_timing(start, request)
+
+    @staticmethod
+    def _log_timing(start: float, request: Dict[str, Any]):
+        print(f"INFO: Pipeline czatu: {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"(wyniki przed generowaniem: {'tak' if request.get('prefetched_results') is not None else 'nie'})")
+
+    def _prepare(
+        self,
+        user_input: str,
+        price_level: int,
+        max_distance_km: Optional[float]
+    ) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        Etapy przed generowaniem odpowiedzi (intencja, HyDE, lokalizacja, wyszukiwanie).
+
+        Returns:
+            Tuple (gotowa odpowiedź modelu lub None, argumenty dla generate_response / generate_stream)
+        """
+        self._count("requests")
+        submit = self._executor.submit
+        final_input = user_input + RESULTS_FORMAT_INSTRUCTION
+        slider_price = PRICE_LEVELS.get(price_level)
+
+        # Natychmiastowa analiza regułowa: pewna luźna rozmowa nie potrzebuje HyDE ani wyszukiwania,
+        # a pola z reguł (także przy niskiej pewności) są filtrami spekulatywnego wyszukiwania
+        intent_parser = getattr(self.rag, "intent_parser", None)
+        rule_hint = intent_parser.parse(user_input) if intent_parser is not None else {}
+        rules_chitchat = bool(rule_hint) and intent_parser.accepts(rule_hint) and rule_hint["intent"] == "chitchat"
+
+        # Offline gazetteer jest natychmiastowy – spaCy + Nominatim tylko gdy nic nie znalazł
+        gazetteer_location = self.location_service.lookup_gazetteer(user_input)
+
+        # 0. Semantyczny cache: wiadomość podobna do wcześniejszej, z tymi samymi filtrami, dostaje
+        #    gotową listę – bez analizy intencji, HyDE, geokodowania, wyszukiwania i rerankera
+        result_cache = getattr(self.rag, "result_cache", None)
+        cache_entry: Optional[tuple] = None
+        if result_cache is not None and not rules_chitchat:
+            cache_key = self._result_cache_key(rule_hint, gazetteer_location, slider_price, max_distance_km)
+            cache_vector = self.rag.vectorstore.encode_query(user_input)
+            cached = result_cache.lookup(cache_vector, cache_key)
+            if cached is not None:
+                return None, self._cached_request(final_input, max_distance_km, *cached)
+            cache_entry = (cache_vector, cache_key)
+
+        # 1. Równolegle: analiza intencji (LLM) i opis HyDE (LLM) – HyDE tylko, gdy to nie luźna rozmowa
+        intent_f = submit(self._analyze_intent, user_input)
+        hyde_f = None
+        if rules_chitchat:
+            self._count("skipped_stages")
+        else:
+            hyde_f = submit(self.rag.extract_search_query, final_input)
+
+        spacy_direct_f = None if gazetteer_location or rules_chitchat else submit(self._spacy_geocode, user_input)
+
+        # Spekulatywne wyszukiwanie na surowym zapytaniu – startuje od razu, równolegle z LLM
+        speculative_key: Optional[SearchKey] = None
+        speculative_f: Optional[Future] = None
+        if self.speculative_search and not rules_chitchat:
+            speculative_key = (
+                user_input, gazetteer_location, slider_price or rule_hint.get("price"),
+                rule_hint.get("cuisine"), max_distance_km
+            )
+            speculative_f = submit(self._search, speculative_key)
+        hyde_deadline = time.monotonic() + self.hyde_timeout
+
+        analysis = intent_f.result()
+
+        # Bezpośrednia odpowiedź modelu (chit-chat) – pozostałe etapy są zbędne
+        if analysis and analysis.get("direct_response"):
+            self._count("cancelled_stages", _cancel(hyde_f, spacy_direct_f, speculative_f))
+            self.rag.conversation_history.append({"role": "user", "content": user_input})
+            self.rag.conversation_history.append({"role": "assistant", "content": analysis["direct_response"]})
+            return analysis["direct_response"], {}
+
+        # Analiza nieudana (np. błąd 503) -> surowe zapytanie + spaCy, lokalizację ustali też generate_response
+        analysis_failed = not analysis
+        if analysis_failed:
+            print("Błąd analizy LLM - używam trybu awaryjnego (surowe zapytanie + spaCy)")
+            analysis = {}
+
+        if analysis.get("intent") == "chitchat":
+            self._count("cancelled_stages", _cancel(hyde_f, spacy_direct_f, speculative_f))
+            self.rag.set_user_location(None)
+            return None, dict(
+                user_message=user_input, k=self.k,
+                price_preference=slider_price or analysis.get("price"),
+                cuisine_filter=analysis.get("cuisine"),
+                search_query_override="",
+                max_distance_km=max_distance_km,
+                # Luźna rozmowa nie szuka lokali – lokalizacja (i jej normalizacja przez LLM) jest zbędna
+                resolve_location=False
+            )
+
+        # 2. Lokalizacja: gazetteer, a potem kandydaci geokodowani równolegle
+        user_location = gazetteer_location
+        if user_location:
+            self._count("cancelled_stages", _cancel(spacy_direct_f))
+        else:
+            candidates: List[Future] = []
+            detected_location_llm = analysis.get("location")
+            if detected_location_llm:
+                candidates.append(submit(self.location_service.geocode, detected_location_llm))
+                candidates.append(submit(self._spacy_geocode, detected_location_llm, detected_location_llm))
+            if spacy_direct_f is not None:
+                candidates.append(spacy_direct_f)
+            user_location, unneeded = self._first_found(candidates)
+            self._count("cancelled_stages", _cancel(*unneeded))
+        self.rag.set_user_location(user_location)
+
+        # 3. Parametry wyszukiwania (suwak ceny nadpisuje LLM)
+        price_preference = slider_price or analysis.get("price")
+        if slider_price:
+            print(f"INFO: Wymuszam cenę z suwaka: {price_preference}")
+        cuisine_filter = analysis.get("cuisine")
+        # Lokalizację ustali jeszcze generate_response (LLM), jeśli nie zrobił tego żaden etap
+        resolve_location = analysis_failed or not user_location
+
+        # 4. Spekulatywne wyszukiwanie (surowe zapytanie) zastępuje HyDE, gdy filtry się zgadzają,
+        #    a opis HyDE nie zdążył przed terminem; bez lokalizacji generate_response ustali ją jeszcze (LLM)
+        if hyde_f is None:
+            # Reguły uznały wiadomość za luźną rozmowę, a LLM nie – opis HyDE liczymy dopiero teraz
+            hyde_f = submit(self.rag.extract_search_query, final_input)
+        usable = (
+            speculative_f is not None and user_location
+            and speculative_key[1:] == (user_location, price_preference, cuisine_filter, max_distance_km)
+        )
+        prefetched = None
+        try:
+            search_query = hyde_f.result(timeout=max(0.0, hyde_deadline - time.monotonic()) if usable else None)
+        except FutureTimeoutError:
+            search_query = None
+        if hyde_f.done():
+            if speculative_f is not None:
+                self._count("speculative_misses")
+                self._count("cancelled_stages", _cancel(speculative_f))
+        else:
+            try:
+                prefetched = speculative_f.result()
+                search_query = user_input
+                self._count("speculative_hits")
+                print(f"INFO: Opis HyDE nie zdążył w {self.hyde_timeout:.1f} s – używam wyników dla surowego zapytania")
+            except Exception as e:
+                print(f"UWAGA: Spekulatywne wyszukiwanie nie powiodło się ({e}).")
+                search_query = hyde_f.result()
+
+        # 5. Z cache wyników wyszukiwanie idzie tutaj (nie w generate_response), aby zapisać listę
+        #    razem z ustalonym kontekstem; tylko gdy generate_response nie zmieni już lokalizacji
+        if cache_entry is not None and search_query and not resolve_location:
+            key = (search_query, user_location, price_preference, cuisine_filter, max_distance_km)
+            try:
+                if prefetched is None:
+                    prefetched = self._search(key)
+                if prefetched[0]:
+                    result_cache.put(*cache_entry, prefetched[0], prefetched[1], context=dict(
+                        user_location=user_location, search_query=search_query,
+                        price_preference=price_preference, cuisine_filter=cuisine_filter
+                    ))
+            except Exception as e:
+                print(f"UWAGA: Wyszukiwanie dla cache wyników nie powiodło się ({e}).")
+
+        return None, dict(
+            user_message=final_input,
+            k=self.k,
+            price_preference=price_preference,
+            cuisine_filter=cuisine_filter,
+            # HyDE już policzone – "" (brak zapytania) nie wywołuje go ponownie
+            search_query_override=search_query or "",
+            max_distance_km=max_distance_km,
+            resolve_location=resolve_location,
+            prefetched_results=prefetched
+        )
@@ -5,7 +5,7 @@ Profile konfiguracyjne dla różnych przypadków użycia.
 """
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Dict, Any
 
 
 @dataclass
@@ -20,6 +20,25 @@ class RAGConfig:
     top_k: int = 5
     embedding_file: str = "output_files/lodz_restaurants_cafes_embeddings_mean.jsonl"
     
+    # Vector index settings ("flat" = dokładny, "hnsw" / "ivfpq" / "sq8" = przybliżone)
+    index_backend: str = "flat"
+    hnsw_m: int = 32
+    ef_search: int = 64
+    ivf_nlist: Optional[int] = None
+    pq_m: int = 64
+    nprobe: int = 8
+    # Kandydaci do dokładnego przeliczenia (x k); None = domyślnie dla backendu (sq8: 4)
+    rescore_factor: Optional[int] = None
+
+    # Mikro-batching enkodera i rerankera między równoległymi żądaniami
+    micro_batching: bool = False
+    max_batch_size: int = 32
+    max_batch_wait_ms: float = 5.0
+
+    # Backend CPU modeli: "torch" (fp32), "torch-int8" lub "onnx-int8" (ONNX Runtime)
+    inference_backend: str = "torch"
+    onnx_quantization: str = "avx2"
+    
     # Conversation settings
     max_history: int = 10
     max_tokens: int = 500
@@ -31,6 +50,26 @@ class RAGConfig:
     def __repr__(self):
         return f"RAGConfig(model={self.model_name}, k={self.top_k}, history={self.max_history})"
 
+    def index_kwargs(self) -> Dict[str, Any]:
+        """Zwraca argumenty indeksu wektorowego dla `create_rag_system`."""
+        return {
+            "index_backend": self.index_backend,
+            "index_params": {"hnsw_m": self.hnsw_m, "nlist": self.ivf_nlist, "pq_m": self.pq_m},
+            "ef_search": self.ef_search,
+            "nprobe": self.nprobe,
+            "rescore_factor": self.rescore_factor,
+        }
+
+    def inference_kwargs(self) -> Dict[str, Any]:
+        """Zwraca argumenty inferencji modeli (mikro-batching, backend) dla `create_rag_system`."""
+        return {
+            "micro_batching": self.micro_batching,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_wait_ms": self.max_batch_wait_ms,
+            "inference_backend": self.inference_backend,
+            "onnx_quantization": self.onnx_quantization,
+        }
+
 
 # ============================================
 # PROFIL 1: DOMYŚLNY (Zbalansowany)
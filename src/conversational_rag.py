@@ -8,12 +8,29 @@ Używa modelu PLLuM do naturalnej konwersacji.
 import json
 import os
 import re
-from typing import List, Dict, Any, Optional, Callable
+import threading
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator, Tuple
 from datetime import datetime
 from math import radians, sin, cos, sqrt, atan2
 from dotenv import load_dotenv
-from math import radians, sin, cos, sqrt, atan2, log1p
-from .location_service import LocationService
+from .location_service import LocationService, get_location_service
+from .embedding_store import load_embeddings
+from .vector_index import (
+    default_rescore_factor, index_version, load_or_build_index, rescore_candidates, search_subset,
+    search_with_selector, SUBSET_SCAN_MAX_IDS
+)
+from .caching import (
+    QueryEmbeddingCache, RerankerScoreCache, SemanticResultCache, get_query_embedding_cache
+)
+from .ranking import rank_results, SCORE_WEIGHTS
+from .record_store import OpeningHours, build_record_columns, parse_price_range
+from .hours_index import OpenHoursIndex
+from .spatial_index import SpatialIndex
+from .cuisine_index import CuisineIndex
+from .intent_parser import IntentParser
+from .search_filters import combine_filters, price_mask
+from .inference_scheduler import InferenceScheduler, DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT_MS
+from .inference_backends import DEFAULT_ONNX_QUANTIZATION, load_reranker
 import urllib.parse
 
 load_dotenv()
@@ -31,6 +48,31 @@ def distance_km(lat1, lon1, lat2, lon2):
     return R * c
 
 
+# Frazy, od których model zaczyna pisać za użytkownika – odpowiedź jest w tym miejscu ucinana
+RESPONSE_STOP_PHRASES = ["Użytkownik:", "User:", "System:", "\nUżytkownik", "\nUser"]
+
+
+def _cut_at_stop_phrases(chunks: Iterable[str], stop_phrases: List[str] = RESPONSE_STOP_PHRASES) -> Iterator[str]:
+    """
+    Przepuszcza fragmenty strumienia aż do pierwszej frazy stopu. Końcówka bufora
+    (krótsza niż najdłuższa fraza) jest wstrzymywana, aby nie wysłać początku frazy
+    rozciętej między fragmenty.
+    """
+    holdback = max(len(p) for p in stop_phrases) - 1
+    buffer = ""
+    for chunk in chunks:
+        buffer += chunk
+        positions = [buffer.find(p) for p in stop_phrases if p in buffer]
+        if positions:
+            if min(positions):
+                yield buffer[:min(positions)]
+            return
+        if len(buffer) > holdback:
+            yield buffer[:-holdback]
+            buffer = buffer[-holdback:]
+    if buffer:
+        yield buffer
+
 
 class PLLuMLLM:
     """Klient LLM używający modelu PLLuM przez Hugging Face Inference API."""
@@ -83,6 +125,38 @@ class PLLuMLLM:
             print(f"Błąd podczas generowania odpowiedzi: {e}")
             return "Przepraszam, wystąpił problem z wygenerowaniem odpowiedzi."
 
+    def generate_stream(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7
+    ) -> Iterator[str]:
+        """
+        Jak `generate`, ale zwraca kolejne fragmenty odpowiedzi w miarę ich generowania
+        (Inference API, stream=True) – pierwszy fragment dociera po pierwszym tokenie.
+        """
+        produced = False
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                stop=["Użytkownik:", "User:", "\nUżytkownik", "\nUser"],
+                stream=True
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if text:
+                    produced = True
+                    yield text
+        except Exception as e:
+            print(f"Błąd podczas generowania odpowiedzi: {e}")
+            if not produced:
+                yield "Przepraszam, wystąpił problem z wygenerowaniem odpowiedzi."
+
 
 class ConversationalRAG:
     """
@@ -95,7 +169,9 @@ class ConversationalRAG:
         llm_client: PLLuMLLM,
         search_function: Callable,
         max_history: int = 10,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        location_service: Optional[LocationService] = None,
+        intent_parser: Optional[IntentParser] = None
     ):
         """
         Inicjalizacja systemu RAG.
@@ -105,6 +181,9 @@ class ConversationalRAG:
             search_function: Funkcja wyszukiwania restauracji
             max_history: Maksymalna liczba par w historii
             system_prompt: Opcjonalny własny prompt systemowy
+            location_service: Serwis lokalizacji (jeśli None, używa współdzielonej instancji procesu)
+            intent_parser: Regułowy parser intencji – pewne wyniki pomijają wywołanie LLM
+                w `analyze_user_intent` (None = zawsze LLM)
         """
         self.llm = llm_client
         self.search = search_function
@@ -115,7 +194,17 @@ class ConversationalRAG:
         
         # Domyślny prompt systemowy
         self.system_prompt = system_prompt or self._default_system_prompt()
-        self.location_service = LocationService()
+        self._location_service = location_service
+        self.intent_parser = intent_parser
+        self._intent_stats_lock = threading.Lock()
+        self._intent_stats = {"rules": 0, "llm": 0}
+
+    @property
+    def location_service(self) -> LocationService:
+        """Serwis lokalizacji – współdzielona instancja tworzona dopiero przy pierwszym użyciu."""
+        if self._location_service is None:
+            self._location_service = get_location_service()
+        return self._location_service
     
     def _default_system_prompt(self) -> str:
         """Zwraca domyślny prompt systemowy."""
@@ -151,11 +240,48 @@ Przykład formatu:
 
 Jeśli nie ma wyników, zapytaj o inne preferencje."""
     
+    def intent_stats(self) -> Dict[str, Any]:
+        """Ile analiz intencji obsłużyły reguły, a ile LLM (oraz udział reguł)."""
+        with self._intent_stats_lock:
+            stats = dict(self._intent_stats)
+        total = stats["rules"] + stats["llm"]
+        stats["rules_fraction"] = round(stats["rules"] / total, 4) if total else 0.0
+        return stats
+
+    def _count_intent(self, source: str):
+        with self._intent_stats_lock:
+            self._intent_stats[source] += 1
+
     def analyze_user_intent(self, user_message: str) -> Dict[str, Any]:
         """
         Analizuje intencję użytkownika w jednym zapytaniu (oszczędność API).
         Zwraca słownik z polami: location, cuisine, price, search_query.
+
+        Jeśli ustawiono `intent_parser`, najpierw próbowane są reguły (gazetteer, słowa
+        cenowe, słownik kuchni) – LLM jest wołany tylko przy niskiej pewności.
         """
+        if self.intent_parser is not None:
+            analysis = self.intent_parser.parse(user_message)
+            if self.intent_parser.accepts(analysis):
+                # Doprecyzowanie ("w centrum", "wszędzie") dziedziczy kuchnię z poprzedniej analizy, jak w LLM
+                if analysis["intent"] == "recommendation" and not analysis["cuisine"] and self.conversation_history:
+                    analysis["cuisine"] = self.user_preferences.get("cuisine")
+                print(f"INFO: Intencja z reguł (pewność {analysis['confidence']:.2f}) – pomijam LLM")
+                self._count_intent("rules")
+                self._remember_cuisine(analysis)
+                return analysis
+
+        self._count_intent("llm")
+        analysis = self._analyze_user_intent_llm(user_message)
+        self._remember_cuisine(analysis)
+        return analysis
+
+    def _remember_cuisine(self, analysis: Dict[str, Any]):
+        if analysis.get("intent") == "recommendation" and analysis.get("cuisine"):
+            self.user_preferences["cuisine"] = analysis["cuisine"]
+
+    def _analyze_user_intent_llm(self, user_message: str) -> Dict[str, Any]:
+        """Analiza intencji przez LLM (odpowiedź JSON)."""
         history_text = ""
         if self.conversation_history:
              # Bierzemy ostatnie 4 wymiany zdań dla kontekstu
@@ -444,74 +570,67 @@ User: "coś w średniej cenie" -> Assistant: "40-80" """
         if not results:
             return ""
         
-        # Logowanie szczegółowych informacji do konsoli (dla inżyniera)
-        print("\n--- SZCZEGÓŁY ZNALEZIONYCH MIEJSC ---")
-        for i, r in enumerate(results[:5], 1):
-            print(f"{i}. {r['name']} (Score: {r.get('final_score', r.get('semantic_score', 0.0)):.2f})")
-            print(f"   Adres pełny: {r.get('address')}")
-            print(f"   Opis: {r.get('context', '')[:100]}...")
-        print("---------------------------------------\n")
+        self._log_search_results(results)
+        return "".join(self._format_result_card(i, r) for i, r in enumerate(results[:5], 1))
 
-        formatted = ""
-        for i, r in enumerate(results[:5], 1):
-            # Używamy tagów HTML <b>, ponieważ app.py nie parsuje markdowna **
-            formatted += f"{i}. <b>{r['name']}</b>\n"
-            
-            types = r.get('type', [])
-            if types:
-                types_str = ", ".join(types) if isinstance(types, list) else str(types)
-                formatted += f"   <b>Kuchnia/Typ:</b> {types_str}\n"
-            
-            address = r.get('address')
-            if address:
-                # Inteligentne skracanie adresu
-                parts = [p.strip() for p in address.split(',')]
-                # Jeśli pierwsza część to tylko numer (np. "26, Kasprzaka..."), bierzemy też drugą
-                if len(parts) > 1 and (parts[0].isdigit() or len(parts[0]) < 3):
-                    simple_address = f"{parts[1]} {parts[0]}" # Format: Ulica Numer
-                else:
-                    simple_address = parts[0]
-                
-                # Link do Google Maps
-                encoded_addr = urllib.parse.quote(f"{simple_address}, Łódź")
-                formatted += f"   <b>Adres:</b> <a href='https://www.google.com/maps/search/?api=1&query={encoded_addr}' target='_blank' style='text-decoration: none; color: #0366d6;'>{simple_address}</a>"
-                
-                dist = r.get('distance_km')
-                if dist is not None and dist != float('inf'):
-                    formatted += f" <span style='color: #6c757d; font-size: 0.9em;'>({dist:.2f} km)</span>"
-                formatted += "\n"
-            
-            rating = r.get('google_rating')
-            reviews = r.get('google_reviews_total')
-            if rating:
-                color = "#28a745"
-                rating_display = str(rating)
-                try:
-                    rating_float = float(rating)
-                    if rating_float < 4.0: color = "#dc3545"
-                    elif rating_float < 4.5: color = "#fd7e14"
-                    rating_display = f"{rating_float:.1f}"
-                except: pass
-                formatted += f"   <b>Ocena:</b> <span style='color: {color}; font-weight: bold;'>{rating_display}/5.0</span> ({reviews} opinii)\n"
-            
-            price = r.get('google_price_range')
-            if price:
-                # Nie dodawaj "zł" jeśli cena jest w formacie $
-                if '$' in str(price):
-                    formatted += f"   <b>Cena:</b> {price}\n"
-                else:
-                    formatted += f"   <b>Cena:</b> {price} zł\n"
-            
-            # Dodanie godzin otwarcia
-            opening_hours = r.get('opening_hours')
-            if opening_hours:
-                formatted += self._format_opening_hours_html(opening_hours) + "\n"
+    def _format_result_card(self, i: int, r: Dict) -> str:
+        """Formatuje jedną pozycję listy wyników (HTML z nowymi liniami)."""
+        # Używamy tagów HTML <b>, ponieważ app.py nie parsuje markdowna **
+        formatted = f"{i}. <b>{r['name']}</b>\n"
+        
+        types = r.get('type', [])
+        if types:
+            types_str = ", ".join(types) if isinstance(types, list) else str(types)
+            formatted += f"   <b>Kuchnia/Typ:</b> {types_str}\n"
+        
+        address = r.get('address')
+        if address:
+            # Inteligentne skracanie adresu
+            parts = [p.strip() for p in address.split(',')]
+            # Jeśli pierwsza część to tylko numer (np. "26, Kasprzaka..."), bierzemy też drugą
+            if len(parts) > 1 and (parts[0].isdigit() or len(parts[0]) < 3):
+                simple_address = f"{parts[1]} {parts[0]}" # Format: Ulica Numer
+            else:
+                simple_address = parts[0]
             
-            # Usunięto opis (kontekst) i dopasowanie z widoku użytkownika
+            # Link do Google Maps
+            encoded_addr = urllib.parse.quote(f"{simple_address}, Łódź")
+            formatted += f"   <b>Adres:</b> <a href='https://www.google.com/maps/search/?api=1&query={encoded_addr}' target='_blank' style='text-decoration: none; color: #0366d6;'>{simple_address}</a>"
             
+            dist = r.get('distance_km')
+            if dist is not None and dist != float('inf'):
+                formatted += f" <span style='color: #6c757d; font-size: 0.9em;'>({dist:.2f} km)</span>"
+            formatted += "\n"
+        
+        rating = r.get('google_rating')
+        reviews = r.get('google_reviews_total')
+        if rating:
+            color = "#28a745"
+            rating_display = str(rating)
+            try:
+                rating_float = float(rating)
+                if rating_float < 4.0: color = "#dc3545"
+                elif rating_float < 4.5: color = "#fd7e14"
+                rating_display = f"{rating_float:.1f}"
+            except: pass
+            formatted += f"   <b>Ocena:</b> <span style='color: {color}; font-weight: bold;'>{rating_display}/5.0</span> ({reviews} opinii)\n"
+        
+        price = r.get('google_price_range')
+        if price:
+            # Nie dodawaj "zł" jeśli cena jest w formacie $
+            if '$' in str(price):
+                formatted += f"   <b>Cena:</b> {price}\n"
+            else:
+                formatted += f"   <b>Cena:</b> {price} zł\n"
+        
+        # Dodanie godzin otwarcia
+        opening_hours = r.get('opening_hours')
+        if opening_hours:
+            formatted += self._format_opening_hours_html(opening_hours) + "\n"
+        # Usunięto opis (kontekst) i dopasowanie z widoku użytkownika
         return formatted
     
-    def generate_response(self, user_message: str, k: int = 5, price_preference: Optional[str] = None, cuisine_filter: Optional[str] = None, search_query_override: Optional[str] = None) -> str:
+    def generate_response(self, user_message: str, k: int = 5, price_preference: Optional[str] = None, cuisine_filter: Optional[str] = None, search_query_override: Optional[str] = None, max_distance_km: Optional[float] = None, resolve_location: bool = True, prefetched_results: Optional[Tuple[List[Dict], List[str]]] = None) -> str:
         """
         Generuje odpowiedź łącząc konwersację LLM z wynikami wyszukiwania (bez ingerencji LLM w wyniki).
         
@@ -521,10 +640,57 @@ User: "coś w średniej cenie" -> Assistant: "40-80" """
             price_preference: Preferencje cenowe
             cuisine_filter: Filtr kuchni
             search_query_override: Opcjonalne wymuszenie zapytania wyszukiwania
+            max_distance_km: Maksymalna odległość lokalu od lokalizacji użytkownika (km)
+            resolve_location: Czy przy braku lokalizacji pytać LLM (normalize_location) – wyłączane,
+                gdy lokalizację ustalił już wywołujący (np. z analizy intencji)
+            prefetched_results: Wyniki `search` policzone wcześniej dla tych samych parametrów
+                (wyniki, poluzowane filtry) – wtedy wyszukiwanie nie jest powtarzane
         
         Returns:
             Odpowiedź asystenta
         """
+        return "".join(event["text"] for event in self._response_events(
+            user_message, k, price_preference, cuisine_filter, search_query_override,
+            max_distance_km, resolve_location, prefetched_results, stream=False
+        ))
+
+    def generate_stream(self, user_message: str, k: int = 5, price_preference: Optional[str] = None, cuisine_filter: Optional[str] = None, search_query_override: Optional[str] = None, max_distance_km: Optional[float] = None, resolve_location: bool = True, prefetched_results: Optional[Tuple[List[Dict], List[str]]] = None) -> Iterator[Dict[str, str]]:
+        """
+        Strumieniowa wersja `generate_response` (te same argumenty) – zwraca zdarzenia w miarę ich powstawania:
+
+        - {"type": "card", "text": ...}    – jedna pozycja listy wyników (HTML), zaraz po rankingu,
+        - {"type": "token", "text": ...}   – kolejny fragment odpowiedzi LLM (Inference API, stream=True),
+        - {"type": "message", "text": ...} – fragment gotowy w całości (np. pytanie o lokalizację).
+
+        Sklejone pola "text" dają odpowiedź asystenta; historia jest aktualizowana po ostatnim zdarzeniu.
+        """
+        return self._response_events(
+            user_message, k, price_preference, cuisine_filter, search_query_override,
+            max_distance_km, resolve_location, prefetched_results, stream=True
+        )
+
+    def _log_search_results(self, results: List[Dict]):
+        """Logowanie szczegółowych informacji o wynikach do konsoli (dla inżyniera)."""
+        print("\n--- SZCZEGÓŁY ZNALEZIONYCH MIEJSC ---")
+        for i, r in enumerate(results[:5], 1):
+            print(f"{i}. {r['name']} (Score: {r.get('final_score', r.get('semantic_score', 0.0)):.2f})")
+            print(f"   Adres pełny: {r.get('address')}")
+            print(f"   Opis: {r.get('context', '')[:100]}...")
+        print("---------------------------------------\n")
+
+    def _response_events(
+        self,
+        user_message: str,
+        k: int,
+        price_preference: Optional[str],
+        cuisine_filter: Optional[str],
+        search_query_override: Optional[str],
+        max_distance_km: Optional[float],
+        resolve_location: bool,
+        prefetched_results: Optional[Tuple[List[Dict], List[str]]],
+        stream: bool
+    ) -> Iterator[Dict[str, str]]:
+        """Wspólna logika `generate_response` i `generate_stream` (generator zdarzeń)."""
         # 1. Określenie zapytania wyszukiwania
         if search_query_override is not None:
              search_query = search_query_override
@@ -532,7 +698,7 @@ User: "coś w średniej cenie" -> Assistant: "40-80" """
              search_query = self.extract_search_query(user_message)
         
         # Automatyczne wykrywanie lokalizacji i geokodowanie
-        if not self.user_location:
+        if resolve_location and not self.user_location:
             detected_loc = self.normalize_location(user_message)
             if detected_loc:
                 coords = self.location_service.geocode(detected_loc)
@@ -555,43 +721,48 @@ User: "coś w średniej cenie" -> Assistant: "40-80" """
             # Obsługa odpowiedzi twierdzącej (użytkownik chce podać lokalizację, ale jeszcze jej nie wpisał)
             is_yes = user_msg_lower in ["tak", "tak.", "poproszę", "chcę", "jasne", "pewnie"] or user_msg_lower.startswith("tak ")
             if is_yes:
-                return "Gdzie dokładnie mam szukać? Podaj dzielnicę, ulicę lub punkt orientacyjny."
+                yield {"type": "message", "text": "Gdzie dokładnie mam szukać? Podaj dzielnicę, ulicę lub punkt orientacyjny."}
+                return
 
             if not (is_no or any(k in user_msg_lower for k in skip_keywords)):
-                return "Czy szukasz lokalu w konkretnej części Łodzi, rejonie lub obok jakiegoś miejsca? Jeśli tak, napisz gdzie (np. 'blisko Manufaktury'). Jeśli nie, napisz 'wszędzie'."
+                yield {"type": "message", "text": "Czy szukasz lokalu w konkretnej części Łodzi, rejonie lub obok jakiegoś miejsca? Jeśli tak, napisz gdzie (np. 'blisko Manufaktury'). Jeśli nie, napisz 'wszędzie'."}
+                return
 
         if search_query:
             try:
-                search_results = self.search(
-                    search_query, k=k, user_location=self.user_location,
-                    price_preference=price_preference,
-                    cuisine_filter=cuisine_filter
-                )
-                
-                # SMART FALLBACK: Jeśli brak wyników, a była preferencja ceny, spróbuj bez niej
-                if not search_results and price_preference:
-                    print(f"INFO: Brak wyników dla ceny '{price_preference}'. Próbuję znaleźć cokolwiek...")
+                # Ograniczenia są nakładane przed wyszukiwaniem wektorowym; jeśli za mało lokali
+                # spełnia preferencję ceny, search pomija ją (lub dopełnia nią listę) i zgłasza to tutaj
+                if prefetched_results is not None:
+                    search_results, relaxed_filters = prefetched_results
+                else:
+                    relaxed_filters: List[str] = []
                     search_results = self.search(
                         search_query, k=k, user_location=self.user_location,
-                        price_preference=None, # Usuwamy filtr ceny
-                        cuisine_filter=cuisine_filter
+                        price_preference=price_preference,
+                        cuisine_filter=cuisine_filter,
+                        max_distance_km=max_distance_km,
+                        relaxed_filters=relaxed_filters
                     )
-                    if search_results:
-                        relaxed_constraints = True
+                relaxed_constraints = bool(search_results) and "price" in relaxed_filters
 
             except Exception as e:
                 print(f"Błąd wyszukiwania: {e}")
 
         # 2. Generowanie odpowiedzi
         if search_results:
-            # A. Formatowanie wyników (Python) - czysta lista bez ingerencji LLM
-            results_text = self._format_search_results(search_results)
+            # A. Formatowanie wyników (Python) - czysta lista bez ingerencji LLM,
+            #    każda pozycja wysyłana od razu po rankingu
+            self._log_search_results(search_results)
+            parts = []
             
             # B. Zwracamy TYLKO wyniki, bez wstępu LLM (zgodnie z życzeniem)
             if relaxed_constraints:
-                response = "Nie znalazłem miejsc w tej cenie, ale oto inne propozycje:\n\n" + results_text
-            else:
-                response = results_text
+                parts.append("Nie znalazłem miejsc w tej cenie, ale oto inne propozycje:\n\n")
+                yield {"type": "message", "text": parts[-1]}
+            for i, r in enumerate(search_results[:5], 1):
+                parts.append(self._format_result_card(i, r))
+                yield {"type": "card", "text": parts[-1]}
+            response = "".join(parts)
             
         else:
             # Brak wyników lub chitchat - LLM przejmuje pałeczkę
@@ -600,18 +771,25 @@ User: "coś w średniej cenie" -> Assistant: "40-80" """
             messages.extend(self.conversation_history[history_start:])
             messages.append({"role": "user", "content": user_message})
             
-            response = self.llm.generate(messages, max_tokens=300, temperature=0.7)
-            
-            # Czyszczenie odpowiedzi LLM
-            for stop_phrase in ["Użytkownik:", "User:", "System:", "\nUżytkownik", "\nUser"]:
-                if stop_phrase in response:
-                    response = response.split(stop_phrase)[0].strip()
+            if stream:
+                # Tokeny trafiają do klienta od razu; fraza stopu ucina strumień
+                parts = []
+                for chunk in _cut_at_stop_phrases(self.llm.generate_stream(messages, max_tokens=300, temperature=0.7)):
+                    parts.append(chunk)
+                    yield {"type": "token", "text": chunk}
+                response = "".join(parts).strip()
+            else:
+                response = self.llm.generate(messages, max_tokens=300, temperature=0.7)
+                
+                # Czyszczenie odpowiedzi LLM
+                for stop_phrase in RESPONSE_STOP_PHRASES:
+                    if stop_phrase in response:
+                        response = response.split(stop_phrase)[0].strip()
+                yield {"type": "message", "text": response}
         
         # Zaktualizuj historię
         self.conversation_history.append({"role": "user", "content": user_message})
         self.conversation_history.append({"role": "assistant", "content": response})
-        
-        return response
     
     def clear_history(self):
         """Czyści historię konwersacji."""
@@ -674,47 +852,33 @@ def _is_open_now(opening_hours: Optional[Dict[str, str]]) -> bool:
     if not opening_hours or not isinstance(opening_hours, dict):
         return True  # Zakładamy, że otwarte, jeśli brak danych, by nie odrzucać
 
-    now = datetime.now()
-    # Python's weekday(): Monday is 0 and Sunday is 6
-    day_map = {
-        0: "poniedziałek", 1: "wtorek", 2: "środa", 3: "czwartek",
-        4: "piątek", 5: "sobota", 6: "niedziela"
-    }
-    day_name_pl = day_map[now.weekday()]
-
-    # Znajdź godziny dla dzisiejszego dnia
-    hours_today_str = opening_hours.get(day_name_pl) or opening_hours.get(day_name_pl.capitalize())
-
-    if not hours_today_str or hours_today_str.lower() in ['zamknięte', 'closed']:
-        return False
-
-    if 'całą dobę' in hours_today_str.lower() or '24 hours' in hours_today_str.lower():
-        return True
-
-    # Przetwarzanie przedziałów czasowych, np. "12:00–22:00"
-    time_ranges = re.findall(r'(\d{1,2}:\d{2})[–-](\d{1,2}:\d{2})', hours_today_str)
-
-    if not time_ranges:
-        return True  # Zakładamy, że otwarte, jeśli nie uda się sparsować
-
-    current_time = now.time()
-
-    for open_str, close_str in time_ranges:
-        try:
-            open_time = datetime.strptime(open_str, "%H:%M").time()
-            close_time = datetime.strptime(close_str, "%H:%M").time()
-
-            if (open_time <= close_time and open_time <= current_time <= close_time) or \
-               (open_time > close_time and (current_time >= open_time or current_time <= close_time)):
-                return True
-        except ValueError:
-            continue  # Ignoruj błędnie sformatowane przedziały
-    return False
+    # Rekordy z magazynu mają godziny sparsowane przy wczytywaniu (OpeningHours);
+    # zwykły słownik (np. z testów) kompilujemy na miejscu
+    if not isinstance(opening_hours, OpeningHours):
+        opening_hours = OpeningHours(opening_hours)
+    return opening_hours.is_open()
 
 def create_rag_system(
     embeddings_file: str = "output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl",
     pooling_type: str | None = "cls",
-    embedding_model_name: str = "sdadas/mmlw-retrieval-roberta-large" # sdadas/stella-pl-retrieval
+    embedding_model_name: str = "sdadas/mmlw-retrieval-roberta-large", # sdadas/stella-pl-retrieval
+    use_index_cache: bool = True,
+    index_backend: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None,
+    ef_search: int = 64,
+    nprobe: int = 8,
+    rescore_factor: Optional[int] = None,
+    location_service: Optional[LocationService] = None,
+    query_cache: Optional[QueryEmbeddingCache] = None,
+    reranker_cache: Optional[RerankerScoreCache] = None,
+    micro_batching: bool = False,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_batch_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    inference_backend: str = "torch",
+    onnx_quantization: str = DEFAULT_ONNX_QUANTIZATION,
+    intent_fast_path: bool = True,
+    semantic_cache: bool = False,
+    result_cache: Optional[SemanticResultCache] = None
 ):
     """
     Tworzy kompletny system RAG z wczytanymi embeddingami.
@@ -723,15 +887,33 @@ def create_rag_system(
         embeddings_file: Ścieżka do pliku z embeddingami
         pooling_type: "cls" lub "mean", jeśli None – wykrywa automatycznie
         embedding_model_name: Nazwa modelu embeddingów z Hugging Face.
+        use_index_cache: Czy wczytywać/zapisywać zbudowany indeks FAISS na dysku.
+        index_backend: Typ indeksu: "flat" (dokładny), "hnsw", "ivfpq" lub "sq8" (przybliżone).
+        index_params: Parametry budowy indeksu (hnsw_m, ef_construction, nlist, pq_m).
+        ef_search: efSearch dla backendu HNSW (dokładność vs szybkość).
+        nprobe: Liczba przeszukiwanych list dla backendu IVF-PQ.
+        rescore_factor: Ile razy więcej kandydatów pobrać z indeksu przed dokładnym przeliczeniem
+            (float32, wiersze macierzy embeddingów); None – domyślnie dla backendu (sq8: 4, pozostałe: 1 = wyłączone).
+        location_service: Serwis lokalizacji do współdzielenia z wywołującym (domyślnie: instancja procesu).
+        query_cache: Cache embeddingów zapytań (domyślnie: współdzielony cache procesu).
+        reranker_cache: Cache wyników rerankera (domyślnie: nowy cache dla tego systemu).
+        micro_batching: Czy łączyć wywołania enkodera i rerankera z równoległych żądań w paczki.
+        max_batch_size: Maksymalna liczba zapytań w paczce enkodera (reranker: 8x tyle par).
+        max_batch_wait_ms: Maksymalne oczekiwanie na kolejne żądania do paczki (ms).
+        inference_backend: Backend CPU enkodera i rerankera: "torch", "torch-int8" lub "onnx-int8".
+        onnx_quantization: Zestaw instrukcji kwantyzacji ONNX ("avx2", "avx512", "avx512_vnni", "arm64").
+        intent_fast_path: Czy analizować intencję regułami (gazetteer, ceny, kuchnie) przed wywołaniem LLM.
+        semantic_cache: Czy tworzyć semantyczny cache wyników (`rag.result_cache`), którego używa
+            `ChatPipeline`: wiadomość podobna do wcześniejszej (te same filtry) dostaje gotową listę
+            bez analizy intencji, geokodowania, wyszukiwania wektorowego i rerankera.
+        result_cache: Cache wyników do współdzielenia (domyślnie: nowy, gdy semantic_cache=True).
 
     Returns:
         Tuple (ConversationalRAG, search_function)
     """
     import numpy as np
-    import faiss
     import json
     from .embedding_model import ModelMeanPooling
-    from sentence_transformers import CrossEncoder
 
     print("Ładowanie modelu i embeddingów...")
 
@@ -744,231 +926,209 @@ def create_rag_system(
     print(f"INFO: Inicjalizuję model wykonawczy | pooling='{pooling_strategy}'")
 
     # 2. Wczytanie embeddingów z pliku
-    records = []
-    embeddings = []
-
-    with open(embeddings_file, "r", encoding="utf-8") as f:
-        for line in f:
-            rec = json.loads(line)
-            records.append(rec)
-            embeddings.append(np.array(rec["embedding"], dtype="float32"))
-
-    embeddings = np.vstack(embeddings)
+    # Format skompilowany (.npy + .meta.jsonl) jest używany automatycznie, jeśli jest aktualny
+    records, embeddings = load_embeddings(embeddings_file)
     n_samples, embedding_dim = embeddings.shape
 
     print(f"Załadowano {n_samples} embeddingów o wymiarze {embedding_dim}")
 
+    # Kolumny NumPy (lat/lon, ocena, opinie, cena) liczone raz – ranking tylko indeksuje tablice
+    record_columns = build_record_columns(records)
+    # Godziny otwarcia wszystkich lokali jako jedna macierz bitowa (minuta tygodnia)
+    hours_index = OpenHoursIndex(records)
+    # KD-drzewo nad współrzędnymi – kandydaci "w promieniu X km" bez skanowania całego miasta
+    spatial_index = SpatialIndex(record_columns["lat"], record_columns["lon"])
+    # Indeks odwrócony kuchni/typów (Google + OSM + synonimy) -> bitmapy rekordów
+    cuisine_index = CuisineIndex(records)
+
     # 3. Inicjalizacja modelu do enkodowania zapytań
     model_wrapper = ModelMeanPooling(
         embedding_model_name,
         word_embedding_dimension=embedding_dim,
-        pooling_strategy=pooling_strategy
+        pooling_strategy=pooling_strategy,
+        backend=inference_backend,
+        onnx_quantization=onnx_quantization
     )
     print("Pooling strategy:", model_wrapper.pooling_strategy)
+    print(f"INFO: Backend inferencji enkodera: {model_wrapper.backend}")
     model_dim = model_wrapper.model.get_sentence_embedding_dimension()
 
     if model_dim != embedding_dim:
         print(f"UWAGA: Wymiar modelu ({model_dim}) nie zgadza się z wymiarem embeddingów ({embedding_dim})")
 
-    # 4. Normalizacja embeddingów i indeks FAISS
-    faiss.normalize_L2(embeddings)
-    index = faiss.IndexFlatIP(embedding_dim)
-    index.add(embeddings)
-    print(f"Indeks gotowy! Liczba restauracji: {index.ntotal}")
+    # 4. Normalizacja embeddingów i indeks FAISS (z cache na dysku, jeśli dostępny)
+    index = load_or_build_index(
+        embeddings_file, embeddings,
+        model_name=embedding_model_name,
+        pooling=pooling_strategy,
+        backend=index_backend,
+        index_params=index_params,
+        ef_search=ef_search,
+        nprobe=nprobe,
+        use_cache=use_index_cache
+    )
+    print(f"Indeks gotowy ({index_backend})! Liczba restauracji: {index.ntotal}")
+    if rescore_factor is None:
+        rescore_factor = default_rescore_factor(index_backend)
+    if rescore_factor > 1:
+        print(f"INFO: Dokładne przeliczanie {rescore_factor}x k kandydatów indeksu (float32)")
 
     # 4a. Inicjalizacja Rerankera (Cross-Encoder)
     print("Ładowanie modelu rerankera...")
     # Używamy dedykowanego polskiego rerankera od sdadas (wersja v2)
-    reranker = CrossEncoder('sdadas/polish-reranker-roberta-v2', trust_remote_code=True)
+    reranker = load_reranker(inference_backend, quantization=onnx_quantization)
+    # Te same pary (zapytanie, lokal) wracają przy retry bez filtra ceny i popularnych zapytaniach
+    if reranker_cache is None:
+        reranker_cache = RerankerScoreCache()
+
+    # Mikro-batching: równoległe żądania (wątki serwera) dzielą jeden przebieg modelu
+    scheduler = None
+    if micro_batching:
+        scheduler = InferenceScheduler(
+            encode_fn=lambda texts: model_wrapper.encode(texts, normalize=True),
+            rerank_fn=reranker.predict,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_batch_wait_ms
+        )
+        print(f"INFO: Mikro-batching włączony (paczka do {max_batch_size}, okno {max_batch_wait_ms} ms)")
+        encode_query = scheduler.encode
+        predict_pairs = scheduler.rerank
+    else:
+        encode_query = lambda text: model_wrapper.encode(text, normalize=True)
+        predict_pairs = reranker.predict
 
     query_prefix = "zapytanie: "
 
+    # Powtarzane zapytania (retry bez filtra ceny, ewaluacje) nie przechodzą ponownie przez transformer
+    if query_cache is None:
+        query_cache = get_query_embedding_cache()
+    # Wektory z modelu skwantyzowanego różnią się od fp32 – osobne klucze w cache
+    cache_model_key = embedding_model_name if model_wrapper.backend == "torch" else f"{embedding_model_name}@{model_wrapper.backend}"
+
     # 5. Obiekt wektorowy z metodą wyszukiwania
+    class Document:
+        def __init__(self, page_content, metadata):
+            self.page_content = page_content
+            self.metadata = metadata
+
     class SimpleVectorStore:
-        def similarity_search_with_score(self, query: str, k: int = 5):
-            full_query = query_prefix + query
-            q_emb = model_wrapper.encode(full_query, normalize=True)
-            q_emb = np.array(q_emb, dtype="float32").reshape(1, -1)
+        def encode_query(self, query: str) -> np.ndarray:
+            """Znormalizowany embedding zapytania [1, dim] (z cache embeddingów zapytań)."""
+            return query_cache.get_or_encode(
+                cache_model_key, pooling_strategy, query_prefix + query, encode_query
+            ).reshape(1, -1)
+
+        def search_ids(self, query: str, k: int = 5, allowed_ids: Optional[np.ndarray] = None):
+            """
+            Zwraca (podobieństwa, indeksy rekordów) dla k najbliższych wektorów.
+
+            Jeśli podano `allowed_ids`, wyszukiwanie obejmuje tylko te rekordy: mały
+            podzbiór jest liczony dokładnie na wierszach macierzy, większy – w indeksie
+            FAISS z selektorem ID.
+            """
+            if allowed_ids is not None and not len(allowed_ids):
+                return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+            q_emb = self.encode_query(query)
 
             # Bezpieczny check wymiaru
             assert q_emb.shape[1] == embedding_dim, (
                 f"Embedding mismatch: query={q_emb.shape[1]} index={embedding_dim}"
             )
 
-            scores, idxs = index.search(q_emb, k)
-
-            class Document:
-                def __init__(self, page_content, metadata):
-                    self.page_content = page_content
-                    self.metadata = metadata
+            if allowed_ids is not None and len(allowed_ids) <= SUBSET_SCAN_MAX_IDS:
+                return search_subset(embeddings, q_emb, k, allowed_ids)
+            # Indeks kwantyzowany zwraca szerszą pulę kandydatów do dokładnego przeliczenia
+            fetch_k = k * rescore_factor if rescore_factor > 1 else k
+            if allowed_ids is not None:
+                scores, idxs = search_with_selector(index, q_emb, fetch_k, allowed_ids)
+            else:
+                scores, idxs = index.search(q_emb, fetch_k)
+            # Indeksy przybliżone mogą zwrócić mniej niż k wyników (id = -1)
+            valid = idxs[0] >= 0
+            if allowed_ids is not None and valid.sum() < min(k, len(allowed_ids)):
+                # Graf HNSW / listy IVF z selektorem nie dotarły do k dozwolonych rekordów –
+                # dokładny skan podzbioru gwarantuje pełną pulę w tym samym przebiegu
+                return search_subset(embeddings, q_emb, k, allowed_ids)
+            if rescore_factor > 1:
+                return rescore_candidates(embeddings, q_emb, k, idxs[0][valid])
+            return scores[0][valid], idxs[0][valid]
 
+        def similarity_search_with_score(self, query: str, k: int = 5):
+            scores, idxs = self.search_ids(query, k)
             results = []
-            for score, idx in zip(scores[0], idxs[0]):
+            for score, idx in zip(scores, idxs):
                 rec = records[idx]
-                doc = Document(page_content=rec.get("name"), metadata=rec)
+                # Świeży słownik na wynik – modyfikacje w testach nie psują magazynu rekordów
+                doc = Document(page_content=rec.name, metadata=rec.to_dict())
                 results.append((doc, float(score)))
             return results
 
     vector_store = SimpleVectorStore()
 
     # 6. Funkcja wyszukiwania i re-rankingu dla agenta
-    def search(
+    # Semantyczny cache gotowych list rankingowych (sprawdza go ChatPipeline przed analizą
+    # intencji, kluczem jest embedding wiadomości użytkownika); wersja indeksu unieważnia stare wpisy
+    if semantic_cache and result_cache is None:
+        result_cache = SemanticResultCache()
+    if result_cache is not None:
+        result_cache.set_index_version(index_version(
+            embeddings_file, embedding_model_name, pooling_strategy, index_backend, index_params,
+            ef_search=ef_search, nprobe=nprobe, rescore_factor=rescore_factor,
+            inference_backend=model_wrapper.backend
+        ))
+        print(f"INFO: Semantyczny cache wyników włączony (próg cosinusa {result_cache.similarity_threshold})")
+
+    def retrieve_and_rank(
         query: str,
-        k: int = 5,
-        user_location: Optional[tuple] = None,
-        price_preference: Optional[str] = None,
-        cuisine_filter: Optional[str] = None
-    ):
-        """
-        Wyszukuje, deduplikuje i re-rankuje restauracje, łącząc podobieństwo
-        łącząc podobieństwo semantyczne z ocenami, popularnością i odległością.
-
-        Args:
-            query (str): Zapytanie użytkownika.
-            k (int): Liczba wyników do zwrócenia.
-            user_location (tuple, optional): Krotka (lat, lon) lokalizacji użytkownika.
-            price_preference (str, optional): Preferowany przedział cenowy do filtrowania.
-            cuisine_filter (str, optional): Typ kuchni do filtrowania (np. "azjatycka").
-        """
-        # Krok 1: Wyszukaj semantycznie większą pulę kandydatów
-        # Jeśli mamy filtr kuchni, pobieramy znacznie więcej kandydatów, aby mieć co filtrować
-        # (np. 100 zamiast 25 dla k=5), bo azjatyckie mogą być dalej na liście semantycznej
-        initial_k = k * 20 if cuisine_filter else k * 10  # Zwiększamy pulę dla rerankera
-        docs_with_scores = vector_store.similarity_search_with_score(query, k=initial_k)
+        k: int,
+        initial_k: int,
+        allowed_ids: Optional[np.ndarray],
+        user_location: Optional[tuple]
+    ) -> List[Dict]:
+        """Wyszukiwanie wektorowe wśród `allowed_ids`, reranking, próg 0.15 i ranking końcowy."""
+        # Krok 1: Wyszukaj semantycznie większą pulę kandydatów (tylko wśród dozwolonych ID)
+        scores, idxs = vector_store.search_ids(query, k=initial_k, allowed_ids=allowed_ids)
 
         # Krok 2: Odrzuć duplikaty i przygotuj listę do dalszego przetwarzania
         unique_results = {}
-        for doc, score in docs_with_scores:
-            rec = doc.metadata
-            name = rec.get("name")
+        for score, idx in zip(scores, idxs):
+            rec = records[idx]
+            name = rec.name
             name_key = name.strip().lower() if name else "" # Normalizacja nazwy dla deduplikacji
             if name_key and name_key not in unique_results:
-                key_words_data = rec.get("key_words", {})
-                
-                # Pobieranie danych z korzenia rekordu (priorytet) lub z key_words (fallback)
-                rating = rec.get("google_rating") or key_words_data.get("google_rating")
-                reviews = rec.get("google_reviews_total") or key_words_data.get("google_reviews_total")
-                price_range = rec.get("google_price_range") or key_words_data.get("google_price_range")
-                opening_hours = rec.get("opening_hours") or key_words_data.get("opening_hours")
-
                 unique_results[name_key] = {
-                    "semantic_score": score,
+                    "semantic_score": float(score),
+                    "record_idx": int(idx),
+                    "oms_id": rec.oms_id,
                     "name": name,
-                    "type": key_words_data.get("types") or rec.get("types") or [],
-                    "address": key_words_data.get("address"),
-                    "coords": rec.get("Współrzędne"),
-                    "google_rating": rating,
-                    "google_reviews_total": reviews,
-                    "google_price_range": price_range,
-                    "opening_hours": opening_hours,
-                    "context": rec.get("context") or key_words_data.get("context"),
+                    "type": list(rec.types),
+                    "address": rec.address,
+                    "coords": rec.coords,
+                    "google_rating": rec.google_rating,
+                    "google_reviews_total": rec.google_reviews_total,
+                    "google_price_range": rec.google_price_range,
+                    "opening_hours": rec.opening_hours,
+                    "context": rec.context,
                     "distance_km": float('inf'),
                     "final_score": 0.0
                 }
 
         processed_results = list(unique_results.values())
 
-        # Krok 2a: Filtrowanie po typie kuchni (jeśli podano) - PRIORYTETOWE
-        if cuisine_filter:
-            filtered_by_cuisine = []
-            filter_lower = cuisine_filter.lower()
-            # Uproszczenie filtra (np. "kuchnia azjatycka" -> "azjatycka")
-            keywords = filter_lower.replace("kuchnia", "").replace("jedzenie", "").strip().split()
-            
-            for r in processed_results:
-                types_list = r.get("type") or []
-                types = [t.lower() for t in types_list]
-                context = r.get("context", "").lower()
-                name = r.get("name", "").lower()
-                
-                # Sprawdź czy którykolwiek keyword pasuje do typów, kontekstu LUB NAZWY
-                match = False
-                for kw in keywords:
-                    if len(kw) > 2 and (any(kw in t for t in types) or kw in context or kw in name):
-                        match = True
-                        break
-                if match:
-                    filtered_by_cuisine.append(r)
-            
-            if filtered_by_cuisine:
-                print(f"INFO: Przefiltrowano wyniki po kuchni '{cuisine_filter}'. Pozostało: {len(filtered_by_cuisine)}")
-                processed_results = filtered_by_cuisine
-            else:
-                print(f"INFO: Nie znaleziono wyników dla kuchni '{cuisine_filter}'. Pokazuję wyniki semantyczne.")
-
-        # Krok 2b: Filtrowanie po cenie (jeśli podano)
-        if price_preference:
-            filtered_results = []
-            
-            def parse_price_range(text):
-                if not text: return None
-                text_str = str(text).lower()
-                
-                # 1. Obsługa słów kluczowych
-                if any(w in text_str for w in ['tanie', 'tanio', 'tani', 'niedrogie', 'budżetowe', 'ekonomiczne']):
-                    return (0, 40)
-                if any(w in text_str for w in ['średnie', 'średnio', 'umiarkowane', 'przystępne']):
-                    return (40, 80)
-                if any(w in text_str for w in ['drogie', 'drogo', 'drogi', 'ekskluzywne', 'luksusowe']):
-                    return (80, 1000)
-                
-                # 2. Obsługa symboli $
-                if '$' in text_str:
-                    count = text_str.count('$')
-                    if count == 1: return (0, 40)
-                    if count == 2: return (40, 80)
-                    if count >= 3: return (80, 1000)
-
-                # 3. Obsługa liczb (np. "20-40")
-                nums = [int(n) for n in re.findall(r'\d+', text_str)]
-                if not nums: return None
-                if len(nums) == 1: return (nums[0], nums[0])
-                return (min(nums), max(nums))
-
-            user_price_range = parse_price_range(price_preference)
-            if user_price_range:
-                print(f"DEBUG: Zinterpretowano preferencję ceny '{price_preference}' jako zakres: {user_price_range}")
-
-            for r in processed_results:
-                price = r.get("google_price_range")
-                match = False
-                
-                # 1. Try numeric range matching
-                if user_price_range:
-                    place_price_range = parse_price_range(price)
-                    if place_price_range:
-                        # Check overlap: max(start1, start2) <= min(end1, end2)
-                        if max(user_price_range[0], place_price_range[0]) <= min(user_price_range[1], place_price_range[1]):
-                            match = True
-                
-                # 2. Fallback to string matching
-                if not match and price and price_preference.lower() in str(price).lower():
-                    match = True
-                
-                if match:
-                    filtered_results.append(r)
-            
-            if filtered_results:
-                processed_results = filtered_results
-                print(f"INFO: Przefiltrowano wyniki po cenie '{price_preference}'. Pozostało: {len(processed_results)}")
-            else:
-                print(f"INFO: Brak wyników dla ceny '{price_preference}'. Ignoruję filtr ceny.")
-
         # Krok 2c: RERANKING (Cross-Encoder)
         # Oceniamy semantycznie pary (zapytanie, kontekst) dla przefiltrowanych wyników
         if processed_results:
-            # Przygotuj pary do oceny
-            rerank_pairs = [[query, r["context"]] for r in processed_results]
-            
-            # Oblicz nowe wyniki (logits)
-            rerank_scores = reranker.predict(rerank_pairs)
-            
-            # Zaktualizuj semantic_score w wynikach
             # Normalizujemy wyniki rerankera (sigmoid), aby były w zakresie 0-1 jak cosine similarity
             from scipy.special import expit
-            normalized_scores = expit(rerank_scores)
+
+            # Przygotuj pary do oceny – do modelu trafiają tylko pary nieobecne w cache
+            rerank_items = [(r["oms_id"] if r["oms_id"] is not None else r["name"], r["context"]) for r in processed_results]
+            normalized_scores = reranker_cache.score(
+                query, rerank_items, lambda pairs: expit(predict_pairs(pairs))
+            )
             
-            print(f"\n--- RERANKING DEBUG (Query: {query}) ---")
+            cache_stats = reranker_cache.stats()
+            print(f"\n--- RERANKING DEBUG (Query: {query}) | cache hit rate: {cache_stats['hit_rate']:.0%} ---")
             for i, r in enumerate(processed_results):
                 old_score = r["semantic_score"]
                 new_score = float(normalized_scores[i])
@@ -985,65 +1145,114 @@ def create_rag_system(
             processed_results = [r for r in processed_results if r["semantic_score"] > 0.15]
             print(f"INFO: Po filtracji semantycznej (threshold 0.15) pozostało {len(processed_results)} wyników.")
 
-        # Krok 3: Wzbogać dane i przygotuj do re-rankingu
-        max_dist = 0.0
-        # Użyj 1.0 jako minimum, aby uniknąć dzielenia przez zero
-        max_reviews_log = 1.0
-        
-        # Oblicz odległości i znajdź wartości do normalizacji
-        for result in processed_results:
-            if user_location and result.get("coords"):
-                try:
-                    lat, lon = map(float, result["coords"].split(","))
-                    dist = distance_km(user_location[0], user_location[1], lat, lon)
-                    result["distance_km"] = dist
-                    if dist != float('inf'): max_dist = max(max_dist, dist)
-                except (ValueError, TypeError):
-                    pass
-            
-            reviews = result.get("google_reviews_total") or 0
-            max_reviews_log = max(max_reviews_log, log1p(reviews))
-
-        # Krok 4: Re-Ranking - obliczanie złożonego wyniku
+        # Krok 3-5: Re-Ranking - złożony wynik liczony wektorowo (NumPy) dla wszystkich kandydatów
         # Zmiana strategii: Reranker (semantic) działa jako filtr bezpieczeństwa (odrzuca śmieci).
         # Skoro przeszliśmy przez próg 0.15, to znaczy, że wyniki są sensowne.
-        # Teraz o kolejności decyduje głównie JAKOŚĆ (Rating + Reviews).
-        # Wagi: Semantic 35%, Rating 35%, Reviews 10%, Distance 20%
-        weights = {"semantic": 0.35, "rating": 0.35, "popularity": 0.10, "proximity": 0.20}
-
-        for result in processed_results:
-            # Normalizacja oceny (1-5 -> 0-1)
-            rating = result.get("google_rating")
-            if rating is not None:
-                score_rating = (rating - 1) / 4.0
-            else:
-                score_rating = 0.5  # Domyślna wartość, jeśli brak oceny
-
-            # Normalizacja logarytmiczna liczby opinii (Popularność)
-            reviews = result.get("google_reviews_total")
-            score_popularity = log1p(reviews) / max_reviews_log if max_reviews_log > 0 else 0
-
-            # Normalizacja odległości (odwrócona -> Bliskość)
-            score_proximity = 0.0
-            if user_location and max_dist > 0 and result["distance_km"] != float('inf'):
-                score_proximity = 1.0 - (result["distance_km"] / max_dist)
-
-            score_semantic = result.get("semantic_score", 0.0)
+        # Teraz o kolejności decyduje głównie JAKOŚĆ (Rating + Reviews), wagi w SCORE_WEIGHTS.
+        return rank_results(
+            processed_results, k, user_location=user_location, weights=SCORE_WEIGHTS, columns=record_columns
+        )
 
-            # Obliczenie wyniku końcowego
-            result["final_score"] = (weights["semantic"] * score_semantic +
-                                     weights["rating"] * score_rating +
-                                     weights["popularity"] * score_popularity +
-                                     weights["proximity"] * score_proximity)
+    def search(
+        query: str,
+        k: int = 5,
+        user_location: Optional[tuple] = None,
+        price_preference: Optional[str] = None,
+        cuisine_filter: Optional[str] = None,
+        open_now: bool = False,
+        open_at: Optional[datetime] = None,
+        open_for_minutes: int = 0,
+        max_distance_km: Optional[float] = None,
+        relaxed_filters: Optional[List[str]] = None
+    ):
+        """
+        Wyszukuje, deduplikuje i re-rankuje restauracje, łącząc podobieństwo
+        łącząc podobieństwo semantyczne z ocenami, popularnością i odległością.
 
-        # Krok 5: Sortowanie i zwrócenie najlepszych wyników
-        processed_results.sort(key=lambda x: x["final_score"], reverse=True)
-        return processed_results[:k]
+        Args:
+            query (str): Zapytanie użytkownika.
+            k (int): Liczba wyników do zwrócenia.
+            user_location (tuple, optional): Krotka (lat, lon) lokalizacji użytkownika.
+            price_preference (str, optional): Preferowany przedział cenowy do filtrowania.
+            cuisine_filter (str, optional): Typ kuchni do filtrowania (np. "azjatycka").
+            open_now (bool): Tylko lokale otwarte teraz.
+            open_at (datetime, optional): Tylko lokale otwarte w podanej chwili (nadpisuje open_now).
+            open_for_minutes (int): ...i otwarte jeszcze przez tyle minut.
+            max_distance_km (float, optional): Tylko lokale w tym promieniu od `user_location`.
+            relaxed_filters (list, optional): Lista, do której trafią nazwy pominiętych
+                ograniczeń ("cuisine", "price"), gdy żaden lokal by ich nie spełniał lub gdy
+                lista została dopełniona do k wynikami spoza nich.
+        """
+        # Krok 0: Maska dozwolonych rekordów z indeksów metadanych – liczona przed
+        # enkodowaniem zapytania; wyszukiwanie wektorowe obejmuje tylko te rekordy,
+        # więc każdy kandydat spełnia ograniczenia (ponowne wyszukiwanie tylko, gdy próg
+        # rerankera zostawi mniej niż k wyników – SMART FALLBACK niżej)
+        hard_filters, soft_filters = [], []
+        if max_distance_km is not None:
+            if user_location:
+                radius_mask = spatial_index.radius_mask(user_location[0], user_location[1], max_distance_km)
+                print(f"INFO: W promieniu {max_distance_km} km jest {int(radius_mask.sum())} lokali.")
+                hard_filters.append(("radius", radius_mask))
+            else:
+                print("UWAGA: Podano max_distance_km bez lokalizacji użytkownika. Ignoruję ograniczenie.")
+        if open_now or open_at is not None:
+            # Jedna kolumna macierzy bitowej godzin otwarcia; lokale o nieznanych godzinach odpadają
+            hard_filters.append(("open", hours_index.open_mask(open_at, duration_minutes=open_for_minutes)))
+        if cuisine_filter:
+            # Indeks odwrócony kuchni – cały korpus, a nie tylko okno kandydatów semantycznych
+            soft_filters.append(("cuisine", cuisine_index.mask_for(cuisine_filter)))
+        if price_preference:
+            user_price_range = parse_price_range(price_preference)
+            if user_price_range:
+                print(f"DEBUG: Zinterpretowano preferencję ceny '{price_preference}' jako zakres: {user_price_range}")
+            soft_filters.append(("price", price_mask(records, record_columns, price_preference)))
+
+        def allowed_ids_for(soft: List[Tuple[str, np.ndarray]]):
+            allowed_mask, relaxed = combine_filters(len(records), hard_filters, soft)
+            return (np.flatnonzero(allowed_mask) if allowed_mask is not None else None), relaxed
+
+        allowed_ids, relaxed = allowed_ids_for(soft_filters)
+        if allowed_ids is not None:
+            print(f"INFO: Ograniczenia wyszukiwania: {len(allowed_ids)} dozwolonych lokali.")
+            if not len(allowed_ids):
+                return []
+        if "cuisine" in relaxed:
+            print(f"INFO: Nie znaleziono wyników dla kuchni '{cuisine_filter}'. Pokazuję wyniki semantyczne.")
+        if "price" in relaxed:
+            print(f"INFO: Brak wyników dla ceny '{price_preference}'. Ignoruję filtr ceny.")
+
+        # Krok 1-5: wyszukiwanie, reranking i ranking (większa pula dla filtra kuchni, jak dotąd)
+        initial_k = k * 20 if cuisine_filter else k * 10  # Zwiększamy pulę dla rerankera
+        results = retrieve_and_rank(query, k, initial_k, allowed_ids, user_location)
+
+        # SMART FALLBACK: próg rerankera może odrzucić część kandydatów spełniających filtry
+        # (np. ścisła cena) – wtedy pomijamy kolejne filtry miękkie (najpierw cenę, potem kuchnię)
+        # i dopełniamy listę do k wynikami spoza nich (wyniki spełniające filtry zostają na górze)
+        active_soft = [f for f in soft_filters if f[0] not in relaxed]
+        while len(results) < k and active_soft:
+            name, _ = active_soft.pop()
+            print(f"INFO: Tylko {len(results)}/{k} wyników po filtrze '{name}'. Próbuję bez niego...")
+            fallback_ids, fallback_relaxed = allowed_ids_for(active_soft)
+            if fallback_ids is not None and not len(fallback_ids):
+                continue
+            seen = {r["name"].strip().lower() for r in results}
+            extra = [
+                r for r in retrieve_and_rank(query, k + len(results), initial_k, fallback_ids, user_location)
+                if r["name"].strip().lower() not in seen
+            ][:k - len(results)]
+            if extra:
+                results += extra
+                relaxed = relaxed + [name] + [f for f in fallback_relaxed if f not in relaxed]
+
+        if relaxed_filters is not None:
+            relaxed_filters.extend(relaxed)
+        return results
 
     # 7. Funkcja do filtrowania otwartych miejsc
     def filter_open_places(results: List[Dict]) -> List[Dict]:
         """
-        Filtruje listę wyników, zwracając tylko te miejsca, które są aktualnie otwarte.
+        Filtruje listę wyników, zwracając tylko te miejsca, które są aktualnie otwarte
+        (lokale o nieznanych lub nieczytelnych godzinach są odrzucane).
         
         Args:
             results: Lista słowników z wynikami (zwrócona przez funkcję `search`).
@@ -1051,20 +1260,43 @@ def create_rag_system(
         Returns:
             Przefiltrowana lista wyników.
         """
-        return [r for r in results if _is_open_now(r.get("opening_hours"))]
+        open_mask = hours_index.open_mask()
+        return [
+            r for r in results
+            if (open_mask[r["record_idx"]] if "record_idx" in r else _is_open_now(r.get("opening_hours")))
+        ]
 
     # 8. Inicjalizacja LLM
     llm = PLLuMLLM()
 
     # 9. Stworzenie systemu RAG
+    # Regułowa analiza intencji – słownik kuchni z typów lokali, gazetteer serwisu lokalizacji
+    intent_parser = None
+    if intent_fast_path:
+        intent_parser = IntentParser.from_records(
+            records, gazetteer=location_service.gazetteer if location_service is not None else None
+        )
+
     rag = ConversationalRAG(
         llm_client=llm,
         search_function=search,
-        max_history=10
+        max_history=10,
+        location_service=location_service,
+        intent_parser=intent_parser
     )
 
     # Dołączenie vector_store, aby był dostępny w testach
     rag.vectorstore = vector_store
+    rag.vector_index = index
     rag.reranker = reranker
+    rag.records = records
+    rag.record_columns = record_columns
+    rag.hours_index = hours_index
+    rag.spatial_index = spatial_index
+    rag.cuisine_index = cuisine_index
+    rag.query_cache = query_cache
+    rag.reranker_cache = reranker_cache
+    rag.result_cache = result_cache
+    rag.inference_scheduler = scheduler
 
     return rag, search, filter_open_places
@@ -0,0 +1,208 @@
+"""
+cuisine_index.py
+
+Indeks odwrócony kuchni i typów lokali: termin -> bitmapa rekordów.
+
+Terminy pochodzą z:
+- typów Google (`key_words.types`, np. "Kuchnia wietnamska", "Sushi na wynos"),
+- tagów OSM `cuisine` (z `output_files/lodz_restaurants_cafes.csv`, łączone po osm_id),
+  tłumaczonych na polskie odpowiedniki ("italian" -> "włoska"),
+- nazwy i opisu lokalu (jak w dotychczasowym filtrze substring).
+
+Każdy token jest normalizowany (małe litery, bez polskich znaków) i sprowadzany do
+prostego rdzenia ("azjatycka"/"azjatyckie"/"azjatyckiej" -> "azjaty"). Zapytanie jest
+rozszerzane o synonimy ("azjatycka" -> sushi, ramen, wok, ...), a wynikiem jest maska
+rekordów – filtr kuchni staje się sumą bitmap zamiast skanowania tekstu kandydatów.
+"""
+
+import csv
+import os
+from collections import defaultdict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set
+
+import numpy as np
+
+from .gazetteer import DEFAULT_CSV_PATH, normalize_text
+
+# Tagi OSM `cuisine` -> polskie terminy (pozostałe tagi indeksowane są w oryginale)
+OSM_CUISINE_PL = {
+    "italian": "włoska", "italian_pizza": "pizza włoska", "polish": "polska", "regional": "regionalna polska",
+    "asian": "azjatycka", "chinese": "chińska", "japanese": "japońska", "thai": "tajska",
+    "vietnamese": "wietnamska", "korean": "koreańska", "indian": "indyjska", "nepalese": "nepalska",
+    "georgian": "gruzińska", "armenian": "ormiańska", "turkish": "turecka", "greek": "grecka",
+    "mexican": "meksykańska", "american": "amerykańska", "argentinian": "argentyńska",
+    "mediterranean": "śródziemnomorska", "european": "europejska", "international": "międzynarodowa",
+    "jewish": "żydowska", "russian": "rosyjska", "ukrainian": "ukraińska", "czech": "czeska",
+    "bulgarian": "bułgarska", "bavarian": "bawarska", "kazakh": "kazachska", "ethiopian": "etiopska",
+    "arab": "arabska", "oriental": "orientalna", "seafood": "owoce morza", "steak_house": "steki",
+    "burger": "hamburgery", "sandwich": "kanapki", "pancake": "naleśniki", "crepe": "naleśniki",
+    "dessert": "desery", "cake": "ciasta", "ice_cream": "lody", "coffee_shop": "kawiarnia",
+    "coffe_shop": "kawiarnia", "coffee": "kawa", "tea": "herbata", "teahouse": "herbaciarnia",
+    "juice": "soki", "breakfast": "śniadania", "noodle": "makaron", "pasta": "makaron",
+    "salad": "sałatki", "soup": "zupy", "dumplings": "pierogi", "grill": "grill", "barbecue": "grill",
+    "chicken": "kurczak", "meat": "mięso", "waffle": "gofry", "hot_dog": "hot dog",
+}
+
+# Rozszerzenia zapytań: termin użytkownika -> terminy, które też go spełniają
+CUISINE_SYNONYMS = {
+    "azjatycka": ["sushi", "ramen", "wok", "japońska", "chińska", "tajska", "wietnamska", "koreańska",
+                  "orientalna", "mandaryńska", "pho", "makaron azjatycki", "hot pot", "bubble tea", "poke"],
+    "orientalna": ["azjatycka", "chińska", "tajska", "wietnamska"],
+    "japońska": ["sushi", "ramen"],
+    "chińska": ["mandaryńska", "hot pot"],
+    "włoska": ["pizza", "pizzeria", "makaron", "pasta"],
+    "pizza": ["pizzeria"],
+    "polska": ["regionalna", "pierogi", "pierogarnia", "jadłodajnia"],
+    "fast food": ["burger", "hamburgery", "kebab", "hot dog", "zapiekanki"],
+    "burger": ["hamburgery"],
+    "kebab": ["doner", "shawarma", "falafel"],
+    "bliskowschodnia": ["kebab", "shawarma", "falafel", "arabska", "turecka"],
+    "kawa": ["kawiarnia", "coffee"],
+    "kawiarnia": ["kawa", "kafeteria"],
+    "herbata": ["herbaciarnia"],
+    "desery": ["cukiernia", "lody", "lodziarnia", "ciasta", "naleśniki", "gofry", "czekoladziarnia"],
+    "słodkie": ["desery", "cukiernia", "lody", "ciasta", "czekoladziarnia", "pączki"],
+    "śniadanie": ["śniadaniowa", "śniadania", "brunch"],
+    "wegetariańska": ["wegańska"],
+    "owoce morza": ["ryby", "seafood"],
+    "mięso": ["steki", "grill", "steak"],
+    "amerykańska": ["burger", "hamburgery", "steki", "tex mex"],
+    "meksykańska": ["tex mex"],
+}
+
+# Słowa bez znaczenia dla rodzaju kuchni (po normalizacji)
+STOPWORDS = {
+    "kuchnia", "kuchni", "jedzenie", "restauracja", "restauracje", "lokal", "miejsce", "na", "z", "ze",
+    "do", "dla", "w", "i", "oraz", "typu", "o", "nazwie", "to", "jest", "sie", "wynos", "telefon",
+    "sklep", "dania", "danie", "danami", "daniami", "serwujaca", "oferta", "ofercie", "znajduje",
+    "specjalne", "cechy", "miejsca", "opisywana", "jako", "dostepne", "udogodnienia", "typowa",
+    "grupa", "odwiedzajacych", "popularne", "szczegolnie", "atmosfera",
+}
+
+# Końcówki odcinane przy wyznaczaniu rdzenia (najdłuższe najpierw), rdzeń ma min. 4 znaki
+_SUFFIXES = sorted({
+    "skiej", "ckiej", "owej", "iej", "ej", "skie", "ckie", "ska", "cka", "ski", "cki", "owa", "owe", "owy",
+    "eria", "arnia", "ownia", "ami", "ach", "ow", "om", "ie", "a", "e", "i", "y", "o", "u",
+}, key=len, reverse=True)
+MIN_STEM_LEN = 4
+
+
+def stem(token: str) -> str:
+    """Prosty rdzeń polskiego słowa (znormalizowanego): odcina najdłuższą pasującą końcówkę."""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LEN:
+            return token[:-len(suffix)]
+    return token
+
+
+def terms_from_text(text: Any) -> Set[str]:
+    """Rdzenie tokenów tekstu (bez słów nieistotnych i bardzo krótkich)."""
+    if not text:
+        return set()
+    return {stem(t) for t in normalize_text(str(text)).split() if len(t) > 2 and t not in STOPWORDS}
+
+
+def load_osm_cuisines(csv_path: str) -> Dict[int, List[str]]:
+    """osm_id -> lista tagów `cuisine` z pliku CSV z danymi OSM."""
+    cuisines: Dict[int, List[str]] = {}
+    with open(csv_path, "r", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            tags = [t.strip().lower() for t in (row.get("cuisine") or "").split(";") if t.strip()]
+            try:
+                osm_id = int(row["osm_id"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if tags:
+                cuisines[osm_id] = tags
+    return cuisines
+
+
+class CuisineIndex:
+    """
+    Indeks odwrócony: rdzeń terminu -> spakowana bitmapa rekordów (np.packbits).
+
+    `mask_for("kuchnia azjatycka")` zwraca maskę bool [n] lokali pasujących do
+    któregokolwiek ze słów zapytania lub ich synonimów.
+    """
+
+    def __init__(self, records: List[Any], osm_csv_path: Optional[str] = DEFAULT_CSV_PATH):
+        """
+        Args:
+            records: Lista PlaceRecord (pola types, name, context, oms_id)
+            osm_csv_path: Plik CSV z tagami OSM `cuisine`; None = bez danych OSM
+        """
+        self.size = len(records)
+        osm_cuisines: Dict[int, List[str]] = {}
+        if osm_csv_path and os.path.exists(osm_csv_path):
+            osm_cuisines = load_osm_cuisines(osm_csv_path)
+        elif osm_csv_path:
+            print(f"UWAGA: Brak pliku '{osm_csv_path}' – indeks kuchni bez tagów OSM.")
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, rec in enumerate(records):
+            terms: Set[str] = set()
+            for t in rec.types:
+                terms |= terms_from_text(t)
+            for tag in osm_cuisines.get(rec.oms_id, ()):
+                terms |= terms_from_text(tag.replace("_", " "))
+                terms |= terms_from_text(OSM_CUISINE_PL.get(tag))
+            terms |= terms_from_text(rec.name)
+            terms |= terms_from_text(rec.context)
+            for term in terms:
+                postings[term].append(i)
+
+        self._bitmaps: Dict[str, np.ndarray] = {}
+        for term, ids in postings.items():
+            mask = np.zeros(self.size, dtype=bool)
+            mask[ids] = True
+            self._bitmaps[term] = np.packbits(mask)
+
+        # Synonimy w postaci rdzeni; frazy wielowyrazowe ("hot pot") to zbiory rdzeni,
+        # które muszą wystąpić razem
+        self._synonyms: List[tuple] = [
+            (frozenset(terms_from_text(term)), [frozenset(terms_from_text(e)) for e in expansions])
+            for term, expansions in CUISINE_SYNONYMS.items()
+        ]
+
+    def expand(self, query: str) -> List[FrozenSet[str]]:
+        """
+        Grupy rdzeni pasujące do zapytania: każde słowo zapytania osobno oraz synonimy
+        terminów (także wielowyrazowych) zawartych w zapytaniu – jeden poziom rozszerzenia.
+        """
+        terms = terms_from_text(query)
+        groups = {frozenset([t]) for t in terms}
+        for key, expansions in self._synonyms:
+            if key and key <= terms:
+                groups.update(e for e in expansions if e)
+        return sorted(groups, key=sorted)
+
+    def _group_bitmap(self, group: FrozenSet[str]) -> Optional[np.ndarray]:
+        """Iloczyn bitmap wszystkich rdzeni grupy (None, jeśli któregoś brak w indeksie)."""
+        packed = None
+        for term in group:
+            bitmap = self._bitmaps.get(term)
+            if bitmap is None:
+                return None
+            packed = bitmap.copy() if packed is None else packed & bitmap
+        return packed
+
+    def mask_for(self, query: str) -> np.ndarray:
+        """Maska bool [n]: lokale pasujące do dowolnego słowa zapytania (lub synonimu)."""
+        packed = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for group in self.expand(query):
+            bitmap = self._group_bitmap(group)
+            if bitmap is not None:
+                packed |= bitmap
+        return np.unpackbits(packed, count=self.size).astype(bool)
+
+    def ids_for(self, query: str) -> np.ndarray:
+        """Posortowane indeksy rekordów pasujących do zapytania."""
+        return np.flatnonzero(self.mask_for(query))
+
+    @property
+    def terms(self) -> Iterable[str]:
+        return self._bitmaps.keys()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._bitmaps.values())
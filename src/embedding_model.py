@@ -1,6 +1,10 @@
 from typing import List, Optional, Union, Literal
 from sentence_transformers import SentenceTransformer, models
 
+from .inference_backends import (
+    DEFAULT_ONNX_CACHE_DIR, DEFAULT_ONNX_QUANTIZATION, load_encoder_base, quantize_dynamic_int8
+)
+
 
 class ModelMeanPooling:
     """Wrapper tworzący SentenceTransformer z mean-pooling lub CLS-pooling.
@@ -12,6 +16,9 @@ class ModelMeanPooling:
             pooling_strategy="mean"  # lub "cls"
         )
         embs = m.encode(["tekst 1", "tekst 2"])  # numpy array / list
+
+    `backend` wybiera sposób wykonania na CPU: "torch" (fp32), "torch-int8"
+    (dynamiczna kwantyzacja) lub "onnx-int8" (ONNX Runtime), patrz `inference_backends`.
     """
 
     def __init__(
@@ -19,11 +26,15 @@ class ModelMeanPooling:
         model_name: str,
         word_embedding_dimension: Optional[int] = None,
         pooling_strategy: Literal["mean", "cls"] = "cls",
+        backend: str = "torch",
+        onnx_cache_dir: str = DEFAULT_ONNX_CACHE_DIR,
+        onnx_quantization: str = DEFAULT_ONNX_QUANTIZATION,
     ):
         self.model_name = model_name
         self.pooling_strategy = pooling_strategy
         # Załaduj bazowy model aby pobrać warstwę słów
-        base = SentenceTransformer(model_name)
+        # (ONNX niedostępny -> fallback na PyTorch, faktyczny backend w self.backend)
+        base, self.backend = load_encoder_base(model_name, backend, onnx_cache_dir, onnx_quantization)
 
         # jeśli nie podano wymiaru, spróbuj go odczytać z modelu
         if word_embedding_dimension is None:
@@ -34,6 +45,8 @@ class ModelMeanPooling:
                 word_embedding_dimension = 768
 
         word_model = base[0]
+        if self.backend == "torch-int8":
+            quantize_dynamic_int8(word_model.auto_model)
         
         # Ustaw odpowiednie parametry poolingu
         # Domyślnie wyłączamy wszystkie, aby mieć pewność, że tylko wybrana strategia będzie aktywna.
@@ -0,0 +1,189 @@
+"""
+embedding_store.py
+
+Skompilowany (binarny) format embeddingów dla systemu RAG.
+
+Plik `*_embeddings_*.jsonl` jest zamieniany na dwa pliki obok niego:
+- `<nazwa>.npy`        – macierz embeddingów (float32 lub float16), otwierana przez np.memmap,
+- `<nazwa>.meta.jsonl` – kompaktowe metadane rekordów (tylko pola używane przez wyszukiwarkę).
+
+Dzięki temu start systemu nie musi parsować tysięcy liczb zapisanych jako tekst JSON.
+"""
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .record_store import PlaceRecord
+
+COMPILED_DTYPES = ("float32", "float16")
+
+
+def compiled_paths(embeddings_file: str) -> Tuple[str, str]:
+    """Zwraca ścieżki (macierz .npy, metadane .meta.jsonl) dla pliku JSONL z embeddingami."""
+    base, _ = os.path.splitext(embeddings_file)
+    return base + ".npy", base + ".meta.jsonl"
+
+
+def is_compiled_fresh(embeddings_file: str) -> bool:
+    """Sprawdza, czy skompilowany format istnieje i jest nowszy niż źródłowy plik JSONL."""
+    npy_path, meta_path = compiled_paths(embeddings_file)
+    if not (os.path.exists(npy_path) and os.path.exists(meta_path)):
+        return False
+    if not os.path.exists(embeddings_file):
+        # Dostępna jest tylko wersja skompilowana (np. obraz Dockera bez JSONL)
+        return True
+    src_mtime = os.path.getmtime(embeddings_file)
+    return os.path.getmtime(npy_path) >= src_mtime and os.path.getmtime(meta_path) >= src_mtime
+
+
+def compile_embeddings(embeddings_file: str, dtype: str = "float32") -> Tuple[str, str]:
+    """
+    Konwertuje plik JSONL z embeddingami do formatu skompilowanego.
+
+    Plik jest czytany strumieniowo dwa razy (zliczenie rekordów, potem zapis),
+    więc w pamięci nigdy nie trzymamy całego korpusu w postaci list Pythona.
+    Wektory są normalizowane (L2) przed zapisem – tak jak robi to indeks FAISS.
+
+    Args:
+        embeddings_file: Ścieżka do pliku `*_embeddings_*.jsonl`
+        dtype: "float32" lub "float16" (połowa rozmiaru na dysku)
+
+    Returns:
+        Tuple (ścieżka .npy, ścieżka .meta.jsonl)
+    """
+    if dtype not in COMPILED_DTYPES:
+        raise ValueError(f"Nieobsługiwany typ danych '{dtype}'. Dostępne: {COMPILED_DTYPES}")
+
+    npy_path, meta_path = compiled_paths(embeddings_file)
+
+    # Przebieg 1: liczba rekordów i wymiar embeddingu
+    n_records = 0
+    embedding_dim = None
+    with open(embeddings_file, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if embedding_dim is None:
+                embedding_dim = len(json.loads(line)["embedding"])
+            n_records += 1
+
+    if not n_records:
+        raise ValueError(f"Plik '{embeddings_file}' nie zawiera żadnych embeddingów.")
+
+    # Przebieg 2: zapis do plików tymczasowych, a następnie atomowa podmiana
+    tmp_npy = npy_path + ".tmp"
+    tmp_meta = meta_path + ".tmp"
+    matrix = np.lib.format.open_memmap(tmp_npy, mode="w+", dtype=dtype, shape=(n_records, embedding_dim))
+    row = 0
+    with open(embeddings_file, "r", encoding="utf-8") as fin, \
+         open(tmp_meta, "w", encoding="utf-8") as fmeta:
+        for line in fin:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            vec = np.asarray(rec.pop("embedding"), dtype="float32")
+            norm = np.linalg.norm(vec)
+            matrix[row] = vec / norm if norm > 0 else vec
+            fmeta.write(json.dumps(PlaceRecord.from_raw(rec).to_dict(), ensure_ascii=False) + "\n")
+            row += 1
+    matrix.flush()
+    del matrix
+
+    # Kolejność podmiany: najpierw metadane, potem macierz – świeżość sprawdzamy po obu plikach
+    os.replace(tmp_meta, meta_path)
+    os.replace(tmp_npy, npy_path)
+    print(f"Skompilowano {n_records} embeddingów ({embedding_dim}d, {dtype}) -> {npy_path}")
+    return npy_path, meta_path
+
+
+def save_compiled(
+    embeddings_file: str,
+    records: List[dict],
+    embeddings: np.ndarray,
+    dtype: Optional[str] = None
+) -> Tuple[str, str]:
+    """
+    Zapisuje format skompilowany z gotowej macierzy, bez ponownego parsowania JSONL
+    (np. po przyrostowej aktualizacji embeddingów).
+
+    Args:
+        embeddings_file: Ścieżka do pliku `*_embeddings_*.jsonl` (wyznacza ścieżki wyjściowe)
+        records: Surowe rekordy (metadane bez pola "embedding"), w kolejności wierszy macierzy
+        embeddings: Macierz [n, dim] znormalizowanych wektorów
+        dtype: Typ danych macierzy (domyślnie: typ istniejącego pliku .npy lub float32)
+
+    Returns:
+        Tuple (ścieżka .npy, ścieżka .meta.jsonl)
+    """
+    npy_path, meta_path = compiled_paths(embeddings_file)
+    if dtype is None:
+        dtype = str(np.load(npy_path, mmap_mode="r").dtype) if os.path.exists(npy_path) else "float32"
+    if dtype not in COMPILED_DTYPES:
+        raise ValueError(f"Nieobsługiwany typ danych '{dtype}'. Dostępne: {COMPILED_DTYPES}")
+    if len(records) != len(embeddings):
+        raise ValueError(f"Liczba rekordów ({len(records)}) nie zgadza się z liczbą wektorów ({len(embeddings)}).")
+
+    tmp_npy = npy_path + ".tmp"
+    tmp_meta = meta_path + ".tmp"
+    with open(tmp_npy, "wb") as f:
+        np.save(f, np.asarray(embeddings, dtype=dtype))
+    with open(tmp_meta, "w", encoding="utf-8") as fmeta:
+        for rec in records:
+            fmeta.write(json.dumps(PlaceRecord.from_raw(rec).to_dict(), ensure_ascii=False) + "\n")
+
+    os.replace(tmp_meta, meta_path)
+    os.replace(tmp_npy, npy_path)
+    print(f"Zapisano skompilowane embeddingi ({len(records)} x {embeddings.shape[1]}d, {dtype}) -> {npy_path}")
+    return npy_path, meta_path
+
+
+def load_compiled(embeddings_file: str) -> Tuple[List[PlaceRecord], np.ndarray]:
+    """Wczytuje metadane i macierz embeddingów (np.memmap, tylko do odczytu)."""
+    npy_path, meta_path = compiled_paths(embeddings_file)
+    embeddings = np.load(npy_path, mmap_mode="r")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        records = [PlaceRecord.from_raw(json.loads(line)) for line in f if line.strip()]
+
+    if len(records) != embeddings.shape[0]:
+        raise ValueError(
+            f"Niespójny format skompilowany: {len(records)} rekordów vs {embeddings.shape[0]} wektorów"
+        )
+    return records, embeddings
+
+
+def load_jsonl(embeddings_file: str) -> Tuple[List[PlaceRecord], np.ndarray]:
+    """Wczytuje embeddingi bezpośrednio z pliku JSONL (wolna ścieżka)."""
+    records = []
+    embeddings = []
+    with open(embeddings_file, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            # Lista floatów nie trafia do metadanych – wektor żyje tylko w macierzy
+            embeddings.append(np.array(rec.pop("embedding"), dtype="float32"))
+            records.append(PlaceRecord.from_raw(rec))
+    return records, np.vstack(embeddings)
+
+
+def load_embeddings(embeddings_file: str) -> Tuple[List[PlaceRecord], np.ndarray]:
+    """
+    Wczytuje rekordy i embeddingi, preferując format skompilowany.
+
+    Jeśli `<nazwa>.npy` i `<nazwa>.meta.jsonl` są nowsze niż plik JSONL,
+    macierz jest mapowana z dysku (np.memmap). W przeciwnym razie
+    parsowany jest plik JSONL.
+
+    Returns:
+        Tuple (lista kompaktowych rekordów PlaceRecord, macierz embeddingów [n, dim])
+    """
+    if is_compiled_fresh(embeddings_file):
+        try:
+            records, embeddings = load_compiled(embeddings_file)
+            print(f"INFO: Wczytano skompilowane embeddingi ({embeddings.dtype}) z {compiled_paths(embeddings_file)[0]}")
+            return records, embeddings
+        except (OSError, ValueError) as e:
+            print(f"UWAGA: Nie udało się wczytać formatu skompilowanego ({e}). Parsuję JSONL.")
+
+    return load_jsonl(embeddings_file)
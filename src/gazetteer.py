@@ -0,0 +1,277 @@
+"""
+gazetteer.py
+
+Offline gazetteer Łodzi: dzielnice, punkty orientacyjne i ulice ze współrzędnymi.
+
+Większość lokalizacji wpisywanych przez użytkowników pochodzi z małego, zamkniętego
+zbioru (Manufaktura, Pietryna, Widzew, Polibuda...). Zamiast wołać spaCy, LLM
+i Nominatim, dopasowujemy frazy z zapytania do:
+- ręcznie przygotowanej listy punktów orientacyjnych i dzielnic (z potocznymi aliasami),
+- ulic z danych OSM (`output_files/lodz_restaurants_cafes.csv`) – współrzędne to
+  centroid lokali przy danej ulicy.
+
+Dopasowanie jest rozmyte: kandydaci wybierani są po trygramach, a tokeny porównywane
+z uwzględnieniem polskiej odmiany (wspólny rdzeń) i literówek (difflib).
+"""
+
+import csv
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_CSV_PATH = os.path.join("output_files", "lodz_restaurants_cafes.csv")
+
+# (nazwa, lat, lon, rodzaj, aliasy) – współrzędne to przybliżone środki obiektów/dzielnic
+LANDMARKS = [
+    ("Manufaktura", 51.7794, 19.4469, "landmark", ["manufaktura", "manu"]),
+    ("Ulica Piotrkowska", 51.7665, 19.4573, "landmark", ["piotrkowska", "pietryna", "ulica piotrkowska", "deptak"]),
+    ("OFF Piotrkowska", 51.7595, 19.4587, "landmark", ["off piotrkowska", "off piotrkowskiej"]),
+    ("Galeria Łódzka", 51.7589, 19.4627, "landmark", ["galeria łódzka", "galeria"]),
+    ("Port Łódź", 51.7232, 19.4009, "landmark", ["port łódź", "porcie łódź", "port łodzi"]),
+    ("Galeria Sukcesja", 51.7505, 19.4457, "landmark", ["sukcesja"]),
+    ("Monopolis", 51.7745, 19.4315, "landmark", ["monopolis"]),
+    ("Księży Młyn", 51.7530, 19.4790, "landmark", ["księży młyn"]),
+    ("EC1", 51.7683, 19.4680, "landmark", ["ec1", "ec 1"]),
+    ("Plac Wolności", 51.7772, 19.4543, "landmark", ["plac wolności"]),
+    ("Pasaż Rubinsteina", 51.7722, 19.4563, "landmark", ["pasaż rubinsteina", "rubinsteina"]),
+    ("Stary Rynek", 51.7803, 19.4543, "landmark", ["stary rynek"]),
+    ("Atlas Arena", 51.7578, 19.4337, "landmark", ["atlas arena"]),
+    ("Stadion Widzewa", 51.7650, 19.5128, "landmark", ["stadion widzewa"]),
+    ("Park Źródliska", 51.7593, 19.4760, "landmark", ["źródliska"]),
+    ("Park na Zdrowiu", 51.7630, 19.4060, "landmark", ["park na zdrowiu"]),
+    ("Politechnika Łódzka", 51.7530, 19.4530, "landmark", ["politechnika łódzka", "politechnika", "polibuda"]),
+    ("Uniwersytet Łódzki", 51.7760, 19.4775, "landmark", ["uniwersytet łódzki"]),
+    ("Lumumbowo", 51.7800, 19.4980, "landmark", ["lumumba", "lumumbowo"]),
+    ("Dworzec Łódź Fabryczna", 51.7707, 19.4697, "landmark", ["łódź fabryczna", "dworzec fabryczny", "fabryczny"]),
+    ("Dworzec Łódź Kaliska", 51.7572, 19.4304, "landmark", ["łódź kaliska", "dworzec kaliski", "kaliski", "kaliska"]),
+    ("Dworzec Łódź Widzew", 51.7597, 19.5405, "landmark", ["łódź widzew", "dworzec widzew"]),
+    ("Śródmieście", 51.7680, 19.4570, "district", ["śródmieście", "centrum"]),
+    ("Bałuty", 51.8000, 19.4400, "district", ["bałuty"]),
+    ("Widzew", 51.7590, 19.5200, "district", ["widzew"]),
+    ("Polesie", 51.7600, 19.4200, "district", ["polesie", "stare polesie"]),
+    ("Górna", 51.7300, 19.4700, "district", ["górna"]),
+    ("Teofilów", 51.7970, 19.3920, "district", ["teofilów"]),
+    ("Retkinia", 51.7530, 19.3930, "district", ["retkinia"]),
+    ("Karolew", 51.7560, 19.4070, "district", ["karolew"]),
+    ("Koziny", 51.7770, 19.4150, "district", ["koziny"]),
+    ("Złotno", 51.7830, 19.3840, "district", ["złotno"]),
+    ("Żubardź", 51.7950, 19.4310, "district", ["żubardź"]),
+    ("Radogoszcz", 51.8190, 19.4370, "district", ["radogoszcz"]),
+    ("Łagiewniki", 51.8380, 19.4700, "district", ["łagiewniki"]),
+    ("Stoki", 51.7830, 19.5300, "district", ["stoki"]),
+    ("Janów", 51.7740, 19.5540, "district", ["janów"]),
+    ("Olechów", 51.7390, 19.5530, "district", ["olechów"]),
+    ("Dąbrowa", 51.7330, 19.5030, "district", ["dąbrowa"]),
+    ("Chojny", 51.7290, 19.4800, "district", ["chojny"]),
+    ("Ruda Pabianicka", 51.7110, 19.4330, "district", ["ruda pabianicka"]),
+]
+
+# Ulice, których nazwy są zwykłymi przymiotnikami/słowami z opisu lokalu ("przyjazna atmosfera")
+STREET_STOPWORDS = {
+    "przyjazna", "nastrojowa", "zamknieta", "krotka", "lodowa", "patriotyczna", "obywatelska",
+    "milionowa", "michala", "rojna", "laczna", "lakowa", "targowa", "balonowa", "latawcowa",
+    "tramwajowa", "strazacka", "traktorowa", "rajdowa", "maratonska", "zdrowie", "fabryczna",
+}
+
+# Człony nazw ulic, które same nie identyfikują miejsca
+GENERIC_STREET_TOKENS = {"aleja", "aleje", "plac", "ulica", "rynek", "sady", "mlyn", "przystanek"}
+
+# Maksymalna długość końcówki fleksyjnej dopisanej do rdzenia aliasu ("-owie", "-ach", "-iej")
+MAX_INFLECTION_SUFFIX = 4
+
+KIND_PRIORITY = {"landmark": 2, "district": 2, "street": 1}
+
+_TRANSLITERATION = str.maketrans({"ł": "l", "Ł": "l"})
+_TOKEN_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text: str) -> str:
+    """Małe litery, bez polskich znaków i interpunkcji – forma używana do dopasowań."""
+    text = unicodedata.normalize("NFKD", text.translate(_TRANSLITERATION).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_TOKEN_RE.sub(" ", text).split())
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class GazetteerEntry:
+    """Jedno miejsce w gazetteerze (może mieć kilka aliasów)."""
+
+    __slots__ = ("name", "lat", "lon", "kind")
+
+    def __init__(self, name: str, lat: float, lon: float, kind: str):
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.kind = kind
+
+    @property
+    def coords(self) -> Tuple[float, float]:
+        return (self.lat, self.lon)
+
+    def __repr__(self):
+        return f"GazetteerEntry({self.name!r}, {self.kind}, ({self.lat:.4f}, {self.lon:.4f}))"
+
+
+class LodzGazetteer:
+    """
+    Słownik lokalizacji Łodzi z rozmytym dopasowaniem fraz.
+
+    `match(text)` szuka w całym zapytaniu najlepszego aliasu (najdłuższego, potem
+    najlepiej dopasowanego, a przy remisie: punkt orientacyjny/dzielnica przed ulicą).
+    """
+
+    def __init__(self, csv_path: Optional[str] = DEFAULT_CSV_PATH, min_score: float = 0.8):
+        """
+        Args:
+            csv_path: Plik CSV z danymi OSM (ulice); None = tylko punkty orientacyjne
+            min_score: Minimalny wynik dopasowania aliasu (0-1)
+        """
+        self.min_score = min_score
+        self.entries: List[GazetteerEntry] = []
+        # aliasy: (tokeny, indeks wpisu, tryb dopasowania "prefix"/"street")
+        self._aliases: List[Tuple[Tuple[str, ...], int, str]] = []
+        self._trigram_index: Dict[str, Set[int]] = defaultdict(set)
+
+        for name, lat, lon, kind, aliases in LANDMARKS:
+            idx = self._add_entry(GazetteerEntry(name, lat, lon, kind))
+            for alias in aliases:
+                self._add_alias(alias, idx, "prefix")
+
+        if csv_path and os.path.exists(csv_path):
+            self._load_streets(csv_path)
+        elif csv_path:
+            print(f"UWAGA: Brak pliku '{csv_path}' – gazetteer zawiera tylko punkty orientacyjne.")
+
+    def _add_entry(self, entry: GazetteerEntry) -> int:
+        self.entries.append(entry)
+        return len(self.entries) - 1
+
+    def _add_alias(self, alias: str, entry_idx: int, mode: str):
+        tokens = tuple(normalize_text(alias).split())
+        if not tokens:
+            return
+        alias_idx = len(self._aliases)
+        self._aliases.append((tokens, entry_idx, mode))
+        for tri in _trigrams(tokens[0]):
+            self._trigram_index[tri].add(alias_idx)
+
+    def _load_streets(self, csv_path: str):
+        """Wczytuje ulice z CSV (OSM) i liczy ich centroidy ze współrzędnych lokali."""
+        sums: Dict[str, List[float]] = {}
+        display: Dict[str, str] = {}
+        with open(csv_path, "r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                street = (row.get("addr:street") or "").split(" - ")[0].strip()
+                try:
+                    lat, lon = float(row["lat"]), float(row["lon"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                # Numery w nazwie (np. "Wersalska 47/75") to błędy danych – usuwamy je, chyba że cała nazwa jest liczbowa
+                tokens = [t for t in normalize_text(street).split() if not any(c.isdigit() for c in t) or street[:1].isdigit()]
+                if not tokens:
+                    continue
+                key = " ".join(tokens)
+                acc = sums.setdefault(key, [0.0, 0.0, 0])
+                acc[0] += lat
+                acc[1] += lon
+                acc[2] += 1
+                display.setdefault(key, street)
+
+        for key, (lat_sum, lon_sum, count) in sums.items():
+            if key in STREET_STOPWORDS:
+                continue
+            idx = self._add_entry(GazetteerEntry(display[key], lat_sum / count, lon_sum / count, "street"))
+            self._add_alias(key, idx, "street")
+            # Ulice patronów wpisuje się zwykle samym nazwiskiem ("na Kasprzaka")
+            tokens = key.split()
+            last = tokens[-1]
+            if len(tokens) > 1 and len(last) >= 5 and last not in GENERIC_STREET_TOKENS and last not in STREET_STOPWORDS:
+                self._add_alias(last, idx, "street")
+
+    @staticmethod
+    def _token_score(query_token: str, alias_token: str, mode: str) -> float:
+        """Podobieństwo tokenu zapytania do tokenu aliasu (0 = brak dopasowania)."""
+        if query_token == alias_token:
+            return 1.0
+        if mode == "street":
+            # Nazwy ulic to głównie przymiotniki żeńskie: Piotrkowska -> Piotrkowskiej / Piotrkowską
+            if alias_token.endswith("a"):
+                stem = alias_token[:-1]
+                if query_token in (stem + "ej", stem + "iej"):
+                    return 0.95
+        elif len(alias_token) >= 4:
+            # Odmiana rzeczowników: wystarczy wspólny rdzeń i krótka końcówka
+            # (Manufaktura -> Manufakturze, Bałuty -> Bałutach, Młyn -> Młynie)
+            prefix = _common_prefix_len(query_token, alias_token)
+            required = len(alias_token) if len(alias_token) == 4 else max(4, len(alias_token) - 2)
+            if prefix >= required and len(query_token) - prefix <= MAX_INFLECTION_SUFFIX:
+                return 0.95
+        # Literówki: tylko dla dłuższych tokenów o podobnej długości
+        if len(alias_token) >= 6 and abs(len(query_token) - len(alias_token)) <= 2 and query_token[0] == alias_token[0]:
+            ratio = SequenceMatcher(None, query_token, alias_token).ratio()
+            if ratio >= 0.85:
+                return ratio * 0.95
+        return 0.0
+
+    def _candidates(self, token: str) -> Set[int]:
+        """Aliasy, których pierwszy token dzieli z danym tokenem co najmniej dwa trygramy."""
+        counts: Dict[int, int] = defaultdict(int)
+        for tri in _trigrams(token):
+            for alias_idx in self._trigram_index.get(tri, ()):
+                counts[alias_idx] += 1
+        return {alias_idx for alias_idx, c in counts.items() if c >= 2}
+
+    def match(self, text: str) -> Optional[GazetteerEntry]:
+        """Znajduje w tekście najlepiej pasującą lokalizację lub zwraca None."""
+        found = self.match_span(text)
+        return found[0] if found else None
+
+    def match_span(self, text: str) -> Optional[Tuple[GazetteerEntry, int, int]]:
+        """
+        Jak `match`, ale zwraca też zakres dopasowanych tokenów: (wpis, początek, koniec)
+        – indeksy w `normalize_text(text).split()`, koniec wyłącznie.
+        """
+        tokens = normalize_text(text).split()
+        best = None
+        best_key = None
+        for i, token in enumerate(tokens):
+            for alias_idx in self._candidates(token):
+                alias_tokens, entry_idx, mode = self._aliases[alias_idx]
+                window = tokens[i:i + len(alias_tokens)]
+                if len(window) < len(alias_tokens):
+                    continue
+                scores = [self._token_score(q, a, mode) for q, a in zip(window, alias_tokens)]
+                if min(scores) == 0.0:
+                    continue
+                score = sum(scores) / len(scores)
+                if score < self.min_score:
+                    continue
+                entry = self.entries[entry_idx]
+                key = (len(alias_tokens), score, KIND_PRIORITY[entry.kind])
+                if best_key is None or key > best_key:
+                    best, best_key = (entry, i, i + len(alias_tokens)), key
+        return best
+
+    def lookup(self, text: str) -> Optional[Tuple[float, float]]:
+        """Zwraca współrzędne najlepiej pasującej lokalizacji z tekstu."""
+        entry = self.match(text)
+        return entry.coords if entry else None
+
+    def __len__(self):
+        return len(self.entries)
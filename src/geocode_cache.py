@@ -0,0 +1,156 @@
+"""
+geocode_cache.py
+
+Trwały cache geokodowania przed Nominatim.
+
+Użytkownicy pytają w kółko o te same kilkadziesiąt miejsc w Łodzi (Manufaktura,
+Piotrkowska, Widzew...), a każde zapytanie do Nominatim to kilkaset ms po sieci.
+Wyniki (także chybione – "negatywne") trzymamy w słowniku w pamięci oraz w lokalnym
+pliku SQLite, więc przetrwają restart serwera.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.path.join("output_files", "geocode_cache.sqlite")
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600        # trafienia: 30 dni
+DEFAULT_NEGATIVE_TTL_SECONDS = 24 * 3600    # brak wyniku: 1 dzień (Nominatim mógł się zmienić)
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_location_key(location_name: str) -> str:
+    """
+    Normalizuje nazwę lokalizacji do klucza cache.
+
+    Małe litery, bez interpunkcji i nadmiarowych spacji. Polskie znaki zostają,
+    bo rozróżniają nazwy (np. "Łódź" vs "Lodz" geokoduje się inaczej).
+    """
+    key = unicodedata.normalize("NFC", location_name).lower()
+    key = _PUNCTUATION_RE.sub(" ", key)
+    return _WHITESPACE_RE.sub(" ", key).strip()
+
+
+class GeocodeCache:
+    """
+    Cache geokodowania: słownik w pamięci + plik SQLite.
+
+    `lookup` zwraca krotkę (czy_trafienie, współrzędne). Trafienie ze współrzędnymi
+    None oznacza zapamiętany brak wyniku (negatywny cache).
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS
+    ):
+        """
+        Args:
+            path: Ścieżka do pliku SQLite (None = tylko pamięć)
+            ttl_seconds: Czas życia znalezionych współrzędnych
+            negative_ttl_seconds: Czas życia wpisów "nie znaleziono"
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        # klucz -> (lat, lon, zapisano_o); lat/lon = None dla negatywnych wpisów
+        self._memory: Dict[str, Tuple[Optional[float], Optional[float], float]] = {}
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._conn = None
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        """Otwiera (lub tworzy) plik SQLite i wczytuje wpisy do pamięci."""
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, lat REAL, lon REAL, created_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+            rows = self._conn.execute("SELECT key, lat, lon, created_at FROM geocode").fetchall()
+            self._memory = {key: (lat, lon, created_at) for key, lat, lon, created_at in rows}
+        except sqlite3.Error as e:
+            print(f"UWAGA: Nie udało się otworzyć cache geokodowania '{path}' ({e}). Używam tylko pamięci.")
+            self._conn = None
+
+    def _is_expired(self, lat: Optional[float], created_at: float, now: float) -> bool:
+        ttl = self.ttl_seconds if lat is not None else self.negative_ttl_seconds
+        return now - created_at > ttl
+
+    def lookup(self, location_name: str) -> Tuple[bool, Optional[Tuple[float, float]]]:
+        """Zwraca (True, współrzędne lub None) przy trafieniu, (False, None) przy braku wpisu."""
+        key = normalize_location_key(location_name)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or self._is_expired(entry[0], entry[2], now):
+                self.misses += 1
+                return False, None
+            lat, lon, _ = entry
+            if lat is None:
+                self.negative_hits += 1
+                return True, None
+            self.hits += 1
+            return True, (lat, lon)
+
+    def store(self, location_name: str, coords: Optional[Tuple[float, float]]):
+        """Zapisuje wynik geokodowania (None = lokalizacja nie została znaleziona)."""
+        key = normalize_location_key(location_name)
+        lat, lon = coords if coords else (None, None)
+        created_at = time.time()
+        with self._lock:
+            self._memory[key] = (lat, lon, created_at)
+            if self._conn is not None:
+                try:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO geocode (key, lat, lon, created_at) VALUES (?, ?, ?, ?)",
+                        (key, lat, lon, created_at)
+                    )
+                    self._conn.commit()
+                except sqlite3.Error as e:
+                    print(f"UWAGA: Nie udało się zapisać do cache geokodowania: {e}")
+
+    def purge_expired(self) -> int:
+        """Usuwa przeterminowane wpisy z pamięci i z pliku. Zwraca liczbę usuniętych wpisów."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (lat, _, created_at) in self._memory.items() if self._is_expired(lat, created_at, now)]
+            for key in expired:
+                del self._memory[key]
+            if self._conn is not None and expired:
+                self._conn.executemany("DELETE FROM geocode WHERE key = ?", [(k,) for k in expired])
+                self._conn.commit()
+        return len(expired)
+
+    def stats(self) -> Dict[str, float]:
+        """Liczniki trafień/chybień cache."""
+        with self._lock:
+            total = self.hits + self.negative_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.negative_hits) / total if total else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,114 @@
+"""
+hours_index.py
+
+Godziny otwarcia jako bitmapa minut tygodnia.
+
+Każdy tydzień to 10080 minut (pon 00:00 = minuta 0). Harmonogram lokalu jest raz
+zamieniany na 10080 bitów (spakowanych do 1260 bajtów), a wszystkie lokale tworzą
+jedną macierz [n_rekordów, 1260]. Pytania "otwarte teraz", "otwarte w sobotę o 22:00"
+czy "otwarte przez najbliższe 2 godziny" to wtedy wycinek kolumn tej macierzy.
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional, Sequence
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+WEEK_BYTES = MINUTES_PER_WEEK // 8
+# Dzień harmonogramu o nieczytelnym formacie godzin – bity ustawione, ale lokal trafia do "nieznanych"
+UNKNOWN_DAY = None
+
+
+def minute_of_week(when: Optional[datetime] = None) -> int:
+    """Minuta tygodnia dla danej chwili (poniedziałek 00:00 = 0)."""
+    when = when or datetime.now()
+    return when.weekday() * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+def schedule_to_week_mask(schedule: Sequence[Any]) -> np.ndarray:
+    """
+    Zamienia harmonogram dnia po dniu na maskę bool [10080].
+
+    Element harmonogramu: True (całą dobę), False (zamknięte), UNKNOWN_DAY (nieczytelny
+    format – traktowany jak otwarty) albo krotka przedziałów (otwarcie, zamknięcie)
+    w minutach od północy. Przedział przez północ
+    (np. 22:00–02:00) przechodzi na kolejny dzień (niedziela -> poniedziałek).
+    """
+    mask = np.zeros(MINUTES_PER_WEEK, dtype=bool)
+    for day, entry in enumerate(schedule):
+        start = day * MINUTES_PER_DAY
+        if entry is True or entry is UNKNOWN_DAY:
+            mask[start:start + MINUTES_PER_DAY] = True
+            continue
+        if entry is False:
+            continue
+        for open_m, close_m in entry:
+            if open_m == close_m:
+                # "00:00–00:00" w danych Google oznacza całą dobę
+                mask[start:start + MINUTES_PER_DAY] = True
+            elif open_m < close_m:
+                mask[start + open_m:start + close_m] = True
+            else:
+                mask[start + open_m:start + MINUTES_PER_DAY] = True
+                next_start = ((day + 1) % 7) * MINUTES_PER_DAY
+                mask[next_start:next_start + close_m] = True
+    return mask
+
+
+def _minute_range(start: int, duration_minutes: int) -> np.ndarray:
+    """Minuty tygodnia [start, start + max(1, duration)) z zawinięciem na początek tygodnia."""
+    return np.arange(start, start + max(1, duration_minutes)) % MINUTES_PER_WEEK
+
+
+class OpenHoursIndex:
+    """
+    Macierz bitowa godzin otwarcia wszystkich rekordów.
+
+    Lokale bez danych o godzinach mają wszystkie bity ustawione, a `known` pozwala je
+    odróżnić – `open_mask` domyślnie je odrzuca (nie wiemy, czy są otwarte). Tak samo
+    traktowane są lokale, których godziny choć jednego dnia nie dały się sparsować.
+    """
+
+    def __init__(self, records: List[Any]):
+        """
+        Args:
+            records: Lista PlaceRecord (atrybut `opening_hours` typu OpeningHours lub brak danych)
+        """
+        n = len(records)
+        self.bits = np.full((n, WEEK_BYTES), 0xFF, dtype=np.uint8)
+        self.known = np.zeros(n, dtype=bool)
+        for i, rec in enumerate(records):
+            week_bits = getattr(rec.opening_hours, "week_bits", None)
+            if week_bits is not None:
+                self.bits[i] = week_bits
+                self.known[i] = rec.opening_hours.known
+
+    def open_mask(
+        self,
+        when: Optional[datetime] = None,
+        duration_minutes: int = 0,
+        include_unknown: bool = False
+    ) -> np.ndarray:
+        """
+        Maska bool [n]: lokale otwarte w chwili `when` (domyślnie teraz) i przez
+        kolejne `duration_minutes` minut. Lokale o nieznanych godzinach są w masce
+        tylko z `include_unknown=True`.
+        """
+        minutes = _minute_range(minute_of_week(when), duration_minutes)
+        byte_idx = minutes // 8
+        bit_masks = (0x80 >> (minutes % 8)).astype(np.uint8)
+        # Dla każdej minuty: czy bit ustawiony – wszystkie minuty muszą być otwarte
+        mask = ((self.bits[:, byte_idx] & bit_masks) != 0).all(axis=1)
+        if not include_unknown:
+            mask &= self.known
+        return mask
+
+    def is_open(self, record_idx: int, when: Optional[datetime] = None) -> bool:
+        minute = minute_of_week(when)
+        return bool(self.bits[record_idx, minute // 8] & (0x80 >> (minute % 8)))
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
@@ -0,0 +1,158 @@
+"""
+inference_backends.py
+
+Alternatywne backendy CPU dla enkodera zapytań i rerankera (RoBERTa-large).
+
+- "torch"      – domyślny PyTorch fp32,
+- "torch-int8" – dynamiczna kwantyzacja warstw Linear do int8 (torch.quantization),
+                 bez dodatkowych zależności i bez eksportu,
+- "onnx-int8"  – eksport do ONNX + dynamiczna kwantyzacja int8, uruchamiane przez
+                 ONNX Runtime (wymaga `optimum[onnxruntime]` i sentence-transformers >= 4.1,
+                 `pip install -r requirements-onnx.txt`).
+
+Wyeksportowane i skwantyzowane modele ONNX są zapisywane w `output_files/onnx_models/`
+i wczytywane przy kolejnych startach. Jeśli wybranego backendu nie da się
+uruchomić (np. brak pakietów ONNX), ładowany jest zwykły model PyTorch, a przyczyna
+trafia do logu jako ostrzeżenie "UWAGA:".
+"""
+
+import importlib.util
+import os
+import re
+from typing import Any, Optional, Tuple
+
+INFERENCE_BACKENDS = ("torch", "torch-int8", "onnx-int8")
+
+DEFAULT_ONNX_CACHE_DIR = os.path.join("output_files", "onnx_models")
+# Zestaw instrukcji dla kwantyzacji ONNX ("avx2", "avx512", "avx512_vnni", "arm64")
+DEFAULT_ONNX_QUANTIZATION = "avx2"
+
+RERANKER_MODEL_NAME = "sdadas/polish-reranker-roberta-v2"
+
+# Backend "onnx-int8": wymagane moduły i minimalna wersja sentence-transformers (eksport ONNX int8)
+ONNX_REQUIRED_MODULES = ("onnxruntime", "optimum")
+MIN_SENTENCE_TRANSFORMERS_ONNX = (4, 1)
+ONNX_INSTALL_HINT = "pip install -r requirements-onnx.txt"
+
+
+def _check_backend(backend: str):
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Nieznany backend inferencji '{backend}'. Dostępne: {INFERENCE_BACKENDS}")
+
+
+def onnx_backend_missing() -> Optional[str]:
+    """Powód, dla którego backend "onnx-int8" nie zadziała (brak pakietu, za stara wersja), albo None."""
+    for module in ONNX_REQUIRED_MODULES:
+        if importlib.util.find_spec(module) is None:
+            return f"brak pakietu '{module}'"
+    import sentence_transformers
+
+    version = tuple(int(part) for part in re.findall(r"\d+", sentence_transformers.__version__)[:2])
+    if version < MIN_SENTENCE_TRANSFORMERS_ONNX:
+        required = ".".join(map(str, MIN_SENTENCE_TRANSFORMERS_ONNX))
+        return f"sentence-transformers {sentence_transformers.__version__} < {required}"
+    return None
+
+
+def _warn_onnx_fallback(model_kind: str, reason: str):
+    print(f"UWAGA: Backend ONNX dla {model_kind} niedostępny ({reason}). Używam PyTorch fp32 "
+          f"– zainstaluj zależności: {ONNX_INSTALL_HINT}")
+
+
+def _local_model_dir(cache_dir: str, model_name: str) -> str:
+    return os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+
+
+def quantize_dynamic_int8(module):
+    """Dynamiczna kwantyzacja int8 warstw Linear modułu PyTorch (w miejscu, tryb eval)."""
+    import torch
+
+    module.eval()
+    return torch.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def _onnx_file_name(quantization: str) -> str:
+    return f"onnx/model_qint8_{quantization}.onnx"
+
+
+def _export_onnx_int8(model_cls, model_name: str, local_dir: str, quantization: str, **kwargs):
+    """Eksportuje model do ONNX, kwantyzuje go i zapisuje w `local_dir` (jednorazowo)."""
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    print(f"INFO: Eksport '{model_name}' do ONNX i kwantyzacja int8 ({quantization})...")
+    model = model_cls(model_name, backend="onnx", **kwargs)
+    model.save_pretrained(local_dir)
+    export_dynamic_quantized_onnx_model(model, quantization, local_dir, push_to_hub=False)
+
+
+def load_onnx_int8(
+    model_cls,
+    model_name: str,
+    cache_dir: str = DEFAULT_ONNX_CACHE_DIR,
+    quantization: str = DEFAULT_ONNX_QUANTIZATION,
+    **kwargs
+):
+    """
+    Zwraca model `model_cls` (SentenceTransformer lub CrossEncoder) z backendem ONNX int8,
+    eksportując go przy pierwszym użyciu.
+    """
+    local_dir = _local_model_dir(cache_dir, model_name)
+    file_name = _onnx_file_name(quantization)
+    if not os.path.exists(os.path.join(local_dir, file_name)):
+        os.makedirs(local_dir, exist_ok=True)
+        _export_onnx_int8(model_cls, model_name, local_dir, quantization, **kwargs)
+    return model_cls(local_dir, backend="onnx", model_kwargs={"file_name": file_name}, **kwargs)
+
+
+def load_encoder_base(
+    model_name: str,
+    backend: str = "torch",
+    cache_dir: str = DEFAULT_ONNX_CACHE_DIR,
+    quantization: str = DEFAULT_ONNX_QUANTIZATION
+) -> Tuple[Any, str]:
+    """
+    Wczytuje bazowy SentenceTransformer enkodera w wybranym backendzie.
+
+    Returns:
+        Tuple (model, faktycznie użyty backend)
+    """
+    from sentence_transformers import SentenceTransformer
+
+    _check_backend(backend)
+    if backend == "onnx-int8":
+        reason = onnx_backend_missing()
+        if reason is None:
+            try:
+                return load_onnx_int8(SentenceTransformer, model_name, cache_dir, quantization), backend
+            except (ImportError, TypeError, ValueError, OSError, RuntimeError) as e:
+                reason = str(e)
+        _warn_onnx_fallback("enkodera", reason)
+        return SentenceTransformer(model_name), "torch"
+    return SentenceTransformer(model_name), backend
+
+
+def load_reranker(
+    backend: str = "torch",
+    model_name: str = RERANKER_MODEL_NAME,
+    cache_dir: str = DEFAULT_ONNX_CACHE_DIR,
+    quantization: str = DEFAULT_ONNX_QUANTIZATION
+):
+    """Wczytuje cross-encoder (reranker) w wybranym backendzie."""
+    from sentence_transformers import CrossEncoder
+
+    _check_backend(backend)
+    if backend == "onnx-int8":
+        reason = onnx_backend_missing()
+        if reason is None:
+            try:
+                return load_onnx_int8(CrossEncoder, model_name, cache_dir, quantization, trust_remote_code=True)
+            except (ImportError, TypeError, ValueError, OSError, RuntimeError) as e:
+                reason = str(e)
+        _warn_onnx_fallback("rerankera", reason)
+        return CrossEncoder(model_name, trust_remote_code=True)
+
+    reranker = CrossEncoder(model_name, trust_remote_code=True)
+    if backend == "torch-int8":
+        quantize_dynamic_int8(reranker.model)
+    return reranker
+
@@ -0,0 +1,178 @@
+"""
+inference_scheduler.py
+
+Mikro-batching wywołań modeli (enkoder zapytań, reranker) z równoległych żądań.
+
+Każde żądanie `/chat` osobno enkoduje jedno zapytanie (batch 1) i ocenia kilkadziesiąt
+par w rerankerze. Przy wielu równoczesnych żądaniach CPU marnuje czas na narzut
+pojedynczych przebiegów. `MicroBatcher` zbiera zadania z wielu wątków przez krótkie
+okno (max_wait_ms) lub do zebrania max_batch_size elementów, wykonuje jeden wspólny
+przebieg modelu i rozdziela wyniki do przyszłości (Future) poszczególnych żądań.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT_MS = 5.0
+
+
+class _Job:
+    __slots__ = ("items", "future")
+
+    def __init__(self, items: Sequence[Any]):
+        self.items = list(items)
+        self.future: Future = Future()
+
+
+class MicroBatcher:
+    """
+    Wątek w tle łączący zadania w paczki dla funkcji `batch_fn(lista_elementów) -> wyniki`.
+
+    Zadanie (lista elementów jednego żądania) nigdy nie jest dzielone – paczka może
+    przekroczyć max_batch_size, jeśli pojedyncze zadanie jest większe.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Any],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+        name: str = "micro-batcher"
+    ):
+        """
+        Args:
+            batch_fn: Funkcja licząca wyniki dla listy elementów (kolejność zachowana)
+            max_batch_size: Maksymalna liczba elementów w jednym przebiegu
+            max_wait_ms: Jak długo czekać na kolejne zadania po pierwszym w paczce
+            name: Nazwa wątku (widoczna w logach i profilerach)
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._closed = False
+        self.batches = 0
+        self.items = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: Sequence[Any]) -> Future:
+        """Dodaje zadanie; Future zwróci listę wyników w kolejności `items`."""
+        if self._closed:
+            raise RuntimeError("MicroBatcher został zamknięty.")
+        job = _Job(items)
+        if not job.items:
+            job.future.set_result([])
+        else:
+            self._queue.put(job)
+        return job.future
+
+    def __call__(self, items: Sequence[Any]) -> List[Any]:
+        """Synchroniczne wywołanie: dodaje zadanie i czeka na wynik."""
+        return self.submit(items).result()
+
+    def _collect(self, first: _Job) -> List[_Job]:
+        jobs = [first]
+        size = len(first.items)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if job is None:
+                # Zamknięcie – dokończ bieżącą paczkę, sygnał wraca do kolejki
+                self._queue.put(None)
+                break
+            jobs.append(job)
+            size += len(job.items)
+        return jobs
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            jobs = self._collect(first)
+            batch = [item for job in jobs for item in job.items]
+            try:
+                results = self.batch_fn(batch)
+            except Exception as e:
+                for job in jobs:
+                    job.future.set_exception(e)
+                continue
+            self.batches += 1
+            self.items += len(batch)
+            offset = 0
+            for job in jobs:
+                job.future.set_result(results[offset:offset + len(job.items)])
+                offset += len(job.items)
+
+    def close(self):
+        """Kończy wątek po obsłużeniu zadań już znajdujących się w kolejce."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+
+class InferenceScheduler:
+    """
+    Wspólny planista dla enkodera zapytań i rerankera (osobna kolejka dla każdego modelu).
+
+    Przykład:
+        scheduler = InferenceScheduler(
+            encode_fn=lambda texts: model_wrapper.encode(texts, normalize=True),
+            rerank_fn=reranker.predict,
+        )
+        vector = scheduler.encode("zapytanie: pizza")
+        scores = scheduler.rerank([["pizza", "Pizzeria ..."], ...])
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Any],
+        rerank_fn: Callable[[List[List[str]]], Any],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS
+    ):
+        self.encoder = MicroBatcher(
+            lambda texts: np.asarray(encode_fn(texts), dtype="float32"),
+            max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, name="encode-batcher"
+        )
+        # Reranker dostaje po kilkadziesiąt par na żądanie – limit paczki liczony w parach
+        self.reranker = MicroBatcher(
+            lambda pairs: np.asarray(rerank_fn(pairs), dtype="float32").ravel(),
+            max_batch_size=max_batch_size * 8, max_wait_ms=max_wait_ms, name="rerank-batcher"
+        )
+
+    def encode(self, text: str) -> np.ndarray:
+        """Embedding jednego tekstu (wiersz wspólnej macierzy paczki)."""
+        return self.encoder([text])[0]
+
+    def rerank(self, pairs: List[List[str]]) -> np.ndarray:
+        """Surowe wyniki cross-encodera dla par [zapytanie, kontekst]."""
+        return np.asarray(self.reranker(pairs), dtype="float32")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {"encode": self.encoder.stats(), "rerank": self.reranker.stats()}
+
+    def close(self):
+        self.encoder.close()
+        self.reranker.close()
@@ -0,0 +1,243 @@
+"""
+intent_parser.py
+
+Regułowa (deterministyczna) analiza intencji – szybka ścieżka przed `analyze_user_intent`.
+
+Większość wiadomości to krótkie zapytania typu "pizza na Widzewie" czy "tanie sushi",
+które da się rozłożyć bez LLM:
+- lokalizacja – offline gazetteer Łodzi (`LodzGazetteer.match_span`),
+- cena – całe słowa z `PRICE_WORDS` (z odmianą) oraz symbole $ z `parse_price_range`,
+- kuchnia – słownik rdzeni z typów Google lokali (`types`) oraz synonimów z `cuisine_index`,
+- powitania/podziękowania – intencja "chitchat".
+
+Wynik ma ten sam schemat co odpowiedź LLM (`intent`, `location`, `cuisine`, `price`)
+oraz pole `confidence`: udział tokenów wiadomości, które reguły potrafiły wyjaśnić.
+Słowa zmieniające sens zapytania ("nie", "bez", "zamiast") zerują pewność, a wiadomości
+bez żadnego rozpoznanego pola lub z samą ceną bez prośby ("jest drogo?") zostają dla LLM.
+"""
+
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .cuisine_index import CUISINE_SYNONYMS, OSM_CUISINE_PL, stem, terms_from_text
+from .gazetteer import DEFAULT_CSV_PATH, LodzGazetteer, normalize_text
+from .record_store import parse_price_range
+
+# Minimalna pewność, przy której wynik reguł zastępuje wywołanie LLM
+DEFAULT_MIN_CONFIDENCE = 0.8
+# Rdzeń z typów Google trafia do słownika kuchni, jeśli występuje w co najmniej tylu lokalach
+MIN_TYPE_RECORDS = 3
+
+# Słowa prośby, przyimki i ogólne określenia (po normalizacji) – nie zmieniają filtrów
+FILLER_WORDS = {
+    "szukam", "szukamy", "poszukuje", "poszukaj", "znajdz", "polec", "polecisz", "polecasz", "polecacie",
+    "pokaz", "daj", "chce", "chcemy", "chcialbym", "chcialabym", "chcielibysmy", "prosze", "mi", "nam",
+    "jakies", "jakas", "jakis", "jakiegos", "jakiejs", "cos", "czegos", "gdzie", "gdzies", "jest", "sa",
+    "mozna", "zjesc", "zjem", "zjemy", "wypic", "napic", "zjedzenia", "jedzenie", "jedzenia",
+    "miejsce", "miejsca", "lokal", "lokalu", "lokale", "restauracja", "restauracje", "restauracji",
+    "restauracjach", "knajpa", "knajpe", "knajpy", "knajpka", "knajpke", "kuchnia", "kuchnie", "kuchni",
+    "dobre", "dobra", "dobry", "dobrej", "dobrego", "najlepsze", "najlepsza", "najlepszy",
+    "najlepszej", "fajne", "fajna", "fajny", "fajnej", "fajnego", "smaczne", "smaczna",
+    "w", "we", "na", "przy", "kolo", "obok", "blisko", "niedaleko", "okolicy", "okolicach", "poblizu",
+    "pod", "z", "ze", "do", "dla", "i", "oraz", "albo", "lub", "a", "u", "lodz", "lodzi",
+    "obiad", "obiadu", "kolacja", "kolacje", "kolacji", "lunch", "lunchu",
+}
+
+# Słowa prośby o rekomendację (podzbiór FILLER_WORDS) – wiadomość z nimi nigdy nie jest luźną rozmową
+REQUEST_WORDS = {
+    "szukam", "szukamy", "poszukuje", "poszukaj", "znajdz", "polec", "polecisz", "polecasz", "polecacie",
+    "pokaz", "daj", "chce", "chcemy", "chcialbym", "chcialabym", "chcielibysmy", "gdzie", "gdzies",
+    "mozna", "zjesc", "zjem", "zjemy", "wypic", "napic", "zjedzenia", "jedzenie", "jedzenia",
+    "obiad", "obiadu", "kolacja", "kolacje", "kolacji", "lunch", "lunchu",
+}
+REQUEST_PREFIXES = ("polec", "szuka", "poszuk")
+
+# Rezygnacja z lokalizacji ("wszędzie") – intencja wyszukiwania bez miejsca
+ANYWHERE_WORDS = {"wszedzie", "obojetnie", "gdziekolwiek", "wszystko", "jedno"}
+
+# Powitania, podziękowania, pożegnania – luźna rozmowa. Bez ogólnych słów pytających ("co", "jak"):
+# "co polecisz na obiad?" to prośba o rekomendację
+CHITCHAT_WORDS = {
+    "czesc", "hej", "hejka", "siema", "siemka", "witam", "witaj", "elo", "hello", "hi",
+    "dzien", "dobry", "wieczor", "dobranoc", "dzieki", "dziekuje", "dziekujemy", "thx", "thanks",
+    "super", "ok", "okej", "spoko", "pa", "papa", "narazie",
+}
+
+# Słowa ceny (po normalizacji, z odmianą) -> przedział w zł. Dopasowanie całych tokenów, nie podciągów
+# jak w `parse_price_range` – inaczej "kasztanie" to "tanie", a "drogowe" to "drogo"
+PRICE_WORDS = {
+    **dict.fromkeys([
+        "tani", "tania", "tanie", "tanio", "taniej", "taniego", "tanich", "tanim", "tanimi",
+        "taniutko", "taniutkie", "niedrogi", "niedroga", "niedrogie", "niedrogo", "niedrogiego", "niedrogich",
+        "budzetowy", "budzetowa", "budzetowe", "budzetowo", "budzetowego", "budzetowych",
+        "ekonomiczny", "ekonomiczna", "ekonomiczne", "ekonomicznie",
+    ], (0, 40)),
+    **dict.fromkeys([
+        "sredni", "srednia", "srednie", "srednio", "sredniej", "sredniego", "srednich",
+        "umiarkowany", "umiarkowana", "umiarkowane", "umiarkowanie", "umiarkowanych",
+        "przystepny", "przystepna", "przystepne", "przystepnie", "przystepnych",
+    ], (40, 80)),
+    **dict.fromkeys([
+        "drogi", "droga", "drogie", "drogo", "drozej", "drogiej", "drogiego", "drogich", "drogim",
+        "ekskluzywny", "ekskluzywna", "ekskluzywne", "ekskluzywnie", "ekskluzywnego", "ekskluzywnej",
+        "ekskluzywnych", "luksusowy", "luksusowa", "luksusowe", "luksusowo", "luksusowego", "luksusowej",
+        "luksusowych",
+    ], (80, 1000)),
+}
+
+# Słowa zmieniające sens zapytania (negacja, wykluczenia) – zawsze decyduje LLM
+LLM_ONLY_WORDS = {"nie", "bez", "oprocz", "procz", "zamiast", "poza"}
+
+# Rdzenie typów Google, które nie opisują kuchni ("Jedzenie z dostawą do domu", "Sala bankietowa")
+NON_CUISINE_TERMS = {
+    "dostaw", "domu", "rodzin", "lodzi", "sala", "drug", "imprez", "bankiet", "catering", "obiad",
+    "telefon", "sklep", "usług", "uslug", "obsług", "obslug",
+}
+
+_WORD_RE = re.compile(r"\w+")
+_DOLLARS_RE = re.compile(r"\$+")
+
+
+def cuisine_vocabulary(records: Iterable[Any], min_records: int = MIN_TYPE_RECORDS) -> Set[str]:
+    """
+    Rdzenie terminów kuchni: typy Google występujące w co najmniej `min_records` lokalach
+    oraz terminy synonimów i tłumaczeń tagów OSM z `cuisine_index`.
+    """
+    counts: Counter = Counter()
+    for rec in records:
+        terms: Set[str] = set()
+        for t in rec.types:
+            terms |= terms_from_text(t)
+        counts.update(terms)
+    vocabulary = {term for term, n in counts.items() if n >= min_records}
+    for term, expansions in CUISINE_SYNONYMS.items():
+        vocabulary |= terms_from_text(term)
+        for e in expansions:
+            vocabulary |= terms_from_text(e)
+    for term in OSM_CUISINE_PL.values():
+        vocabulary |= terms_from_text(term)
+    return vocabulary - NON_CUISINE_TERMS
+
+
+class IntentParser:
+    """
+    Regułowy parser intencji o schemacie odpowiedzi `ConversationalRAG.analyze_user_intent`.
+
+    Przykład:
+        parser = IntentParser.from_records(records, gazetteer=location_service.gazetteer)
+        parser.parse("tanie sushi na Widzewie")
+        # {"intent": "recommendation", "location": "Widzew", "cuisine": "sushi",
+        #  "price": "0-40", "confidence": 1.0}
+    """
+
+    def __init__(
+        self,
+        cuisine_terms: Set[str],
+        gazetteer: Optional[LodzGazetteer] = None,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE
+    ):
+        """
+        Args:
+            cuisine_terms: Rdzenie terminów kuchni (np. z `cuisine_vocabulary`)
+            gazetteer: Gazetteer Łodzi (domyślnie: wczytywany przy pierwszym użyciu)
+            min_confidence: Próg pewności, od którego wynik reguł jest akceptowany
+        """
+        self.cuisine_terms = set(cuisine_terms)
+        self.min_confidence = min_confidence
+        self._gazetteer = gazetteer
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Any],
+        gazetteer: Optional[LodzGazetteer] = None,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE
+    ) -> "IntentParser":
+        """Tworzy parser ze słownikiem kuchni zbudowanym z typów lokali."""
+        return cls(cuisine_vocabulary(records), gazetteer=gazetteer, min_confidence=min_confidence)
+
+    @property
+    def gazetteer(self) -> LodzGazetteer:
+        if self._gazetteer is None:
+            self._gazetteer = LodzGazetteer(os.getenv("GAZETTEER_CSV_PATH", DEFAULT_CSV_PATH))
+        return self._gazetteer
+
+    def accepts(self, result: Dict[str, Any]) -> bool:
+        """Czy wynik reguł jest wystarczająco pewny, aby pominąć LLM."""
+        return result["confidence"] >= self.min_confidence
+
+    def parse(self, text: str) -> Dict[str, Any]:
+        """
+        Analizuje wiadomość regułami.
+
+        Returns:
+            Słownik z polami intent, location, cuisine, price (jak LLM) oraz confidence (0-1)
+        """
+        result: Dict[str, Any] = {
+            "intent": "recommendation", "location": None, "cuisine": None, "price": None, "confidence": 0.0
+        }
+        raw_tokens = _WORD_RE.findall(text.lower())
+        tokens = normalize_text(text).split()
+        dollars = _DOLLARS_RE.findall(text)
+        if len(raw_tokens) != len(tokens) or not (tokens or dollars):
+            return result
+        if any(t in LLM_ONLY_WORDS for t in tokens):
+            return result
+
+        explained = [False] * len(tokens)
+
+        # 1. Lokalizacja (gazetteer) – chyba że dopasowane słowa to równie dobrze kuchnia ("polska")
+        found = self.gazetteer.match_span(text)
+        if found:
+            entry, start, end = found
+            span = tokens[start:end]
+            if not all(t in FILLER_WORDS or stem(t) in self.cuisine_terms for t in span):
+                result["location"] = entry.name
+                explained[start:end] = [True] * (end - start)
+
+        # 2. Cena: symbole $ i całe słowa z PRICE_WORDS (bez liczb – "do 40 zł" zostaje dla LLM)
+        price_range = parse_price_range(max(dollars, key=len)) if dollars else None
+        for i, token in enumerate(tokens):
+            if explained[i]:
+                continue
+            token_range = PRICE_WORDS.get(token)
+            if token_range:
+                price_range = price_range or token_range
+                explained[i] = True
+        if price_range:
+            result["price"] = f"{price_range[0]}-{price_range[1]}"
+
+        # 3. Kuchnia oraz słowa bez wpływu na filtry
+        cuisine_words: List[str] = []
+        anywhere = greeting = request = False
+        for i, token in enumerate(tokens):
+            if token in REQUEST_WORDS or token.startswith(REQUEST_PREFIXES):
+                request = True
+            if explained[i]:
+                continue
+            if token in FILLER_WORDS:
+                explained[i] = True
+            elif token in ANYWHERE_WORDS:
+                explained[i] = anywhere = True
+            elif stem(token) in self.cuisine_terms:
+                cuisine_words.append(raw_tokens[i])
+                explained[i] = True
+            elif token in CHITCHAT_WORDS:
+                explained[i] = greeting = True
+        if cuisine_words:
+            result["cuisine"] = " ".join(cuisine_words)
+
+        has_slots = bool(result["location"] or result["cuisine"] or result["price"])
+        if not has_slots and not anywhere:
+            if not greeting or request:
+                # Sama prośba bez treści ("szukam czegoś", "co polecisz na obiad?") – niech zdecyduje LLM
+                return result
+            result["intent"] = "chitchat"
+        elif result["price"] and not (result["location"] or result["cuisine"] or anywhere or request):
+            # Sama cena bez prośby ("jest drogo?", "tanio tu") to raczej komentarz niż zapytanie – niech zdecyduje LLM
+            return result
+
+        result["confidence"] = round((sum(explained) + len(dollars)) / (len(tokens) + len(dollars)), 3)
+        return result
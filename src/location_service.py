@@ -1,20 +1,68 @@
+import os
+import threading
 import spacy
 from geopy.geocoders import Nominatim
-from typing import Optional, Tuple
+from typing import Optional, Tuple, List, Iterable
+
+from .geocode_cache import GeocodeCache, DEFAULT_CACHE_PATH
+from .gazetteer import LodzGazetteer, DEFAULT_CSV_PATH
+
+# Profile modelu spaCy: "lg" (najdokładniejszy), "md" i "sm" (szybsze, mniejsze)
+SPACY_PROFILES = {
+    "lg": "pl_core_news_lg",
+    "md": "pl_core_news_md",
+    "sm": "pl_core_news_sm",
+}
+
+# Komponenty zbędne do wykrywania lokalizacji. Zostawiamy NER oraz morphologizer + lemmatizer,
+# bo lematyzator polski (pos_lookup) potrzebuje części mowy, a forma podstawowa ułatwia geokodowanie.
+DEFAULT_EXCLUDED_COMPONENTS = ("parser",)
+
+# Etykiety encji NER traktowane jako lokalizacje
+LOCATION_LABELS = ("placeName", "geogName", "orgName", "roadName")
+
 
 class LocationService:
     """
     Serwis do ekstrakcji nazw lokalizacji z tekstu i ich geokodowania.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        profile: str = "lg",
+        model_name: Optional[str] = None,
+        exclude: Iterable[str] = DEFAULT_EXCLUDED_COMPONENTS,
+        geocode_cache: Optional[GeocodeCache] = None,
+        gazetteer: Optional[LodzGazetteer] = None
+    ):
+        """
+        Args:
+            profile: Profil modelu spaCy ("lg", "md", "sm") – ignorowany, jeśli podano model_name
+            model_name: Jawna nazwa modelu spaCy
+            exclude: Komponenty pipeline'u, które nie są ładowane
+            geocode_cache: Cache geokodowania (domyślnie plik SQLite z GEOCODE_CACHE_PATH)
+            gazetteer: Offline słownik lokalizacji Łodzi (domyślnie budowany z danych OSM)
+        """
         print("Inicjalizuję serwis lokalizacji (spaCy + Nominatim)...")
+        if model_name is None:
+            if profile not in SPACY_PROFILES:
+                raise ValueError(f"Nieznany profil spaCy '{profile}'. Dostępne: {list(SPACY_PROFILES)}")
+            model_name = SPACY_PROFILES[profile]
+        self.model_name = model_name
         try:
-            self.nlp = spacy.load("pl_core_news_lg")
+            self.nlp = spacy.load(model_name, exclude=list(exclude))
         except OSError:
-            print("BŁĄD: Nie znaleziono modelu 'pl_core_news_lg'.")
-            print("Aby go zainstalować, uruchom: python -m spacy download pl_core_news_lg")
+            print(f"BŁĄD: Nie znaleziono modelu '{model_name}'.")
+            print(f"Aby go zainstalować, uruchom: python -m spacy download {model_name}")
             raise
+        print(f"  Model spaCy: {model_name} | komponenty: {', '.join(self.nlp.pipe_names)}")
         self.geolocator = Nominatim(user_agent="inzynierka_restaurant_recommender")
+        if geocode_cache is None:
+            geocode_cache = GeocodeCache(os.getenv("GEOCODE_CACHE_PATH", DEFAULT_CACHE_PATH))
+        self.geocode_cache = geocode_cache
+        if gazetteer is None:
+            gazetteer = LodzGazetteer(os.getenv("GAZETTEER_CSV_PATH", DEFAULT_CSV_PATH))
+        self.gazetteer = gazetteer
+        print(f"  Gazetteer: {len(self.gazetteer)} lokalizacji")
         print("Serwis lokalizacji gotowy.")
 
     # Lista słów, które spaCy często błędnie rozpoznaje jako lokalizacje (False Positives)
@@ -29,39 +77,97 @@ class LocationService:
         "łódź", "łodzi"
     }
 
-    def extract_location_name(self, text: str) -> Optional[str]:
-        """Wyciąga nazwę lokalizacji z tekstu za pomocą NER."""
-        doc = self.nlp(text.title()) # Lepsze wyniki dla nazw własnych
+    def _pick_location_entity(self, doc) -> Optional[str]:
+        """Wybiera pierwszą encję lokalizacyjną z dokumentu spaCy i zwraca jej formę podstawową."""
         # Szukamy encji typu 'placeName' (miejsce) lub 'geogName' (nazwa geograficzna)
         for ent in doc.ents:
-            if ent.label_ in ["placeName", "geogName", "orgName", "roadName"]: # orgName też może być lokalizacją (np. nazwa firmy), roadName dla ulic
-                if ent.lemma_.lower() in self.IGNORED_LOCATIONS:
+            if ent.label_ in LOCATION_LABELS: # orgName też może być lokalizacją (np. nazwa firmy), roadName dla ulic
+                # Bez lematyzatora (okrojony pipeline) lemma_ jest pusta – używamy wtedy tekstu encji
+                lemma = ent.lemma_.strip() or ent.text
+                if lemma.lower() in self.IGNORED_LOCATIONS:
                     print(f"  Zignorowano fałszywą lokalizację (przymiotnik/typ): '{ent.text}'")
                     continue
                 
                 print(f"  Znaleziono encję lokalizacyjną: '{ent.text}' ({ent.label_})")
                 # Używamy lematu (formy podstawowej), aby ułatwić geokodowanie (np. "Piotrkowskiej" -> "Piotrkowska")
-                print(f"  Lematyzacja (forma podstawowa): '{ent.lemma_}'")
-                return ent.lemma_
+                print(f"  Lematyzacja (forma podstawowa): '{lemma}'")
+                return lemma
+        return None
+
+    def extract_location_name(self, text: str) -> Optional[str]:
+        """Wyciąga nazwę lokalizacji z tekstu za pomocą NER."""
+        doc = self.nlp(text.title()) # Lepsze wyniki dla nazw własnych
+        return self._pick_location_entity(doc)
+
+    def extract_location_names_batch(self, texts: List[str], batch_size: int = 64) -> List[Optional[str]]:
+        """Wersja wsadowa `extract_location_name` (nlp.pipe) – dla skryptów ewaluacyjnych."""
+        docs = self.nlp.pipe((t.title() for t in texts), batch_size=batch_size)
+        return [self._pick_location_entity(doc) for doc in docs]
+
+    def lookup_gazetteer(self, text: str) -> Optional[Tuple[float, float]]:
+        """Szuka lokalizacji z tekstu w offline gazetteerze (bez spaCy, LLM i sieci)."""
+        entry = self.gazetteer.match(text)
+        if entry:
+            print(f"  Gazetteer: '{entry.name}' ({entry.kind}): ({entry.lat:.4f}, {entry.lon:.4f})")
+            return entry.coords
         return None
 
     def geocode(self, location_name: str) -> Optional[Tuple[float, float]]:
-        """Konwertuje nazwę lokalizacji na współrzędne (lat, lon)."""
+        """Konwertuje nazwę lokalizacji na współrzędne (lat, lon): gazetteer, cache, Nominatim."""
+        coords = self.lookup_gazetteer(location_name)
+        if coords:
+            return coords
+
+        hit, coords = self.geocode_cache.lookup(location_name)
+        if hit:
+            if coords:
+                print(f"  Geokodowanie '{location_name}' (cache): ({coords[0]:.4f}, {coords[1]:.4f})")
+            else:
+                print(f"  Nie udało się znaleźć współrzędnych dla: '{location_name}' (cache)")
+            return coords
+
         try:
             # Ograniczamy wyszukiwanie do Łodzi dla większej precyzji
             location = self.geolocator.geocode(f"{location_name}, Łódź, Polska")
-            if location:
-                print(f"  Geokodowanie '{location_name}': ({location.latitude:.4f}, {location.longitude:.4f})")
-                return (location.latitude, location.longitude)
-            print(f"  Nie udało się znaleźć współrzędnych dla: '{location_name}'")
-            return None
         except Exception as e:
+            # Błędy sieci nie trafiają do cache – następne zapytanie spróbuje ponownie
             print(f"Błąd podczas geokodowania: {e}")
             return None
 
+        if location:
+            coords = (location.latitude, location.longitude)
+            print(f"  Geokodowanie '{location_name}': ({coords[0]:.4f}, {coords[1]:.4f})")
+        else:
+            coords = None
+            print(f"  Nie udało się znaleźć współrzędnych dla: '{location_name}'")
+        self.geocode_cache.store(location_name, coords)
+        return coords
+
     def get_location_from_query(self, text: str) -> Optional[Tuple[float, float]]:
-        """Pełny proces: ekstrakcja nazwy i geokodowanie."""
+        """Pełny proces: gazetteer, a jeśli nic nie pasuje – ekstrakcja nazwy (spaCy) i geokodowanie."""
+        coords = self.lookup_gazetteer(text)
+        if coords:
+            return coords
         location_name = self.extract_location_name(text)
         if location_name:
             return self.geocode(location_name)
-        return None
\ No newline at end of file
+        return None
+
+
+# Jedna instancja na proces – model spaCy (pl_core_news_lg) jest duży i wolno się ładuje
+_shared_location_service: Optional[LocationService] = None
+_shared_lock = threading.Lock()
+
+
+def get_location_service() -> LocationService:
+    """
+    Zwraca współdzieloną instancję LocationService, tworząc ją przy pierwszym użyciu.
+
+    Profil modelu spaCy można wybrać zmienną środowiskową SPACY_PROFILE (lg/md/sm).
+    """
+    global _shared_location_service
+    if _shared_location_service is None:
+        with _shared_lock:
+            if _shared_location_service is None:
+                _shared_location_service = LocationService(profile=os.getenv("SPACY_PROFILE", "lg"))
+    return _shared_location_service
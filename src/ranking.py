@@ -0,0 +1,183 @@
+"""
+ranking.py
+
+Wektorowy (NumPy) etap końcowego rankingu wyników wyszukiwania.
+
+Kandydaci są zamieniani na kolumny (semantic, rating, reviews, lat, lon), a odległość
+haversine, normalizacja i ważona suma liczone są jednym wyrażeniem na całych tablicach.
+Wynik jest identyczny z wcześniejszą pętlą w `search` (także kolejność przy remisach).
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .record_store import parse_coords
+
+EARTH_RADIUS_KM = 6371
+
+# Wagi: Semantic 35%, Rating 35%, Reviews 10%, Distance 20%
+SCORE_WEIGHTS = {"semantic": 0.35, "rating": 0.35, "popularity": 0.10, "proximity": 0.20}
+
+# Ocena przyjmowana dla lokali bez oceny Google (po normalizacji 0-1)
+DEFAULT_RATING_SCORE = 0.5
+
+
+def haversine_km(lat1: float, lon1: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Odległość (km) od punktu (lat1, lon1) do wielu punktów naraz.
+
+    Ta sama formuła co skalarne `distance_km`; brakujące współrzędne (nan) dają inf.
+    """
+    lats = np.asarray(lats, dtype="float64")
+    lons = np.asarray(lons, dtype="float64")
+    d_lat = np.radians(lats - lat1)
+    d_lon = np.radians(lons - lon1)
+    a = np.sin(d_lat / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lats)) * np.sin(d_lon / 2) ** 2
+    dist = EARTH_RADIUS_KM * (2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)))
+    return np.where(np.isnan(dist), np.inf, dist)
+
+
+def compute_final_scores(
+    semantic: np.ndarray,
+    rating: np.ndarray,
+    reviews: np.ndarray,
+    lats: np.ndarray,
+    lons: np.ndarray,
+    user_location: Optional[tuple] = None,
+    weights: Dict[str, float] = SCORE_WEIGHTS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Liczy wynik końcowy dla wszystkich kandydatów naraz.
+
+    Args:
+        semantic: Wyniki semantyczne (po rerankingu) [n]
+        rating: Oceny Google 1-5, nan = brak oceny [n]
+        reviews: Liczba opinii, nan = brak [n]
+        lats, lons: Współrzędne lokali, nan = brak [n]
+        user_location: (lat, lon) użytkownika lub None
+        weights: Wagi składowych wyniku
+
+    Returns:
+        Tuple (wyniki końcowe [n], odległości w km [n], inf gdy nieznane)
+    """
+    n = len(semantic)
+    if user_location:
+        distances = haversine_km(user_location[0], user_location[1], lats, lons)
+    else:
+        distances = np.full(n, np.inf)
+
+    finite = np.isfinite(distances)
+    max_dist = float(distances[finite].max()) if finite.any() else 0.0
+    # Użyj 1.0 jako minimum, aby uniknąć dzielenia przez zero
+    reviews_log = np.log1p(np.nan_to_num(np.asarray(reviews, dtype="float64"), nan=0.0))
+    max_reviews_log = max(1.0, float(reviews_log.max())) if n else 1.0
+
+    rating = np.asarray(rating, dtype="float64")
+    score_rating = np.where(np.isnan(rating), DEFAULT_RATING_SCORE, (rating - 1) / 4.0)
+    score_popularity = reviews_log / max_reviews_log
+    if user_location and max_dist > 0:
+        score_proximity = np.where(finite, 1.0 - distances / max_dist, 0.0)
+    else:
+        score_proximity = np.zeros(n)
+
+    final = (weights["semantic"] * np.asarray(semantic, dtype="float64") +
+             weights["rating"] * score_rating +
+             weights["popularity"] * score_popularity +
+             weights["proximity"] * score_proximity)
+    return final, distances
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indeksy k najwyższych wyników, malejąco; remisy w kolejności wejściowej
+    (tak jak stabilne `list.sort(reverse=True)`).
+    """
+    n = len(scores)
+    if n == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    neg = -np.asarray(scores)
+    if k < n:
+        # argpartition wybiera k najlepszych w O(n); dobieramy wszystkie remisy na granicy,
+        # żeby o kolejności wśród równych wyników decydowała pozycja wejściowa
+        threshold = neg[np.argpartition(neg, k - 1)[:k]].max()
+        candidates = np.flatnonzero(neg <= threshold)
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, neg[candidates]))
+    return candidates[order[:k]]
+
+
+def parse_coords_column(values: List[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Parsuje listę napisów "lat, lon" naraz: jeden `split` na złączonym tekście zamiast
+    osobnego parsowania każdego rekordu. Przy nietypowych danych – fallback na `parse_coords`.
+    """
+    n = len(values)
+    lats = np.full(n, np.nan)
+    lons = np.full(n, np.nan)
+    valid = [i for i, v in enumerate(values) if isinstance(v, str) and v.count(",") == 1]
+    if valid:
+        try:
+            flat = np.array(",".join(values[i] for i in valid).split(","), dtype="float64")
+            lats[valid] = flat[0::2]
+            lons[valid] = flat[1::2]
+        except ValueError:
+            for i in valid:
+                lats[i], lons[i] = parse_coords(values[i])
+    return lats, lons
+
+
+def results_to_columns(results: List[Dict[str, Any]], with_coords: bool = True) -> Dict[str, np.ndarray]:
+    """Zamienia listę słowników kandydatów na kolumny NumPy (None -> nan)."""
+    cols = {
+        "semantic": np.array([r.get("semantic_score", 0.0) for r in results], dtype="float64"),
+        "rating": np.array([r.get("google_rating") for r in results], dtype="float64"),
+        "reviews": np.array([r.get("google_reviews_total") for r in results], dtype="float64"),
+    }
+    if with_coords:
+        cols["lat"], cols["lon"] = parse_coords_column([r.get("coords") for r in results])
+    else:
+        cols["lat"] = cols["lon"] = np.full(len(results), np.nan)
+    return cols
+
+
+def rank_results(
+    results: List[Dict[str, Any]],
+    k: int,
+    user_location: Optional[tuple] = None,
+    weights: Dict[str, float] = SCORE_WEIGHTS,
+    columns: Optional[Dict[str, np.ndarray]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Zwraca k najlepszych wyników (malejąco) z uzupełnionymi `distance_km` i `final_score`.
+
+    Jeśli podano `columns` (z `build_record_columns`) i wyniki mają `record_idx`,
+    ocena, opinie i współrzędne są pobierane z tablic wyliczonych przy wczytywaniu.
+    """
+    if not results:
+        return []
+    if columns is not None and all("record_idx" in r for r in results):
+        idx = np.fromiter((r["record_idx"] for r in results), dtype=np.int64, count=len(results))
+        cols = {
+            "semantic": np.array([r.get("semantic_score", 0.0) for r in results], dtype="float64"),
+            "rating": columns["rating"][idx],
+            "reviews": columns["reviews"][idx],
+            "lat": columns["lat"][idx],
+            "lon": columns["lon"][idx],
+        }
+    else:
+        # Bez lokalizacji użytkownika współrzędne nie są potrzebne – nie parsujemy ich
+        cols = results_to_columns(results, with_coords=bool(user_location))
+    final, distances = compute_final_scores(
+        cols["semantic"], cols["rating"], cols["reviews"], cols["lat"], cols["lon"],
+        user_location=user_location, weights=weights
+    )
+    top = top_k_indices(final, k)
+    ranked = []
+    for i in top.tolist():
+        r = results[i]
+        r["final_score"] = float(final[i])
+        r["distance_km"] = float(distances[i])
+        ranked.append(r)
+    return ranked
@@ -0,0 +1,233 @@
+"""
+record_store.py
+
+Kompaktowy magazyn metadanych restauracji.
+
+Rekordy z pliku z embeddingami zawierają pełne dane z Google (parking, telefon,
+udogodnienia, ...) oraz sam wektor jako listę floatów. Wyszukiwarka potrzebuje
+tylko kilku pól, więc przy wczytywaniu zamieniamy każdy rekord na obiekt
+`PlaceRecord` ze `__slots__` – bez embeddingu i bez nieużywanych pól.
+
+Przy wczytywaniu od razu parsujemy też współrzędne (float lat/lon), przedział cenowy
+(krotka min/max) i godziny otwarcia (`OpeningHours`, bitmapa minut tygodnia), aby gorąca ścieżka wyszukiwania
+nie powtarzała tego przy każdym zapytaniu.
+"""
+
+import re
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .hours_index import MINUTES_PER_DAY, UNKNOWN_DAY, minute_of_week, schedule_to_week_mask
+
+DAYS_PL = ("poniedziałek", "wtorek", "środa", "czwartek", "piątek", "sobota", "niedziela")
+
+_TIME_RANGE_RE = re.compile(r'(\d{1,2}:\d{2})[–-](\d{1,2}:\d{2})')
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def parse_coords(coords: Any) -> Tuple[float, float]:
+    """Zamienia napis "lat, lon" na parę floatów; (nan, nan), jeśli się nie da."""
+    if not coords:
+        return (np.nan, np.nan)
+    try:
+        lat, lon = map(float, str(coords).split(","))
+        return (lat, lon)
+    except (ValueError, TypeError):
+        return (np.nan, np.nan)
+
+
+def parse_price_range(text: Any) -> Optional[Tuple[int, int]]:
+    """Zamienia opis ceny ("tanie", "$$", "20-40 zł") na przedział (min, max) w zł."""
+    if not text: return None
+    text_str = str(text).lower()
+
+    # 1. Obsługa słów kluczowych
+    if any(w in text_str for w in ['tanie', 'tanio', 'tani', 'niedrogie', 'budżetowe', 'ekonomiczne']):
+        return (0, 40)
+    if any(w in text_str for w in ['średnie', 'średnio', 'umiarkowane', 'przystępne']):
+        return (40, 80)
+    if any(w in text_str for w in ['drogie', 'drogo', 'drogi', 'ekskluzywne', 'luksusowe']):
+        return (80, 1000)
+
+    # 2. Obsługa symboli $
+    if '$' in text_str:
+        count = text_str.count('$')
+        if count == 1: return (0, 40)
+        if count == 2: return (40, 80)
+        if count >= 3: return (80, 1000)
+
+    # 3. Obsługa liczb (np. "20-40")
+    nums = [int(n) for n in _NUMBER_RE.findall(text_str)]
+    if not nums: return None
+    if len(nums) == 1: return (nums[0], nums[0])
+    return (min(nums), max(nums))
+
+
+def _parse_clock(value: str) -> Optional[int]:
+    """"HH:MM" -> minuty od północy ("24:00" = koniec doby, None dla niepoprawnej godziny)."""
+    hours, minutes = value.split(":")
+    hours, minutes = int(hours), int(minutes)
+    if (hours, minutes) == (24, 0):
+        return MINUTES_PER_DAY
+    if hours > 23 or minutes > 59:
+        return None
+    return hours * 60 + minutes
+
+
+def _compile_day(hours_str: Optional[str]):
+    """
+    Kompiluje godziny jednego dnia:
+    False = zamknięte (lub brak wpisu), True = otwarte całą dobę, UNKNOWN_DAY = nieczytelny
+    format, krotka przedziałów (otwarcie, zamknięcie) w minutach od północy.
+    """
+    if not hours_str or hours_str.lower() in ['zamknięte', 'closed']:
+        return False
+    if 'całą dobę' in hours_str.lower() or '24 hours' in hours_str.lower():
+        return True
+    time_ranges = _TIME_RANGE_RE.findall(hours_str)
+    if not time_ranges:
+        return UNKNOWN_DAY
+    compiled = []
+    for open_str, close_str in time_ranges:
+        open_m, close_m = _parse_clock(open_str), _parse_clock(close_str)
+        if open_m is not None and close_m is not None:
+            compiled.append((open_m % MINUTES_PER_DAY, close_m))
+    return tuple(compiled) if compiled else UNKNOWN_DAY
+
+
+class OpeningHours(dict):
+    """
+    Godziny otwarcia: zwykły słownik {dzień: "11:00–23:00"} (do wyświetlania i JSON)
+    z dołączonym harmonogramem skompilowanym do bitmapy minut tygodnia (`week_bits`).
+    `known` jest False, jeśli godziny któregoś dnia nie dały się sparsować (ten dzień
+    traktujemy jak otwarty).
+    """
+
+    __slots__ = ("schedule", "week_bits", "known")
+
+    def __init__(self, data: Dict[str, str]):
+        super().__init__(data)
+        self.schedule = tuple(_compile_day(self.get(day) or self.get(day.capitalize())) for day in DAYS_PL)
+        self.week_bits = np.packbits(schedule_to_week_mask(self.schedule))
+        self.known = all(day is not UNKNOWN_DAY for day in self.schedule)
+
+    def is_open(self, when: Optional[datetime] = None) -> bool:
+        """Sprawdza, czy lokal jest otwarty w danej chwili (domyślnie teraz)."""
+        minute = minute_of_week(when)
+        return bool(self.week_bits[minute // 8] & (0x80 >> (minute % 8)))
+
+    def __reduce__(self):
+        return (OpeningHours, (dict(self),))
+
+
+class PlaceRecord:
+    """Metadane jednego lokalu używane przez wyszukiwarkę i formatowanie wyników."""
+
+    __slots__ = (
+        "oms_id", "name", "types", "address", "coords",
+        "google_rating", "google_reviews_total", "google_price_range",
+        "opening_hours", "context",
+        # Pola wyliczane przy wczytywaniu
+        "lat", "lon", "price_range",
+    )
+
+    def __init__(
+        self,
+        oms_id: Optional[int],
+        name: Optional[str],
+        types: tuple,
+        address: Optional[str],
+        coords: Optional[str],
+        google_rating: Optional[float],
+        google_reviews_total: Optional[int],
+        google_price_range: Optional[str],
+        opening_hours: Optional[Dict[str, str]],
+        context: str,
+    ):
+        self.oms_id = oms_id
+        self.name = name
+        self.types = types
+        self.address = address
+        self.coords = coords
+        self.google_rating = google_rating
+        self.google_reviews_total = google_reviews_total
+        self.google_price_range = google_price_range
+        self.opening_hours = OpeningHours(opening_hours) if isinstance(opening_hours, dict) and opening_hours else opening_hours
+        self.context = context
+        self.lat, self.lon = parse_coords(coords)
+        self.price_range = parse_price_range(google_price_range)
+
+    @classmethod
+    def from_raw(cls, rec: Dict[str, Any]) -> "PlaceRecord":
+        """
+        Tworzy rekord z surowego słownika (JSONL z embeddingami lub plik .meta.jsonl).
+
+        Dane z korzenia rekordu mają priorytet, `key_words` służy jako fallback
+        (tak samo jak wcześniej w funkcji `search`).
+        """
+        key_words_data = rec.get("key_words") or {}
+        types = key_words_data.get("types") or rec.get("types") or []
+        return cls(
+            oms_id=rec.get("oms_id"),
+            name=rec.get("name"),
+            # Typy powtarzają się między lokalami – internujemy, aby trzymać jedną kopię
+            types=tuple(sys.intern(t) for t in types if isinstance(t, str)),
+            address=key_words_data.get("address") or rec.get("address"),
+            coords=rec.get("Współrzędne"),
+            google_rating=rec.get("google_rating") or key_words_data.get("google_rating"),
+            google_reviews_total=rec.get("google_reviews_total") or key_words_data.get("google_reviews_total"),
+            google_price_range=rec.get("google_price_range") or key_words_data.get("google_price_range"),
+            opening_hours=rec.get("opening_hours") or key_words_data.get("opening_hours"),
+            context=rec.get("context") or key_words_data.get("context") or "",
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Zwraca słownik w formacie rekordu wejściowego (bez embeddingu)."""
+        return {
+            "oms_id": self.oms_id,
+            "name": self.name,
+            "types": list(self.types),
+            "address": self.address,
+            "Współrzędne": self.coords,
+            "google_rating": self.google_rating,
+            "google_reviews_total": self.google_reviews_total,
+            "google_price_range": self.google_price_range,
+            "opening_hours": self.opening_hours,
+            "context": self.context,
+        }
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dostęp w stylu słownika (zgodność ze starym kodem używającym `metadata.get`)."""
+        value = self.to_dict().get(key)
+        return default if value is None else value
+
+    def is_open(self, when: Optional[datetime] = None) -> bool:
+        """Otwarte teraz? Brak danych o godzinach = zakładamy, że otwarte."""
+        return self.opening_hours.is_open(when) if isinstance(self.opening_hours, OpeningHours) else True
+
+    def __repr__(self):
+        return f"PlaceRecord(oms_id={self.oms_id}, name={self.name!r})"
+
+
+def build_records(raw_records: List[Dict[str, Any]]) -> List[PlaceRecord]:
+    """Zamienia listę surowych rekordów na kompaktowe `PlaceRecord`."""
+    return [PlaceRecord.from_raw(rec) for rec in raw_records]
+
+
+def build_record_columns(records: List[PlaceRecord]) -> Dict[str, np.ndarray]:
+    """
+    Kolumny NumPy indeksowane numerem rekordu (nan = brak danych):
+    lat, lon, rating, reviews, price_min, price_max.
+    """
+    price = np.array([rec.price_range or (np.nan, np.nan) for rec in records], dtype="float64").reshape(len(records), 2)
+    return {
+        "lat": np.array([rec.lat for rec in records], dtype="float64"),
+        "lon": np.array([rec.lon for rec in records], dtype="float64"),
+        "rating": np.array([rec.google_rating for rec in records], dtype="float64"),
+        "reviews": np.array([rec.google_reviews_total for rec in records], dtype="float64"),
+        "price_min": price[:, 0],
+        "price_max": price[:, 1],
+    }
@@ -0,0 +1,73 @@
+"""
+search_filters.py
+
+Łączenie ograniczeń wyszukiwania (promień, godziny otwarcia, kuchnia, cena) w jedną
+maskę dozwolonych rekordów, liczoną przed wyszukiwaniem wektorowym.
+
+Ograniczenia twarde (promień, godziny) zawsze obowiązują. Miękkie (kuchnia, cena) są
+nakładane po kolei i pomijane, jeśli w połączeniu z poprzednimi dałyby pusty zbiór –
+tak jak wcześniej robiły to filtry w `search` i ponowne wyszukiwanie bez ceny
+w `generate_response`, ale bez drugiego przebiegu przez indeks i model. Drugi przebieg
+(bez filtrów miękkich) `search` wykonuje tylko wtedy, gdy po progu rerankera zostaje
+mniej niż k wyników.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .record_store import parse_price_range
+
+
+def price_mask(records: Sequence[Any], columns: Dict[str, np.ndarray], price_preference: str) -> np.ndarray:
+    """
+    Maska bool [n]: lokale pasujące do preferencji cenowej.
+
+    Przedział liczbowy (np. "0-40", "tanie") jest porównywany wektorowo z kolumnami
+    `price_min`/`price_max` (część wspólna przedziałów); jak dotąd, dopasowanie tekstu
+    do `google_price_range` jest drugą drogą.
+    """
+    n = len(records)
+    mask = np.zeros(n, dtype=bool)
+    user_range = parse_price_range(price_preference)
+    if user_range:
+        # nan (brak ceny) daje False w obu porównaniach
+        mask |= (np.maximum(columns["price_min"], user_range[0]) <= np.minimum(columns["price_max"], user_range[1]))
+    needle = price_preference.lower()
+    for i, rec in enumerate(records):
+        if not mask[i] and rec.google_price_range and needle in str(rec.google_price_range).lower():
+            mask[i] = True
+    return mask
+
+
+def combine_filters(
+    size: int,
+    hard: Sequence[Tuple[str, np.ndarray]] = (),
+    soft: Sequence[Tuple[str, np.ndarray]] = ()
+) -> Tuple[Optional[np.ndarray], List[str]]:
+    """
+    Łączy maski ograniczeń w jedną maskę dozwolonych rekordów.
+
+    Args:
+        size: Liczba rekordów
+        hard: Lista (nazwa, maska) ograniczeń obowiązkowych
+        soft: Lista (nazwa, maska) ograniczeń pomijanych, gdy nic by ich nie spełniało
+              (w kolejności ważności)
+
+    Returns:
+        Tuple (maska bool [n] lub None, gdy nie ma żadnego ograniczenia;
+               nazwy pominiętych ograniczeń miękkich)
+    """
+    if not hard and not soft:
+        return None, []
+    allowed = np.ones(size, dtype=bool)
+    for _, mask in hard:
+        allowed &= mask
+    relaxed: List[str] = []
+    for name, mask in soft:
+        narrowed = allowed & mask
+        if narrowed.any():
+            allowed = narrowed
+        else:
+            relaxed.append(name)
+    return allowed, relaxed
@@ -0,0 +1,70 @@
+"""
+spatial_index.py
+
+Indeks przestrzenny lokali (KD-drzewo) do wyszukiwania w promieniu.
+
+Współrzędne (lat, lon) są zamieniane na punkty na sferze jednostkowej (x, y, z), więc
+odległość euklidesowa w drzewie (cięciwa) jest monotoniczna względem odległości po
+powierzchni Ziemi – zapytanie "w promieniu r km" to zwykłe `query_ball_point` z
+promieniem cięciwy. Wynik jest na koniec sprawdzany dokładnym haversine, identycznym
+z tym używanym w rankingu.
+"""
+
+import numpy as np
+
+from .ranking import EARTH_RADIUS_KM, haversine_km
+
+
+def _to_unit_xyz(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Punkty (lat, lon) w stopniach -> współrzędne na sferze jednostkowej [n, 3]."""
+    lat_r = np.radians(np.asarray(lats, dtype="float64"))
+    lon_r = np.radians(np.asarray(lons, dtype="float64"))
+    cos_lat = np.cos(lat_r)
+    return np.column_stack((cos_lat * np.cos(lon_r), cos_lat * np.sin(lon_r), np.sin(lat_r)))
+
+
+def chord_radius(radius_km: float) -> float:
+    """Długość cięciwy sfery jednostkowej odpowiadająca łukowi `radius_km`."""
+    angle = min(radius_km / EARTH_RADIUS_KM, np.pi)
+    return float(2 * np.sin(angle / 2))
+
+
+class SpatialIndex:
+    """
+    KD-drzewo (scipy cKDTree) nad współrzędnymi wszystkich rekordów.
+
+    Rekordy bez współrzędnych (nan) nie trafiają do drzewa – nigdy nie są
+    "w promieniu", bo ich położenie jest nieznane.
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray):
+        """
+        Args:
+            lats, lons: Kolumny współrzędnych rekordów (np. z `build_record_columns`), nan = brak
+        """
+        from scipy.spatial import cKDTree
+
+        self.lats = np.asarray(lats, dtype="float64")
+        self.lons = np.asarray(lons, dtype="float64")
+        self.size = len(self.lats)
+        # Pozycje w drzewie -> indeksy rekordów
+        self.record_ids = np.flatnonzero(~(np.isnan(self.lats) | np.isnan(self.lons)))
+        self._tree = cKDTree(_to_unit_xyz(self.lats[self.record_ids], self.lons[self.record_ids]))
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Posortowane indeksy rekordów w promieniu `radius_km` od punktu (lat, lon)."""
+        if radius_km is None or radius_km < 0 or not len(self.record_ids):
+            return np.empty(0, dtype=np.int64)
+        point = _to_unit_xyz([lat], [lon])[0]
+        # Mały zapas na błędy zaokrągleń – granicę rozstrzyga haversine poniżej
+        hits = self._tree.query_ball_point(point, chord_radius(radius_km) * (1 + 1e-9) + 1e-12)
+        ids = self.record_ids[np.asarray(hits, dtype=np.int64)]
+        ids = ids[haversine_km(lat, lon, self.lats[ids], self.lons[ids]) <= radius_km]
+        ids.sort()
+        return ids.astype(np.int64, copy=False)
+
+    def radius_mask(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Maska bool [n]: rekordy w promieniu `radius_km` od punktu (lat, lon)."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.query_radius(lat, lon, radius_km)] = True
+        return mask
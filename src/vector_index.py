@@ -0,0 +1,386 @@
+"""
+vector_index.py
+
+Budowa indeksu FAISS i jego trwały cache na dysku.
+
+Dostępne backendy:
+- "flat"  – IndexFlatIP, dokładne wyszukiwanie (brute-force),
+- "hnsw"  – IndexHNSWFlat, graf HNSW (parametr zapytania: efSearch),
+- "ivfpq" – IndexIVFPQ, listy odwrócone + kwantyzacja produktowa (parametr zapytania: nprobe),
+- "sq8"   – IndexScalarQuantizer (int8 na wymiar, 4x mniejszy niż flat); pierwsze przejście
+            zwraca `rescore_factor` x k kandydatów, które są przeliczane dokładnie (float32)
+            na wierszach macierzy embeddingów (np.memmap) – patrz `rescore_candidates`.
+
+Zbudowany indeks jest zapisywany obok pliku z embeddingami pod nazwą
+`<nazwa>.<backend>.<hash>.faiss`, gdzie hash obejmuje zawartość pliku z embeddingami,
+nazwę modelu, strategię poolingu oraz parametry budowy indeksu. Kolejne starty
+(testy, workery serwera) wczytują gotowy indeks zamiast budować go od nowa.
+
+Hash zawartości pliku z embeddingami jest zapamiętywany w pliku `<plik>.sha256` razem
+z rozmiarem i czasem modyfikacji – pełny odczyt pliku następuje tylko po jego zmianie.
+"""
+
+import glob
+import hashlib
+import math
+import os
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+from .embedding_store import compiled_paths
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Zwraca skrót SHA-256 zawartości pliku (czytanego porcjami)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cached_file_hash(path: str) -> str:
+    """
+    Skrót SHA-256 zawartości pliku, zapamiętany w pliku obok (`<plik>.sha256`: rozmiar,
+    czas modyfikacji, hash). Plik jest czytany ponownie tylko, gdy zmienił się jego rozmiar
+    lub czas modyfikacji (po samym `touch` hash jest liczony ponownie, ale się nie zmienia).
+    """
+    st = os.stat(path)
+    stamp = f"{st.st_size} {st.st_mtime_ns}"
+    sidecar = path + ".sha256"
+    try:
+        with open(sidecar, "r", encoding="utf-8") as f:
+            saved_stamp, _, saved_hash = f.read().strip().rpartition(" ")
+        if saved_stamp == stamp and saved_hash:
+            return saved_hash
+    except OSError:
+        pass
+
+    digest = file_content_hash(path)
+    try:
+        tmp_path = sidecar + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"{stamp} {digest}\n")
+        os.replace(tmp_path, sidecar)
+    except OSError as e:
+        print(f"UWAGA: Nie można zapisać hasha pliku {sidecar} ({e}).")
+    return digest
+
+
+INDEX_BACKENDS = ("flat", "hnsw", "ivfpq", "sq8")
+
+# Domyślne parametry budowy indeksów (nadpisywane przez `index_params`)
+DEFAULT_INDEX_PARAMS: Dict[str, Any] = {
+    "hnsw_m": 32,            # liczba sąsiadów w grafie HNSW
+    "ef_construction": 80,   # szerokość przeszukiwania przy budowie HNSW
+    "nlist": None,           # liczba list IVF (None -> dobierana do rozmiaru korpusu)
+    "pq_m": 64,              # liczba podwektorów PQ (musi dzielić wymiar)
+}
+
+# Ile razy więcej kandydatów pobiera indeks kwantyzowany przed dokładnym przeliczeniem (1 = bez przeliczania)
+DEFAULT_RESCORE_FACTORS: Dict[str, int] = {"sq8": 4}
+
+
+def default_rescore_factor(backend: str) -> int:
+    return DEFAULT_RESCORE_FACTORS.get(backend, 1)
+
+
+def _resolve_index_params(index_params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    params = dict(DEFAULT_INDEX_PARAMS)
+    if index_params:
+        unknown = set(index_params) - set(params)
+        if unknown:
+            raise ValueError(f"Nieznane parametry indeksu: {sorted(unknown)}")
+        params.update(index_params)
+    return params
+
+
+def index_cache_path(
+    embeddings_file: str,
+    model_name: str,
+    pooling: str,
+    backend: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Zwraca ścieżkę pliku z indeksem FAISS dla danego wariantu embeddingów:
+    `<nazwa>.<backend>.<hash wariantu>.<hash zawartości>.faiss`. Hash wariantu (model,
+    pooling, backend, parametry budowy) oddziela warianty od siebie, a hash zawartości
+    zmienia się po przebudowie embeddingów.
+
+    Jeśli plik JSONL nie istnieje (dostępny jest tylko format skompilowany),
+    hash liczony jest z macierzy `.npy`. Hash zawartości pochodzi z `cached_file_hash`,
+    więc przy niezmienionym pliku start nie czyta go w całości.
+    """
+    source = embeddings_file if os.path.exists(embeddings_file) else compiled_paths(embeddings_file)[0]
+    params = _resolve_index_params(index_params) if backend != "flat" else {}
+    variant = hashlib.sha256(f"{model_name}|{pooling}|{backend}|{sorted(params.items())}".encode("utf-8"))
+    content = hashlib.sha256(cached_file_hash(source).encode("utf-8"))
+    content.update(variant.digest())
+    base, _ = os.path.splitext(embeddings_file)
+    return f"{base}.{backend}.{variant.hexdigest()[:8]}.{content.hexdigest()[:16]}.faiss"
+
+
+def index_version(
+    embeddings_file: str,
+    model_name: str,
+    pooling: str,
+    backend: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None,
+    **search_params: Any
+) -> str:
+    """
+    Krótki identyfikator wersji indeksu (np. dla cache wyników): plik źródłowy (rozmiar i czas
+    modyfikacji – bez czytania zawartości), model, pooling, backend i parametry budowy/zapytań.
+    """
+    source = embeddings_file if os.path.exists(embeddings_file) else compiled_paths(embeddings_file)[0]
+    try:
+        st = os.stat(source)
+        source_id = f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        source_id = "?"
+    params = _resolve_index_params(index_params) if backend != "flat" else {}
+    h = hashlib.sha256(
+        f"{source}|{source_id}|{model_name}|{pooling}|{backend}|{sorted(params.items())}|{sorted(search_params.items())}"
+        .encode("utf-8")
+    )
+    return h.hexdigest()[:16]
+
+
+def _largest_divisor_at_most(n: int, limit: int) -> int:
+    for m in range(min(n, limit), 0, -1):
+        if n % m == 0:
+            return m
+    return 1
+
+
+def build_index(
+    embeddings: np.ndarray,
+    backend: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None
+):
+    """
+    Normalizuje embeddingi (L2) i buduje indeks wybranego typu (iloczyn skalarny = cosine similarity).
+
+    Args:
+        embeddings: Macierz embeddingów [n, dim]
+        backend: "flat", "hnsw", "ivfpq" lub "sq8"
+        index_params: Parametry budowy (patrz DEFAULT_INDEX_PARAMS)
+    """
+    import faiss
+
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Nieznany backend indeksu '{backend}'. Dostępne: {INDEX_BACKENDS}")
+    params = _resolve_index_params(index_params)
+
+    vectors = np.array(embeddings, dtype="float32")
+    faiss.normalize_L2(vectors)
+    n_samples, embedding_dim = vectors.shape
+
+    if backend == "flat":
+        index = faiss.IndexFlatIP(embedding_dim)
+
+    elif backend == "hnsw":
+        index = faiss.IndexHNSWFlat(embedding_dim, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+
+    elif backend == "sq8":
+        # Trening wyznacza tylko zakres wartości każdego wymiaru (min/max) – bez k-means
+        index = faiss.IndexScalarQuantizer(embedding_dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+
+    else:  # ivfpq
+        # Dla małych korpusów ograniczamy liczbę list i bitów PQ,
+        # aby k-means miał wystarczająco dużo punktów treningowych.
+        nlist = params["nlist"] or max(1, min(int(4 * math.sqrt(n_samples)), n_samples // 39))
+        pq_m = _largest_divisor_at_most(embedding_dim, params["pq_m"])
+        nbits = max(1, min(8, int(math.log2(max(n_samples, 2)))))
+        quantizer = faiss.IndexFlatIP(embedding_dim)
+        index = faiss.IndexIVFPQ(quantizer, embedding_dim, nlist, pq_m, nbits, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+
+def set_search_params(index, ef_search: Optional[int] = None, nprobe: Optional[int] = None):
+    """Ustawia parametry czasu zapytania (efSearch dla HNSW, nprobe dla IVF)."""
+    import faiss
+
+    if ef_search is not None and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    if nprobe is not None:
+        try:
+            faiss.extract_index_ivf(index).nprobe = nprobe
+        except RuntimeError:
+            pass  # Indeks nie jest typu IVF
+    return index
+
+
+# Poniżej tej liczby dozwolonych rekordów taniej jest policzyć iloczyny skalarne
+# bezpośrednio na wierszach macierzy niż przeszukiwać cały indeks z selektorem
+SUBSET_SCAN_MAX_IDS = 4096
+
+
+def _selector_search_params(index, selector):
+    """Parametry zapytania z selektorem ID, zachowujące ustawione efSearch / nprobe indeksu."""
+    import faiss
+
+    if hasattr(index, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    except RuntimeError:
+        return faiss.SearchParameters(sel=selector)
+
+
+def search_with_selector(index, queries: np.ndarray, k: int, allowed_ids: np.ndarray):
+    """
+    Wyszukiwanie FAISS ograniczone do podanych identyfikatorów (IDSelectorBitmap).
+
+    Dozwolone ID są zamieniane na bitmapę [ntotal] – sprawdzenie przynależności
+    w trakcie przeszukiwania to jeden odczyt bitu.
+
+    Zwraca (scores, idxs) jak `index.search`; brakujące pozycje mają id = -1.
+    """
+    import faiss
+
+    mask = np.zeros(index.ntotal, dtype=bool)
+    mask[np.asarray(allowed_ids, dtype="int64")] = True
+    # FAISS czyta bity od najmłodszego: id i -> bajt i >> 3, bit i & 7
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))
+    return index.search(queries, k, params=_selector_search_params(index, selector))
+
+
+def search_subset(embeddings: np.ndarray, query: np.ndarray, k: int, allowed_ids: np.ndarray):
+    """
+    Dokładne wyszukiwanie (cosine) tylko wśród wierszy `allowed_ids` macierzy embeddingów.
+
+    Wiersze są normalizowane na bieżąco – tak jak w `build_index`.
+
+    Returns:
+        Tuple (podobieństwa [<=k], indeksy rekordów [<=k]) malejąco
+    """
+    ids = np.asarray(allowed_ids, dtype="int64")
+    if not len(ids) or k <= 0:
+        return np.empty(0, dtype="float32"), np.empty(0, dtype="int64")
+    vectors = np.asarray(embeddings[ids], dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1)
+    norms[norms == 0] = 1.0
+    sims = (vectors @ np.asarray(query, dtype="float32").ravel()) / norms
+    k = min(k, len(ids))
+    top = np.argpartition(-sims, k - 1)[:k]
+    top = top[np.argsort(-sims[top], kind="stable")]
+    return sims[top], ids[top]
+
+
+def rescore_candidates(embeddings: np.ndarray, query: np.ndarray, k: int, candidate_ids: np.ndarray):
+    """
+    Dokładne (float32) przeliczenie podobieństw kandydatów z indeksu kwantyzowanego
+    i wybór k najlepszych. Czytane są tylko wiersze kandydatów – przy macierzy
+    mapowanej z dysku (np.memmap, także float16) do pamięci trafia kilkadziesiąt wektorów.
+
+    Returns:
+        Tuple (podobieństwa [<=k], indeksy rekordów [<=k]) malejąco
+    """
+    ids = np.asarray(candidate_ids, dtype="int64")
+    return search_subset(embeddings, query, k, ids[ids >= 0])
+
+
+def read_index(path: str, mmap: bool = True):
+    """Wczytuje indeks z dysku, jeśli to możliwe – mapując go do pamięci (IO_FLAG_MMAP)."""
+    import faiss
+
+    if mmap:
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP)
+        except RuntimeError:
+            # Nie każdy typ indeksu obsługuje mmap – wtedy czytamy normalnie
+            pass
+    return faiss.read_index(path)
+
+
+def write_index(index, path: str):
+    """
+    Zapisuje indeks atomowo i usuwa nieaktualne indeksy tego samego wariantu – pliki
+    różniące się od `path` tylko hashem zawartości (zob. `index_cache_path`). Indeksy
+    innych modeli, poolingów i parametrów zostają.
+    """
+    import faiss
+
+    tmp_path = path + ".tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+    prefix = path.rsplit(".", 2)[0]
+    for stale in glob.glob(prefix + ".*.faiss"):
+        if stale != path and os.path.basename(stale).count(".") == os.path.basename(path).count("."):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def load_or_build_index(
+    embeddings_file: str,
+    embeddings: np.ndarray,
+    model_name: str,
+    pooling: str,
+    backend: str = "flat",
+    index_params: Optional[Dict[str, Any]] = None,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    use_cache: bool = True,
+    mmap: bool = True
+):
+    """
+    Zwraca indeks FAISS dla embeddingów – z cache na dysku lub budując go od nowa.
+
+    Args:
+        embeddings_file: Ścieżka do pliku z embeddingami (źródło klucza cache)
+        embeddings: Macierz embeddingów [n, dim] (używana tylko przy budowie)
+        model_name: Nazwa modelu embeddingów (część klucza)
+        pooling: Strategia poolingu (część klucza)
+        backend: Typ indeksu ("flat", "hnsw", "ivfpq", "sq8")
+        index_params: Parametry budowy indeksu (część klucza)
+        ef_search: efSearch dla HNSW (parametr zapytania, poza kluczem)
+        nprobe: nprobe dla IVF (parametr zapytania, poza kluczem)
+        use_cache: Czy czytać/zapisywać indeks na dysku
+        mmap: Czy mapować wczytany indeks do pamięci
+
+    Returns:
+        Indeks FAISS
+    """
+    n_samples, embedding_dim = embeddings.shape
+    cache_path: Optional[str] = None
+
+    if use_cache:
+        try:
+            cache_path = index_cache_path(embeddings_file, model_name, pooling, backend, index_params)
+        except OSError as e:
+            print(f"UWAGA: Nie można wyznaczyć klucza cache indeksu ({e}).")
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            index = read_index(cache_path, mmap=mmap)
+            if index.ntotal == n_samples and index.d == embedding_dim:
+                print(f"INFO: Wczytano indeks FAISS ({backend}) z cache: {cache_path}")
+                return set_search_params(index, ef_search, nprobe)
+            print("UWAGA: Indeks w cache nie pasuje do embeddingów. Buduję od nowa.")
+        except RuntimeError as e:
+            print(f"UWAGA: Nie udało się wczytać indeksu z cache ({e}). Buduję od nowa.")
+
+    index = build_index(embeddings, backend=backend, index_params=index_params)
+    set_search_params(index, ef_search, nprobe)
+
+    if cache_path:
+        try:
+            write_index(index, cache_path)
+            print(f"INFO: Zapisano indeks FAISS do cache: {cache_path}")
+        except (OSError, RuntimeError) as e:
+            print(f"UWAGA: Nie udało się zapisać indeksu do cache ({e}).")
+
+    return index
@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import numpy as np
 from math import log1p
 from scipy.special import expit
@@ -56,12 +57,14 @@ def evaluate_ranking(ranked_list, ground_truth, k=5):
     
     return is_hit, mrr, precision
 
-def run_full_pipeline_evaluation():
-    load_dotenv()
-    
-    print("Inicjalizacja systemu RAG...")
-    rag, _, _ = create_rag_system(embeddings_file="output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl")
-    
+def evaluate_pipeline(rag):
+    """
+    Ewaluuje trzy etapy pipeline'u (bi-encoder, reranker, wynik końcowy) na GROUND_TRUTH.
+
+    Returns:
+        Słownik etap -> listy metryk (hits, mrr, precision) oraz "timings" z czasami
+        (ms) enkodowania zapytania i rerankingu dla każdego zapytania.
+    """
     queries = list(GROUND_TRUTH.keys())
     
     # Słowniki do przechowywania list wyników dla każdej metryki na każdym etapie
@@ -70,6 +73,7 @@ def run_full_pipeline_evaluation():
         "stage2_reranker": {"hits": [], "mrr": [], "precision": []},
         "stage3_final_score": {"hits": [], "mrr": [], "precision": []},
     }
+    timings = {"encode_ms": [], "rerank_ms": []}
 
     print(f"\nRozpoczynam ewaluację pełnego pipeline'u dla {len(queries)} zapytań...")
 
@@ -77,7 +81,9 @@ def run_full_pipeline_evaluation():
         print(f"[{i}/{len(queries)}] Przetwarzanie: '{query[:50]}...'")
         
         # --- Krok 1: Pobranie kandydatów (Bi-Encoder) ---
+        start = time.perf_counter()
         docs_with_scores = rag.vectorstore.similarity_search_with_score(query, k=50)
+        timings["encode_ms"].append((time.perf_counter() - start) * 1000)
         
         unique_results = {}
         for doc, score in docs_with_scores:
@@ -97,7 +103,9 @@ def run_full_pipeline_evaluation():
 
         # --- Krok 2: Reranking (Cross-Encoder) ---
         rerank_pairs = [[query, c.get("context", "")] for c in candidates]
+        start = time.perf_counter()
         rerank_scores = rag.reranker.predict(rerank_pairs)
+        timings["rerank_ms"].append((time.perf_counter() - start) * 1000)
         normalized_scores = expit(rerank_scores)
         
         for idx, c in enumerate(candidates):
@@ -135,6 +143,26 @@ def run_full_pipeline_evaluation():
         metrics["stage3_final_score"]["mrr"].append(mrr)
         metrics["stage3_final_score"]["precision"].append(prec)
 
+    metrics["timings"] = timings
+    return metrics
+
+
+def summarize_metrics(metrics):
+    """Średnie metryki dla każdego etapu: etap -> (Hit Rate@5 [%], MRR, Precision@5 [%])."""
+    return {
+        stage: (np.mean(data["hits"]) * 100, np.mean(data["mrr"]), np.mean(data["precision"]) * 100)
+        for stage, data in metrics.items() if stage != "timings"
+    }
+
+
+def run_full_pipeline_evaluation():
+    load_dotenv()
+    
+    print("Inicjalizacja systemu RAG...")
+    rag, _, _ = create_rag_system(embeddings_file="output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl")
+
+    metrics = evaluate_pipeline(rag)
+
     # --- Podsumowanie wyników ---
     print("\n" + "="*80)
     print("WYNIKI EWALUACJI PEŁNEGO PIPELINE'U")
@@ -142,11 +170,8 @@ def run_full_pipeline_evaluation():
     print(f"{'Etap':<25} | {'Hit Rate@5':<12} | {'MRR':<8} | {'Precision@5':<12}")
     print("-" * 65)
 
-    for stage, data in metrics.items():
+    for stage, (hr, mrr, prec) in summarize_metrics(metrics).items():
         stage_name = stage.replace('_', ' ').title()
-        hr = np.mean(data["hits"]) * 100
-        mrr = np.mean(data["mrr"])
-        prec = np.mean(data["precision"]) * 100
         print(f"{stage_name:<25} | {hr:<11.2f}% | {mrr:<8.4f} | {prec:<11.2f}%")
 
     print("="*80)
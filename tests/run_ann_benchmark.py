@@ -0,0 +1,144 @@
+import argparse
+import csv
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import ModelMeanPooling
+from src.embedding_store import load_embeddings
+from src.vector_index import build_index, rescore_candidates, set_search_params
+from evaluate_full_pipeline import GROUND_TRUTH
+
+QUERY_PREFIX = "zapytanie: "
+
+# Siatka parametrów zapytania dla backendów przybliżonych
+SWEEP = [
+    ("flat", {}),
+    ("hnsw", {"ef_search": 16}),
+    ("hnsw", {"ef_search": 32}),
+    ("hnsw", {"ef_search": 64}),
+    ("hnsw", {"ef_search": 128}),
+    ("ivfpq", {"nprobe": 1}),
+    ("ivfpq", {"nprobe": 2}),
+    ("ivfpq", {"nprobe": 4}),
+    ("ivfpq", {"nprobe": 8}),
+    ("sq8", {"rescore_factor": 1}),
+    ("sq8", {"rescore_factor": 4}),
+]
+
+
+class RescoredIndex:
+    """Pierwsze przejście w indeksie + dokładne przeliczenie rescore_factor x k kandydatów (jak w search_ids)."""
+
+    def __init__(self, index, embeddings: np.ndarray, rescore_factor: int):
+        self.index = index
+        self.embeddings = embeddings
+        self.rescore_factor = rescore_factor
+
+    def search(self, query: np.ndarray, k: int):
+        _, idx = self.index.search(query, k * self.rescore_factor)
+        scores, ids = rescore_candidates(self.embeddings, query, k, idx[0])
+        return scores.reshape(1, -1), ids.reshape(1, -1)
+
+
+def index_size_mb(index) -> float:
+    import faiss
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def measure(index, queries: np.ndarray, k: int, repeats: int):
+    """Zwraca (id wyników [n_queries, k], latencje pojedynczych zapytań w ms)."""
+    latencies = []
+    ids = None
+    for _ in range(repeats):
+        batch_ids = []
+        for q in queries:
+            start = time.perf_counter()
+            _, idx = index.search(q.reshape(1, -1), k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            batch_ids.append(idx[0])
+        ids = np.vstack(batch_ids)
+    return ids, np.array(latencies)
+
+
+def recall_at_k(approx_ids: np.ndarray, exact_ids: np.ndarray) -> float:
+    """Średni odsetek wyników dokładnych (flat) odnalezionych przez indeks przybliżony."""
+    hits = [len(set(a[a >= 0]) & set(e[e >= 0])) / max(1, len(e[e >= 0])) for a, e in zip(approx_ids, exact_ids)]
+    return float(np.mean(hits))
+
+
+def run_benchmark():
+    """
+    Porównuje backendy indeksu (flat / HNSW / IVF-PQ / SQ8) na zapytaniach ze złotego standardu:
+    recall@k względem indeksu dokładnego, rozmiar indeksu oraz latencje p50/p99 pojedynczego wyszukiwania.
+    """
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Benchmark backendów indeksu wektorowego.")
+    parser.add_argument("--embedding-file", type=str, default="output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl")
+    parser.add_argument("--model", type=str, default="sdadas/mmlw-retrieval-roberta-large")
+    parser.add_argument("--pooling", choices=["cls", "mean"], default="cls")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=20, help="Liczba powtórzeń zestawu zapytań (dla stabilnych percentyli).")
+    args = parser.parse_args()
+
+    _, embeddings = load_embeddings(args.embedding_file)
+    n_samples, embedding_dim = embeddings.shape
+    print(f"Korpus: {n_samples} wektorów ({embedding_dim}d)")
+
+    model = ModelMeanPooling(args.model, word_embedding_dimension=embedding_dim, pooling_strategy=args.pooling)
+    queries = [QUERY_PREFIX + q for q in GROUND_TRUTH.keys()]
+    query_vectors = np.asarray(model.encode(queries, normalize=True), dtype="float32")
+
+    indexes = {}
+    exact_ids = None
+    rows = []
+
+    for backend, search_params in SWEEP:
+        if backend not in indexes:
+            start = time.perf_counter()
+            indexes[backend] = build_index(embeddings, backend=backend)
+            print(f"Zbudowano indeks '{backend}' w {time.perf_counter() - start:.2f}s")
+        params = dict(search_params)
+        rescore_factor = params.pop("rescore_factor", 1)
+        index = set_search_params(indexes[backend], **params)
+        if rescore_factor > 1:
+            index = RescoredIndex(index, embeddings, rescore_factor)
+
+        ids, latencies = measure(index, query_vectors, args.k, args.repeats)
+        if backend == "flat":
+            exact_ids = ids
+
+        rows.append({
+            "Backend": backend,
+            "Params": ", ".join(f"{k}={v}" for k, v in search_params.items()) or "-",
+            f"Recall@{args.k}": f"{recall_at_k(ids, exact_ids):.4f}",
+            "Index [MB]": f"{index_size_mb(indexes[backend]):.1f}",
+            "p50 [ms]": f"{np.percentile(latencies, 50):.3f}",
+            "p99 [ms]": f"{np.percentile(latencies, 99):.3f}",
+        })
+
+    header = (f"{'Backend':<8} | {'Params':<17} | {f'Recall@{args.k}':<10} | {'Index [MB]':<10} | "
+              f"{'p50 [ms]':<9} | {'p99 [ms]':<9}")
+    sep = "-" * len(header)
+    print(f"\n{sep}\n{header}\n{sep}")
+    for r in rows:
+        print(f"{r['Backend']:<8} | {r['Params']:<17} | {r[f'Recall@{args.k}']:<10} | {r['Index [MB]']:<10} | "
+              f"{r['p50 [ms]']:<9} | {r['p99 [ms]']:<9}")
+    print(sep)
+
+    csv_filename = "ann_benchmark_results.csv"
+    with open(csv_filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Zapisano wyniki do pliku CSV: {csv_filename}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
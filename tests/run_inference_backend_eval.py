@@ -0,0 +1,78 @@
+import argparse
+import gc
+import os
+import sys
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import create_rag_system
+from src.caching import QueryEmbeddingCache
+from src.inference_backends import INFERENCE_BACKENDS, DEFAULT_ONNX_QUANTIZATION
+from evaluate_full_pipeline import evaluate_pipeline, summarize_metrics
+
+EMBEDDINGS_FILE = "output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl"
+
+
+def run_backend_evaluation():
+    """
+    Porównuje backendy inferencji (PyTorch fp32, int8, ONNX int8) na tym samym zestawie
+    zapytań co `evaluate_full_pipeline.py`: Hit@5 / MRR każdego etapu, dryf względem
+    fp32 oraz średnie czasy enkodowania zapytania i rerankingu.
+    """
+    parser = argparse.ArgumentParser(description="Ewaluacja jakości i szybkości backendów inferencji.")
+    parser.add_argument("--backends", nargs="+", default=list(INFERENCE_BACKENDS), choices=INFERENCE_BACKENDS)
+    parser.add_argument("--quantization", default=DEFAULT_ONNX_QUANTIZATION, help="Zestaw instrukcji dla ONNX int8")
+    parser.add_argument("--embeddings-file", default=EMBEDDINGS_FILE)
+    args = parser.parse_args()
+
+    load_dotenv()
+    results = {}
+    for backend in args.backends:
+        print(f"\n===== Backend: {backend} =====")
+        rag, _, _ = create_rag_system(
+            embeddings_file=args.embeddings_file,
+            inference_backend=backend,
+            onnx_quantization=args.quantization,
+            # Osobny cache – czasy enkodowania nie mogą pochodzić z poprzedniego backendu
+            query_cache=QueryEmbeddingCache()
+        )
+        # Rozgrzewka (pierwsze wywołania alokują bufory / kompilują sesję ONNX)
+        rag.vectorstore.similarity_search_with_score("rozgrzewka", k=5)
+        rag.reranker.predict([["rozgrzewka", "rozgrzewka"]])
+
+        metrics = evaluate_pipeline(rag)
+        results[backend] = (summarize_metrics(metrics), metrics["timings"])
+        del rag
+        gc.collect()
+
+    baseline = results.get("torch")
+    print("\n" + "=" * 100)
+    print("BACKENDY INFERENCJI: JAKOŚĆ (Hit@5 / MRR) I CZAS")
+    print("=" * 100)
+    print(f"{'Backend':<11} | {'Etap':<20} | {'Hit@5':<8} | {'MRR':<7} | {'ΔHit@5':<8} | {'ΔMRR':<8} | "
+          f"{'Enkoder [ms]':<12} | {'Reranker [ms]'}")
+    print("-" * 100)
+    for backend, (summary, timings) in results.items():
+        encode_ms = np.mean(timings["encode_ms"])
+        rerank_ms = np.mean(timings["rerank_ms"])
+        for stage, (hr, mrr, _) in summary.items():
+            if baseline:
+                base_hr, base_mrr, _ = baseline[0][stage]
+                d_hr, d_mrr = f"{hr - base_hr:+.2f}", f"{mrr - base_mrr:+.4f}"
+            else:
+                d_hr = d_mrr = "-"
+            stage_name = stage.replace("_", " ")
+            print(f"{backend:<11} | {stage_name:<20} | {hr:<7.2f}% | {mrr:<7.4f} | {d_hr:<8} | {d_mrr:<8} | "
+                  f"{encode_ms:<12.1f} | {rerank_ms:.1f}")
+        if baseline and backend != "torch":
+            speed_enc = np.mean(baseline[1]["encode_ms"]) / encode_ms
+            speed_rr = np.mean(baseline[1]["rerank_ms"]) / rerank_ms
+            print(f"{'':<11} | przyspieszenie względem fp32: enkoder {speed_enc:.2f}x, reranker {speed_rr:.2f}x")
+        print("-" * 100)
+
+
+if __name__ == "__main__":
+    run_backend_evaluation()
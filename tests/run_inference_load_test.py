@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.inference_scheduler import InferenceScheduler
+
+CONCURRENCY_LEVELS = [1, 4, 8, 16]
+PAIRS_PER_REQUEST = 20
+
+QUERIES = [
+    "zapytanie: gdzie zjem dobrą pizzę neapolitańską",
+    "zapytanie: kawiarnia z ciastem i dobrą kawą",
+    "zapytanie: tania kuchnia azjatycka, ramen lub pho",
+    "zapytanie: restauracja z kuchnią polską na rodzinny obiad",
+    "zapytanie: wegańskie burgery",
+    "zapytanie: sushi na wynos wieczorem",
+]
+CONTEXT = ("Miejsce o nazwie Przykład to miejsce typu: Restauracja, Kuchnia włoska, Pizzeria. "
+           "W ofercie znajduje się: Piwo, Wino, Dania wegetariańskie. Atmosfera jest opisywana jako: Kameralne.")
+
+
+class SyntheticModels:
+    """
+    Modele zastępcze o koszcie zbliżonym do transformera: stały narzut przebiegu
+    + koszt zależny od liczby elementów (mnożenia macierzy zwalniają GIL, jak PyTorch).
+    """
+
+    def __init__(self, dim: int = 1024, overhead: int = 384, per_item: int = 96):
+        rng = np.random.default_rng(0)
+        self.dim = dim
+        self.weight = rng.standard_normal((dim, dim)).astype("float32") / np.sqrt(dim)
+        self.overhead = overhead
+        self.per_item = per_item
+
+    def _forward(self, n: int) -> np.ndarray:
+        x = np.ones((self.overhead + n * self.per_item, self.dim), dtype="float32")
+        for _ in range(2):
+            x = np.tanh(x @ self.weight)
+        return x[:n]
+
+    def encode(self, texts):
+        out = self._forward(len(texts))
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+    def predict(self, pairs):
+        return self._forward(len(pairs)).mean(axis=1)
+
+
+def load_real_models(model_name: str, pooling: str):
+    from sentence_transformers import CrossEncoder
+    from src.embedding_model import ModelMeanPooling
+
+    model_wrapper = ModelMeanPooling(model_name, pooling_strategy=pooling)
+    reranker = CrossEncoder('sdadas/polish-reranker-roberta-v2', trust_remote_code=True)
+    return (lambda texts: model_wrapper.encode(texts, normalize=True)), reranker.predict
+
+
+def run_load(encode_fn, rerank_fn, concurrency: int, requests_per_worker: int):
+    """
+    `concurrency` wątków wysyła po `requests_per_worker` żądań (enkodowanie zapytania
+    + ocena PAIRS_PER_REQUEST par). Zwraca (przepustowość req/s, latencje w ms).
+    """
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(worker_id: int):
+        local = []
+        for i in range(requests_per_worker):
+            query = QUERIES[(worker_id + i) % len(QUERIES)]
+            start = time.perf_counter()
+            encode_fn(query)
+            rerank_fn([[query, CONTEXT]] * PAIRS_PER_REQUEST)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.array(latencies)
+
+
+def run_load_test():
+    """
+    Raport przepustowości i latencji: bezpośrednie wywołania modeli (batch 1 / jedno
+    żądanie) vs InferenceScheduler (mikro-batching) przy rosnącej liczbie równoczesnych żądań.
+    """
+    parser = argparse.ArgumentParser(description="Test obciążeniowy mikro-batchingu enkodera i rerankera.")
+    parser.add_argument("--real", action="store_true", help="Użyj prawdziwych modeli (domyślnie modele syntetyczne)")
+    parser.add_argument("--model", default="sdadas/mmlw-retrieval-roberta-large")
+    parser.add_argument("--pooling", default="cls")
+    parser.add_argument("--requests", type=int, default=10, help="Liczba żądań na wątek")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if args.real:
+        print("Ładowanie modeli...")
+        encode_batch, rerank_batch = load_real_models(args.model, args.pooling)
+    else:
+        print("INFO: Modele syntetyczne (użyj --real, aby mierzyć prawdziwe transformery).")
+        models = SyntheticModels()
+        encode_batch, rerank_batch = models.encode, models.predict
+
+    direct_encode = lambda text: encode_batch([text])[0]
+    scheduler = InferenceScheduler(encode_batch, rerank_batch, args.max_batch_size, args.max_wait_ms)
+
+    # Rozgrzewka
+    run_load(direct_encode, rerank_batch, 1, 2)
+
+    print(f"\n{'Wątki':<6} | {'Tryb':<13} | {'req/s':<8} | {'p50 [ms]':<9} | {'p95 [ms]':<9} | {'Śr. paczka (enc/rerank)'}")
+    print("-" * 80)
+    for concurrency in CONCURRENCY_LEVELS:
+        for mode in ("bezpośrednio", "mikro-batch"):
+            if mode == "bezpośrednio":
+                throughput, lat = run_load(direct_encode, rerank_batch, concurrency, args.requests)
+                batch_info = "1 / 1 żądanie"
+            else:
+                before = scheduler.stats()
+                throughput, lat = run_load(scheduler.encode, scheduler.rerank, concurrency, args.requests)
+                after = scheduler.stats()
+                sizes = []
+                for name in ("encode", "rerank"):
+                    batches = after[name]["batches"] - before[name]["batches"]
+                    items = after[name]["items"] - before[name]["items"]
+                    sizes.append(items / batches if batches else 0.0)
+                batch_info = f"{sizes[0]:.1f} / {sizes[1]:.0f} par"
+            print(f"{concurrency:<6} | {mode:<13} | {throughput:<8.1f} | {np.percentile(lat, 50):<9.1f} | "
+                  f"{np.percentile(lat, 95):<9.1f} | {batch_info}")
+
+    scheduler.close()
+
+
+if __name__ == "__main__":
+    run_load_test()
@@ -0,0 +1,122 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import ConversationalRAG, PLLuMLLM
+from src.cuisine_index import terms_from_text
+from src.embedding_store import load_embeddings
+from src.gazetteer import LodzGazetteer
+from src.intent_parser import DEFAULT_MIN_CONFIDENCE, IntentParser
+from evaluate_full_pipeline import GROUND_TRUTH
+from run_location_tests import LOCATION_QUERIES
+from test_location_layer import TEST_QUERIES
+
+EMBEDDINGS_FILE = "output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl"
+
+# Prośby o rekomendację bez kuchni/lokalizacji – nie mogą zostać uznane za luźną rozmowę
+RECOMMENDATION_REQUESTS = [
+    "co polecisz na obiad?",
+    "co polecasz na kolację?",
+    "hej, co polecisz?",
+    "co jest dobre?",
+    "gdzie można dobrze zjeść?",
+    "cześć, szukam czegoś na lunch",
+]
+
+# Wiadomości, których reguły nie mogą zaakceptować (słowo ceny jako podciąg, sama cena bez prośby)
+LLM_ONLY_MESSAGES = [
+    "kasztanie sushi",
+    "drogowe jedzenie",
+    "jest drogo?",
+    "tanio tu",
+]
+
+
+def _same_location(rule_location, llm_location, gazetteer):
+    if not rule_location or not llm_location:
+        return not rule_location and not llm_location
+    entry = gazetteer.match(llm_location)
+    return entry is not None and entry.name == rule_location
+
+
+def _same_cuisine(rule_cuisine, llm_cuisine):
+    if not rule_cuisine or not llm_cuisine:
+        return not rule_cuisine and not llm_cuisine
+    return bool(terms_from_text(rule_cuisine) & terms_from_text(llm_cuisine))
+
+
+def run_intent_parser_evaluation():
+    """
+    Mierzy, jaka część zapytań testowych jest obsługiwana przez regułową analizę intencji
+    (bez LLM), ile trwa parsowanie oraz – z `--compare-llm` – zgodność pól z odpowiedzią LLM
+    dla zapytań zaakceptowanych przez reguły.
+    """
+    parser = argparse.ArgumentParser(description="Ewaluacja regułowej analizy intencji.")
+    parser.add_argument("--embeddings-file", default=EMBEDDINGS_FILE)
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE)
+    parser.add_argument("--compare-llm", action="store_true", help="Porównaj pola z analizą LLM (wymaga HF_TOKEN)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    records, _ = load_embeddings(args.embeddings_file)
+    gazetteer = LodzGazetteer()
+    intent_parser = IntentParser.from_records(records, gazetteer=gazetteer, min_confidence=args.min_confidence)
+    queries = list(dict.fromkeys(
+        TEST_QUERIES + LOCATION_QUERIES + list(GROUND_TRUTH.keys()) + RECOMMENDATION_REQUESTS
+    ))
+
+    rag = None
+    if args.compare_llm:
+        rag = ConversationalRAG(llm_client=PLLuMLLM(), search_function=lambda *a, **kw: [])
+
+    accepted = 0
+    parse_ms = []
+    agreement = {"location": [], "cuisine": [], "price": []}
+    print(f"\n{'Pewność':<8} | {'Reguły':<7} | {'Lokalizacja':<22} | {'Kuchnia':<15} | {'Cena':<8} | Zapytanie")
+    print("-" * 110)
+    for query in queries:
+        start = time.perf_counter()
+        result = intent_parser.parse(query)
+        parse_ms.append((time.perf_counter() - start) * 1000)
+        ok = intent_parser.accepts(result)
+        accepted += ok
+        print(f"{result['confidence']:<8.2f} | {'tak' if ok else 'nie':<7} | {str(result['location']):<22} | "
+              f"{str(result['cuisine']):<15} | {str(result['price']):<8} | {query[:50]}")
+
+        if rag is not None and ok:
+            rag.clear_history()
+            llm = rag.analyze_user_intent(query)
+            agreement["location"].append(_same_location(result["location"], llm.get("location"), gazetteer))
+            agreement["cuisine"].append(_same_cuisine(result["cuisine"], llm.get("cuisine")))
+            agreement["price"].append(result["price"] == llm.get("price"))
+
+    print("-" * 110)
+    misclassified = [
+        q for q in RECOMMENDATION_REQUESTS
+        if intent_parser.accepts(r := intent_parser.parse(q)) and r["intent"] == "chitchat"
+    ]
+    if misclassified:
+        print(f"BŁĄD: Prośby o rekomendację uznane za luźną rozmowę: {misclassified}")
+    else:
+        print(f"Prośby o rekomendację ({len(RECOMMENDATION_REQUESTS)}): żadna nie została uznana za luźną rozmowę.")
+    wrongly_accepted = [q for q in LLM_ONLY_MESSAGES if intent_parser.accepts(intent_parser.parse(q))]
+    if wrongly_accepted:
+        print(f"BŁĄD: Wiadomości zaakceptowane przez reguły zamiast LLM: {wrongly_accepted}")
+    else:
+        print(f"Wiadomości tylko dla LLM ({len(LLM_ONLY_MESSAGES)}): żadna nie została zaakceptowana przez reguły.")
+    print(f"Obsłużone bez LLM: {accepted}/{len(queries)} ({accepted / len(queries):.1%}) "
+          f"przy progu pewności {args.min_confidence}")
+    print(f"Czas parsowania: średnio {np.mean(parse_ms):.3f} ms, p95 {np.percentile(parse_ms, 95):.3f} ms")
+    if rag is not None and agreement["location"]:
+        for field, values in agreement.items():
+            print(f"Zgodność z LLM ({field}): {np.mean(values):.1%} z {len(values)} zapytań")
+
+
+if __name__ == "__main__":
+    run_intent_parser_evaluation()
@@ -5,75 +5,87 @@ from dotenv import load_dotenv
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src import create_rag_system, LocationService
+from src import create_rag_system, get_location_service
+
+# Lista zapytań testowych (skupiona wyłącznie na lokalizacjach)
+LOCATION_QUERIES = [
+    # --- Centrum / Śródmieście ---
+    "Najlepsza kawiarnia w centrum z miejscem do pracy.",
+    "Smash burger w centrum",
+    "Jedzenie na dowóz centrum",
+    
+    # --- Piotrkowska / Off ---
+    "Tanie jedzenie dla studenta, najlepiej blisko Piotrkowskiej",
+    "Restauracja na Off Piotrkowska",
+    "Kawa na Pietrynie",
+    
+    # --- Manufaktura / Centra Handlowe ---
+    "Gdzie zjeść w Manufakturze?",
+    "Coś dobrego koło Manu",
+    "Restauracja blisko Galerii Łódzkiej",
+    "Obiad w Porcie Łódź",
+
+    # --- Dworce ---
+    "Restauracja blisko dworca Łódź Fabryczna",
+    "Gdzie zjem blisko dworca Kaliskiego?",
+    "Coś do jedzenia przy Fabrycznym",
+
+    # --- Dzielnice / Osiedla ---
+    "Klimatyczne miejsce na Teofilowie",
+    "Jedzenie na Widzewie",
+    "Pizza na Retkini",
+    "Szukam lokalu na Bałutach",
+    "Coś na Górnej",
+
+    # --- Punkty Orientacyjne / Uczelnie ---
+    "Obiad przy Polibudzie",
+    "Lunch w okolicach Placu Wolności",
+    "Restauracja w Monopolis",
+    "Coś na Księżym Młynie",
+    "Blisko Lumumby",
+    
+
+]
+
 
 def run_location_tests():
     """
     Testuje skuteczność wykrywania lokalizacji w zapytaniach.
-    Symuluje logikę z run_pipeline.py (LLM -> Geocode oraz Fallback spaCy).
+    Symuluje logikę z run_pipeline.py (Gazetteer -> LLM -> Geocode).
     """
     load_dotenv()
     
     print("Inicjalizacja usług...")
-    # Inicjalizujemy LocationService
-    location_service = LocationService()
+    # Inicjalizujemy LocationService (współdzielony z rag_chain)
+    location_service = get_location_service()
     
     # Inicjalizujemy RAG tylko dla funkcji normalize_location (LLM)
     # Plik embeddingów nie ma znaczenia dla tego testu, ale musi istnieć, by funkcja zadziałała
     rag_chain, _, _ = create_rag_system(
-        embeddings_file="output_files/lodz_restaurants_cafes_embeddings_cls.jsonl"
+        embeddings_file="output_files/lodz_restaurants_cafes_embeddings_cls.jsonl",
+        location_service=location_service
     )
     
-    # Lista zapytań testowych (skupiona wyłącznie na lokalizacjach)
-    queries = [
-        # --- Centrum / Śródmieście ---
-        "Najlepsza kawiarnia w centrum z miejscem do pracy.",
-        "Smash burger w centrum",
-        "Jedzenie na dowóz centrum",
-        
-        # --- Piotrkowska / Off ---
-        "Tanie jedzenie dla studenta, najlepiej blisko Piotrkowskiej",
-        "Restauracja na Off Piotrkowska",
-        "Kawa na Pietrynie",
-        
-        # --- Manufaktura / Centra Handlowe ---
-        "Gdzie zjeść w Manufakturze?",
-        "Coś dobrego koło Manu",
-        "Restauracja blisko Galerii Łódzkiej",
-        "Obiad w Porcie Łódź",
-
-        # --- Dworce ---
-        "Restauracja blisko dworca Łódź Fabryczna",
-        "Gdzie zjem blisko dworca Kaliskiego?",
-        "Coś do jedzenia przy Fabrycznym",
-
-        # --- Dzielnice / Osiedla ---
-        "Klimatyczne miejsce na Teofilowie",
-        "Jedzenie na Widzewie",
-        "Pizza na Retkini",
-        "Szukam lokalu na Bałutach",
-        "Coś na Górnej",
-
-        # --- Punkty Orientacyjne / Uczelnie ---
-        "Obiad przy Polibudzie",
-        "Lunch w okolicach Placu Wolności",
-        "Restauracja w Monopolis",
-        "Coś na Księżym Młynie",
-        "Blisko Lumumby",
-        
-
-    ]
+    queries = LOCATION_QUERIES
     
     print(f"\n=== TESTOWANIE DETEKCJI LOKALIZACJI ({len(queries)} zapytań) ===\n")
     
     found_count = 0
+    gazetteer_count = 0
     
     for i, query in enumerate(queries, 1):
+        # 0. Offline gazetteer (jak w run_pipeline.py – przed LLM i Nominatim)
+        coords = location_service.lookup_gazetteer(query)
+        if coords:
+            found_count += 1
+            gazetteer_count += 1
+            print(f"[{i}] '{query}'\n    ✅ ZNALEZIONO (gazetteer): {coords}")
+            continue
+
         # 1. LLM Normalizacja
         llm_loc = rag_chain.normalize_location(query)
         
         # 2. Próba geokodowania wyniku LLM
-        coords = None
         if llm_loc:
             coords = location_service.geocode(llm_loc)
         
@@ -81,7 +93,8 @@ def run_location_tests():
             found_count += 1
             print(f"[{i}] '{query}'\n    ✅ ZNALEZIONO: '{llm_loc}' -> {coords}")
             
-    print(f"\nPodsumowanie: Wykryto lokalizację w {found_count}/{len(queries)} zapytań.")
+    print(f"\nPodsumowanie: Wykryto lokalizację w {found_count}/{len(queries)} zapytań "
+          f"(w tym {gazetteer_count} z gazetteera, bez LLM i Nominatim).")
 
 if __name__ == "__main__":
     run_location_tests()
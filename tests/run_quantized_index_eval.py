@@ -0,0 +1,92 @@
+import argparse
+import gc
+import os
+import sys
+import tempfile
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import create_rag_system
+from src.caching import QueryEmbeddingCache
+from src.embedding_store import compiled_paths, load_embeddings, save_compiled
+from evaluate_full_pipeline import evaluate_pipeline, summarize_metrics
+
+EMBEDDINGS_FILE = "output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl"
+
+# (nazwa, typ macierzy na dysku, backend indeksu, rescore_factor)
+CONFIGURATIONS = [
+    ("float32 + flat", "float32", "flat", 1),
+    ("float16 + flat", "float16", "flat", 1),
+    ("float16 + sq8", "float16", "sq8", 1),
+    ("float16 + sq8 + rescore", "float16", "sq8", 4),
+]
+
+
+def index_size_mb(index) -> float:
+    import faiss
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def run_quantized_index_evaluation():
+    """
+    Porównuje przechowywanie korpusu w float32 / float16 oraz indeks SQ8 (int8) z dokładnym
+    przeliczeniem kandydatów: Hit@5 / MRR każdego etapu na złotym standardzie
+    `evaluate_full_pipeline.py` oraz rozmiar macierzy i indeksu.
+    """
+    parser = argparse.ArgumentParser(description="Ewaluacja kwantyzacji embeddingów korpusu (float16 / SQ8).")
+    parser.add_argument("--embeddings-file", default=EMBEDDINGS_FILE)
+    args = parser.parse_args()
+
+    load_dotenv()
+    records, embeddings = load_embeddings(args.embeddings_file)
+    raw_records = [rec.to_dict() for rec in records]
+    # Zapytania są te same we wszystkich konfiguracjach – enkodujemy je raz
+    query_cache = QueryEmbeddingCache()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Każdy typ danych dostaje własną kopię formatu skompilowanego (bez pliku JSONL)
+        stores = {}
+        for dtype in sorted({dtype for _, dtype, _, _ in CONFIGURATIONS}):
+            path = os.path.join(tmp_dir, dtype, os.path.basename(args.embeddings_file))
+            os.makedirs(os.path.dirname(path))
+            save_compiled(path, raw_records, embeddings, dtype=dtype)
+            stores[dtype] = path
+        del records, raw_records, embeddings
+
+        for name, dtype, backend, rescore_factor in CONFIGURATIONS:
+            print(f"\n===== {name} =====")
+            rag, _, _ = create_rag_system(
+                embeddings_file=stores[dtype],
+                index_backend=backend,
+                rescore_factor=rescore_factor,
+                use_index_cache=False,
+                query_cache=query_cache
+            )
+            metrics = evaluate_pipeline(rag)
+            sizes = (os.path.getsize(compiled_paths(stores[dtype])[0]) / (1024 * 1024), index_size_mb(rag.vector_index))
+            results[name] = (summarize_metrics(metrics), sizes)
+            del rag
+            gc.collect()
+
+    baseline = results[CONFIGURATIONS[0][0]][0]
+    print("\n" + "=" * 104)
+    print("KWANTYZACJA KORPUSU: JAKOŚĆ (Hit@5 / MRR) I ROZMIAR")
+    print("=" * 104)
+    print(f"{'Konfiguracja':<24} | {'Etap':<20} | {'Hit@5':<8} | {'MRR':<7} | {'ΔHit@5':<8} | {'ΔMRR':<8} | "
+          f"{'Macierz [MB]':<12} | {'Indeks [MB]'}")
+    print("-" * 104)
+    for name, (summary, (matrix_mb, index_mb)) in results.items():
+        for stage, (hr, mrr, _) in summary.items():
+            base_hr, base_mrr, _ = baseline[stage]
+            stage_name = stage.replace("_", " ")
+            print(f"{name:<24} | {stage_name:<20} | {hr:<7.2f}% | {mrr:<7.4f} | {hr - base_hr:<+8.2f} | "
+                  f"{mrr - base_mrr:<+8.4f} | {matrix_mb:<12.1f} | {index_mb:.1f}")
+        print("-" * 104)
+
+
+if __name__ == "__main__":
+    run_quantized_index_evaluation()
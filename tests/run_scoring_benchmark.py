@@ -0,0 +1,113 @@
+import argparse
+import copy
+import os
+import sys
+import time
+from math import log1p
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.conversational_rag import distance_km
+from src.ranking import rank_results, SCORE_WEIGHTS
+
+# Środek Łodzi – kandydaci losowani są w promieniu kilku km
+LODZ_CENTER = (51.7592, 19.4560)
+SIZES = [100, 1000, 10000]
+
+
+def make_candidates(n: int, seed: int = 42):
+    """Losowi kandydaci w formacie słowników zwracanych przez krok 2 funkcji `search`."""
+    rng = np.random.default_rng(seed)
+    candidates = []
+    for i in range(n):
+        has_rating = rng.random() > 0.1
+        has_coords = rng.random() > 0.05
+        candidates.append({
+            "name": f"Lokal {i}",
+            # Zaokrąglenie wymusza remisy – sprawdzamy też stabilność kolejności
+            "semantic_score": round(float(rng.uniform(0.15, 1.0)), 2),
+            "google_rating": round(float(rng.uniform(3.0, 5.0)), 1) if has_rating else None,
+            "google_reviews_total": int(rng.integers(0, 5000)) if has_rating else None,
+            "coords": f"{LODZ_CENTER[0] + rng.normal(0, 0.03):.6f}, {LODZ_CENTER[1] + rng.normal(0, 0.05):.6f}" if has_coords else None,
+            "distance_km": float('inf'),
+            "final_score": 0.0,
+        })
+    return candidates
+
+
+def legacy_rank(processed_results, k, user_location=None):
+    """Poprzednia, skalarna implementacja kroków 3-5 z `search` (punkt odniesienia)."""
+    max_dist = 0.0
+    max_reviews_log = 1.0
+    for result in processed_results:
+        if user_location and result.get("coords"):
+            try:
+                lat, lon = map(float, result["coords"].split(","))
+                dist = distance_km(user_location[0], user_location[1], lat, lon)
+                result["distance_km"] = dist
+                if dist != float('inf'): max_dist = max(max_dist, dist)
+            except (ValueError, TypeError):
+                pass
+        reviews = result.get("google_reviews_total") or 0
+        max_reviews_log = max(max_reviews_log, log1p(reviews))
+
+    weights = SCORE_WEIGHTS
+    for result in processed_results:
+        rating = result.get("google_rating")
+        score_rating = (rating - 1) / 4.0 if rating is not None else 0.5
+        reviews = result.get("google_reviews_total") or 0
+        score_popularity = log1p(reviews) / max_reviews_log if max_reviews_log > 0 else 0
+        score_proximity = 0.0
+        if user_location and max_dist > 0 and result["distance_km"] != float('inf'):
+            score_proximity = 1.0 - (result["distance_km"] / max_dist)
+        score_semantic = result.get("semantic_score", 0.0)
+        result["final_score"] = (weights["semantic"] * score_semantic +
+                                 weights["rating"] * score_rating +
+                                 weights["popularity"] * score_popularity +
+                                 weights["proximity"] * score_proximity)
+
+    processed_results.sort(key=lambda x: x["final_score"], reverse=True)
+    return processed_results[:k]
+
+
+def time_ms(fn, candidates, repeats: int) -> float:
+    """Mediana czasu (ms) – każdy przebieg dostaje świeżą kopię kandydatów."""
+    times = []
+    for _ in range(repeats):
+        data = copy.deepcopy(candidates)
+        start = time.perf_counter()
+        fn(data)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def run_benchmark():
+    """
+    Porównuje skalarny ranking (pętla po słownikach) z wektorowym `rank_results`
+    dla 100, 1k i 10k kandydatów: zgodność kolejności i czas.
+    """
+    parser = argparse.ArgumentParser(description="Mikrobenchmark etapu rankingu w search().")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'Kandydaci':<10} | {'Lokalizacja':<11} | {'Pętla [ms]':<10} | {'NumPy [ms]':<10} | {'Przyspieszenie':<14} | {'Zgodność'}")
+    print("-" * 80)
+    for n in SIZES:
+        candidates = make_candidates(n)
+        for user_location in (None, LODZ_CENTER):
+            legacy = legacy_rank(copy.deepcopy(candidates), n, user_location)
+            vectorized = rank_results(copy.deepcopy(candidates), n, user_location)
+            same_order = [r["name"] for r in legacy] == [r["name"] for r in vectorized]
+            same_scores = np.allclose([r["final_score"] for r in legacy], [r["final_score"] for r in vectorized])
+
+            t_legacy = time_ms(lambda d: legacy_rank(d, args.k, user_location), candidates, args.repeats)
+            t_vector = time_ms(lambda d: rank_results(d, args.k, user_location), candidates, args.repeats)
+            print(f"{n:<10} | {'tak' if user_location else 'nie':<11} | {t_legacy:<10.3f} | {t_vector:<10.3f} | "
+                  f"{t_legacy / t_vector:<13.1f}x | {'OK' if same_order and same_scores else 'RÓŻNICA'}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import create_rag_system
+from src.caching import DEFAULT_RESULT_CACHE_THRESHOLD, SemanticResultCache
+from src.chat_pipeline import ChatPipeline
+
+EMBEDDINGS_FILE = "output_files/lodz_restaurants_cafes_embeddings_cls_words.jsonl"
+
+# Grupy parafraz: pierwsza wiadomość wypełnia cache, kolejne powinny w nie trafić
+PARAPHRASE_GROUPS = [
+    ["dobra pizza w centrum", "gdzie na pizzę w centrum?", "pizza w centrum"],
+    ["sushi", "dobre sushi", "gdzie zjeść sushi?"],
+    ["tanie burgery", "tani burger", "gdzie na taniego burgera?"],
+    ["kuchnia wietnamska", "wietnamskie jedzenie"],
+    ["kawiarnia z ciastem", "kawa i ciasto", "dobra kawiarnia z ciastami"],
+    ["romantyczna kolacja", "restauracja na randkę", "miejsce na romantyczny wieczór"],
+]
+
+# Pary o różnej intencji – trafienie w cache byłoby błędem
+DIFFERENT_PAIRS = [
+    ("dobra pizza w centrum", "dobre sushi w centrum"),
+    ("romantyczna kolacja", "szybki lunch"),
+    ("tanie sushi", "drogie sushi"),
+    ("kawiarnia z ciastem", "bar z piwem"),
+]
+
+
+def run_semantic_cache_benchmark():
+    """
+    Mierzy trafienia semantycznego cache `ChatPipeline` (klucz: embedding wiadomości użytkownika
+    i filtry znane przed LLM) dla grup parafraz oraz fałszywe trafienia dla wiadomości o innej
+    intencji, przy kilku progach podobieństwa.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark semantycznego cache wyników czatu.")
+    parser.add_argument("--embeddings-file", default=EMBEDDINGS_FILE)
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.85, 0.88, DEFAULT_RESULT_CACHE_THRESHOLD, 0.93])
+    args = parser.parse_args()
+
+    load_dotenv()
+    cache = SemanticResultCache()
+    rag, _, _ = create_rag_system(embeddings_file=args.embeddings_file, result_cache=cache)
+    pipeline = ChatPipeline(rag)
+
+    messages = {q for group in PARAPHRASE_GROUPS for q in group} | {q for pair in DIFFERENT_PAIRS for q in pair}
+    start = time.perf_counter()
+    vectors = {q: rag.vectorstore.encode_query(q) for q in messages}
+    keys = {q: pipeline.result_cache_key(q) for q in messages}
+    print(f"INFO: Klucze i embeddingi {len(messages)} wiadomości w {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    print("\n" + "=" * 90)
+    print("PODOBIEŃSTWO WIADOMOŚCI (cosinus embeddingów, te same filtry?)")
+    print("=" * 90)
+    for group in PARAPHRASE_GROUPS:
+        first = group[0]
+        for query in group[1:]:
+            same_key = keys[first] == keys[query]
+            print(f"{float(np.dot(vectors[first].ravel(), vectors[query].ravel())):.4f} | "
+                  f"{'tak' if same_key else 'nie':<3} | {first} ~ {query}")
+    print("-" * 90)
+    for a, b in DIFFERENT_PAIRS:
+        same_key = keys[a] == keys[b]
+        print(f"{float(np.dot(vectors[a].ravel(), vectors[b].ravel())):.4f} | "
+              f"{'tak' if same_key else 'nie':<3} | {a} ≠ {b}")
+
+    print("\n" + "=" * 90)
+    print("TRAFIENIA I FAŁSZYWE TRAFIENIA WG PROGU")
+    print("=" * 90)
+    n_paraphrases = sum(len(group) - 1 for group in PARAPHRASE_GROUPS)
+    print(f"{'Próg':<6} | {'Trafienia parafraz':<19} | {'Fałszywe trafienia':<18}")
+    print("-" * 90)
+    for threshold in args.thresholds:
+        cache.similarity_threshold = threshold
+        cache.clear()
+        for group in PARAPHRASE_GROUPS:
+            cache.put(vectors[group[0]], keys[group[0]], [{"name": group[0]}])
+        hits = sum(
+            cache.lookup(vectors[q], keys[q]) is not None for group in PARAPHRASE_GROUPS for q in group[1:]
+        )
+        cache.clear()
+        false_hits = 0
+        for a, b in DIFFERENT_PAIRS:
+            cache.put(vectors[a], keys[a], [{"name": a}])
+            false_hits += cache.lookup(vectors[b], keys[b]) is not None
+        print(f"{threshold:<6.2f} | {hits:>3}/{n_paraphrases:<15} | {false_hits:>3}/{len(DIFFERENT_PAIRS)}")
+    print("-" * 90)
+    print(f"Statystyki cache: {cache.stats()}")
+    pipeline.close()
+
+
+if __name__ == "__main__":
+    run_semantic_cache_benchmark()
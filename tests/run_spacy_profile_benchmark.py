@@ -0,0 +1,140 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.location_service import LocationService
+from run_location_tests import LOCATION_QUERIES
+
+# Oczekiwana lokalizacja dla każdego zapytania (None = brak konkretnego miejsca, np. "centrum")
+EXPECTED = {
+    "Najlepsza kawiarnia w centrum z miejscem do pracy.": None,
+    "Smash burger w centrum": None,
+    "Jedzenie na dowóz centrum": None,
+    "Tanie jedzenie dla studenta, najlepiej blisko Piotrkowskiej": "Piotrkowska",
+    "Restauracja na Off Piotrkowska": "Off Piotrkowska",
+    "Kawa na Pietrynie": "Pietryna",
+    "Gdzie zjeść w Manufakturze?": "Manufaktura",
+    "Coś dobrego koło Manu": "Manu",
+    "Restauracja blisko Galerii Łódzkiej": "Galeria Łódzka",
+    "Obiad w Porcie Łódź": "Port Łódź",
+    "Restauracja blisko dworca Łódź Fabryczna": "Łódź Fabryczna",
+    "Gdzie zjem blisko dworca Kaliskiego?": "Kaliski",
+    "Coś do jedzenia przy Fabrycznym": "Fabryczny",
+    "Klimatyczne miejsce na Teofilowie": "Teofilów",
+    "Jedzenie na Widzewie": "Widzew",
+    "Pizza na Retkini": "Retkinia",
+    "Szukam lokalu na Bałutach": "Bałuty",
+    "Coś na Górnej": "Górna",
+    "Obiad przy Polibudzie": "Polibuda",
+    "Lunch w okolicach Placu Wolności": "Plac Wolności",
+    "Restauracja w Monopolis": "Monopolis",
+    "Coś na Księżym Młynie": "Księży Młyn",
+    "Blisko Lumumby": "Lumumba",
+}
+
+# Konfiguracje do porównania: (etykieta, profil, wykluczone komponenty)
+CONFIGS = [
+    ("lg (pełny)", "lg", ()),
+    ("lg (okrojony)", "lg", ("parser",)),
+    ("md (okrojony)", "md", ("parser",)),
+    ("sm (okrojony)", "sm", ("parser",)),
+]
+
+
+def is_correct(predicted, expected) -> bool:
+    """
+    Luźne porównanie: polskie formy fleksyjne różnią się końcówkami, więc wystarczy,
+    że rdzeń (5 pierwszych liter) któregoś znaczącego słowa oczekiwanej nazwy występuje w predykcji.
+    """
+    if expected is None or predicted is None:
+        return expected is None and predicted is None
+    pred = predicted.lower()
+    return any(tok.lower()[:5] in pred for tok in expected.split() if len(tok) > 3)
+
+
+def benchmark_config(label: str, profile: str, exclude, queries, repeats: int):
+    """Mierzy czas ładowania, latencję pojedynczego wywołania, przepustowość wsadową i trafność."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = LocationService(profile=profile, exclude=exclude)
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    predictions = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            predictions = []
+            for q in queries:
+                t0 = time.perf_counter()
+                predictions.append(service.extract_location_name(q))
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            service.extract_location_names_batch(queries)
+        batch_s = time.perf_counter() - t0
+
+    correct = sum(is_correct(p, EXPECTED.get(q)) for q, p in zip(queries, predictions))
+    latencies = np.array(latencies)
+    return {
+        "Konfiguracja": label,
+        "Komponenty": ", ".join(service.nlp.pipe_names),
+        "Ładowanie [s]": load_s,
+        "Trafność": correct / len(queries),
+        "Śr. [ms]": latencies.mean(),
+        "p50 [ms]": np.percentile(latencies, 50),
+        "p99 [ms]": np.percentile(latencies, 99),
+        "Wsad [zap/s]": len(queries) * repeats / batch_s if batch_s > 0 else float("inf"),
+        "predictions": predictions,
+    }
+
+
+def run_benchmark():
+    """
+    Porównuje profile spaCy (lg/md/sm, pełny vs okrojony pipeline) na zapytaniach
+    z run_location_tests.py: trafność ekstrakcji lokalizacji vs latencja wywołania.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark profili spaCy dla ekstrakcji lokalizacji.")
+    parser.add_argument("--repeats", type=int, default=10, help="Liczba powtórzeń zestawu zapytań.")
+    parser.add_argument("--verbose", action="store_true", help="Pokaż predykcje dla każdego zapytania.")
+    args = parser.parse_args()
+
+    rows = []
+    for label, profile, exclude in CONFIGS:
+        print(f"Testuję: {label}...")
+        try:
+            rows.append(benchmark_config(label, profile, exclude, LOCATION_QUERIES, args.repeats))
+        except OSError:
+            print(f"  Pominięto – model dla profilu '{profile}' nie jest zainstalowany.")
+
+    if not rows:
+        print("Brak zainstalowanych modeli spaCy.")
+        return
+
+    header = f"{'Konfiguracja':<14} | {'Trafność':<8} | {'Ładowanie':<9} | {'Śr. [ms]':<8} | {'p50 [ms]':<8} | {'p99 [ms]':<8} | {'Wsad [zap/s]':<12}"
+    sep = "-" * len(header)
+    print(f"\n{sep}\n{header}\n{sep}")
+    for r in rows:
+        print(f"{r['Konfiguracja']:<14} | {r['Trafność']:<8.1%} | {r['Ładowanie [s]']:<8.2f}s | {r['Śr. [ms]']:<8.2f} | "
+              f"{r['p50 [ms]']:<8.2f} | {r['p99 [ms]']:<8.2f} | {r['Wsad [zap/s]']:<12.1f}")
+    print(sep)
+    for r in rows:
+        print(f"{r['Konfiguracja']}: {r['Komponenty']}")
+
+    if args.verbose:
+        for r in rows:
+            print(f"\n--- {r['Konfiguracja']} ---")
+            for q, p in zip(LOCATION_QUERIES, r["predictions"]):
+                mark = "OK " if is_correct(p, EXPECTED.get(q)) else "ERR"
+                print(f"[{mark}] {q:<60} -> {p} (oczekiwano: {EXPECTED.get(q)})")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,128 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ranking import haversine_km
+from src.spatial_index import SpatialIndex
+from src.vector_index import search_subset, search_with_selector
+
+LODZ_CENTER = (51.7592, 19.4560)
+# Zakres współrzędnych miasta (lat_min, lat_max, lon_min, lon_max)
+LODZ_BBOX = (51.68, 51.86, 19.32, 19.64)
+
+# Punkty zapytań: gęsto zabudowane centrum vs. obrzeża
+SCENARIOS = [
+    ("gęsto", "Manufaktura", (51.7797, 19.4474)),
+    ("gęsto", "Piotrkowska", (51.7592, 19.4560)),
+    ("rzadko", "Nowosolna", (51.8000, 19.5800)),
+    ("rzadko", "Ruda Pabianicka", (51.7100, 19.4200)),
+]
+
+
+def make_corpus(n: int, dim: int, seed: int = 42):
+    """
+    Losowy korpus: 70% lokali skupionych wokół centrum (jak w danych), reszta
+    równomiernie w granicach miasta. Embeddingi – losowe wektory znormalizowane.
+    """
+    rng = np.random.default_rng(seed)
+    n_center = int(n * 0.7)
+    lats = np.concatenate([
+        rng.normal(LODZ_CENTER[0], 0.012, n_center),
+        rng.uniform(LODZ_BBOX[0], LODZ_BBOX[1], n - n_center),
+    ])
+    lons = np.concatenate([
+        rng.normal(LODZ_CENTER[1], 0.02, n_center),
+        rng.uniform(LODZ_BBOX[2], LODZ_BBOX[3], n - n_center),
+    ])
+    # Część lokali bez współrzędnych
+    missing = rng.random(n) < 0.02
+    lats[missing] = np.nan
+    lons[missing] = np.nan
+    vectors = rng.standard_normal((n, dim)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return lats, lons, vectors
+
+
+def time_ms(fn, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def full_scan_then_filter(vectors, query, pool_k, lats, lons, point, radius_km):
+    """Dotychczasowa ścieżka: pula `pool_k` z całego miasta, odległość sprawdzana dopiero potem."""
+    sims = vectors @ query
+    top = np.argpartition(-sims, pool_k - 1)[:pool_k]
+    top = top[np.argsort(-sims[top], kind="stable")]
+    return top[haversine_km(point[0], point[1], lats[top], lons[top]) <= radius_km]
+
+
+def run_benchmark():
+    """
+    Porównuje wyszukiwanie z ograniczeniem promienia:
+    - pula k*10 kandydatów z całego miasta + filtr odległości na końcu (stara ścieżka),
+    - indeks przestrzenny -> wyszukiwanie tylko wśród lokali w promieniu (nowa ścieżka),
+    w gęsto i rzadko zabudowanych okolicach.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark wyszukiwania w promieniu (indeks przestrzenny).")
+    parser.add_argument("-n", type=int, default=20000, help="Liczba lokali w syntetycznym korpusie")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--radius", type=float, default=1.0, help="Promień w km")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    lats, lons, vectors = make_corpus(args.n, args.dim)
+    from scipy.spatial import cKDTree  # noqa: F401 – import poza pomiarem czasu budowy
+    start = time.perf_counter()
+    spatial = SpatialIndex(lats, lons)
+    print(f"Indeks przestrzenny: {len(spatial.record_ids)} punktów, budowa {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    try:
+        import faiss
+        faiss_index = faiss.IndexFlatIP(args.dim)
+        faiss_index.add(vectors)
+    except ImportError:
+        faiss_index = None
+        print("UWAGA: Brak faiss – pomijam wariant z selektorem ID.")
+
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal(args.dim).astype("float32")
+    query /= np.linalg.norm(query)
+    pool_k = args.k * 10
+
+    print(f"\n{'Okolica':<8} | {'Punkt':<16} | {'W promieniu':<11} | {'Drzewo [ms]':<11} | "
+          f"{'Cała pula [ms]':<14} | {'Trafień w puli':<14} | {'Podzbiór [ms]':<13} | {'Selektor [ms]'}")
+    print("-" * 120)
+    for density, name, point in SCENARIOS:
+        allowed = spatial.query_radius(point[0], point[1], args.radius)
+        # Kontrola poprawności względem pełnego skanu haversine
+        expected = np.flatnonzero(haversine_km(point[0], point[1], lats, lons) <= args.radius)
+        assert np.array_equal(allowed, expected), "Indeks przestrzenny niezgodny z haversine"
+
+        t_tree = time_ms(lambda: spatial.query_radius(point[0], point[1], args.radius), args.repeats)
+        t_full = time_ms(lambda: full_scan_then_filter(vectors, query, pool_k, lats, lons, point, args.radius), args.repeats)
+        in_pool = len(full_scan_then_filter(vectors, query, pool_k, lats, lons, point, args.radius))
+        t_subset = time_ms(lambda: search_subset(vectors, query, pool_k, allowed), args.repeats)
+        if faiss_index is not None and len(allowed):
+            q = query.reshape(1, -1)
+            t_selector = f"{time_ms(lambda: search_with_selector(faiss_index, q, pool_k, allowed), args.repeats):.3f}"
+        else:
+            t_selector = "-"
+        print(f"{density:<8} | {name:<16} | {len(allowed):<11} | {t_tree:<11.3f} | {t_full:<14.3f} | "
+              f"{in_pool:<3} / {pool_k:<8} | {t_subset + t_tree:<13.3f} | {t_selector}")
+
+    print("\n'Trafień w puli' – ile z kandydatów starej ścieżki leży w promieniu (reszta idzie do rerankera na darmo).")
+    print("'Podzbiór' obejmuje zapytanie do drzewa; każdy zwrócony wynik leży w promieniu.")
+
+
+if __name__ == "__main__":
+    run_benchmark()
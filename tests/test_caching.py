@@ -0,0 +1,170 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import caching
+from src.caching import LRUCache, QueryEmbeddingCache, RerankerScoreCache, SemanticResultCache, location_cell
+
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" staje się najświeższy
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_evicts_by_bytes():
+    cache = LRUCache(max_entries=100, max_bytes=10, size_fn=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+
+    assert "a" not in cache
+    assert len(cache) == 2 and cache.current_bytes == 8
+
+
+def test_lru_put_existing_key_replaces_size():
+    cache = LRUCache(max_entries=10, max_bytes=10, size_fn=len)
+    cache.put("a", "xxxxxx")
+    cache.put("a", "xx")
+    cache.put("b", "xxxxxx")
+
+    assert "a" in cache and "b" in cache
+    assert cache.current_bytes == 8
+
+
+def test_lru_counts_hits_and_misses():
+    cache = LRUCache()
+    cache.put("a", 1)
+    cache.get("a")
+    assert cache.get("b", "brak") == "brak"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_query_embedding_cache_encodes_once():
+    cache = QueryEmbeddingCache()
+    calls = []
+
+    def encode(text):
+        calls.append(text)
+        return np.ones(4)
+
+    first = cache.get_or_encode("model", "cls", "pizza  w centrum", encode)
+    second = cache.get_or_encode("model", "cls", "pizza w centrum", encode)
+
+    assert calls == ["pizza  w centrum"]
+    assert second.dtype == np.float32 and np.array_equal(first, second)
+    assert cache.get("model", "mean", "pizza w centrum") is None
+
+
+def test_query_embedding_cache_reads_from_disk(tmp_path):
+    path = str(tmp_path / "queries.sqlite")
+    writer = QueryEmbeddingCache(disk_path=path)
+    writer.put("model", "cls", "sushi", np.arange(4))
+    writer.close()
+
+    reader = QueryEmbeddingCache(disk_path=path)
+    vector = reader.get("model", "cls", "sushi")
+    reader.close()
+
+    assert np.array_equal(vector, np.arange(4, dtype="float32"))
+    assert reader.stats()["disk_hits"] == 1
+
+
+def test_reranker_cache_scores_only_missing_pairs():
+    cache = RerankerScoreCache()
+    batches = []
+
+    def predict(pairs):
+        batches.append(pairs)
+        return [len(context) / 10 for _, context in pairs]
+
+    first = cache.score("pizza", [(1, "abc"), (2, "abcd")], predict)
+    second = cache.score("pizza", [(2, "abcd"), (3, "ab")], predict)
+
+    assert batches == [[["pizza", "abc"], ["pizza", "abcd"]], [["pizza", "ab"]]]
+    assert np.allclose(first, [0.3, 0.4]) and np.allclose(second, [0.4, 0.2])
+    assert cache.stats()["pairs_scored"] == 3
+
+
+def test_reranker_cache_key_includes_context():
+    cache = RerankerScoreCache()
+    cache.score("pizza", [(1, "stary opis")], lambda pairs: [0.1])
+    scores = cache.score("pizza", [(1, "nowy opis")], lambda pairs: [0.9])
+
+    assert np.allclose(scores, [0.9])
+
+
+def _unit(*values):
+    vector = np.array(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def test_result_cache_hits_similar_message_with_same_filters():
+    cache = SemanticResultCache(similarity_threshold=0.9)
+    cache.put(_unit(1, 0.1), ("pizza", None), [{"name": "Napoli"}], relaxed=["price"], context={"search_query": "pizzeria"})
+
+    results, relaxed, context = cache.lookup(_unit(1, 0.2), ("pizza", None))
+    assert results == [{"name": "Napoli"}] and relaxed == ["price"] and context == {"search_query": "pizzeria"}
+    assert cache.lookup(_unit(1, 0.2), ("pizza", "0-40")) is None
+    assert cache.lookup(_unit(0.2, 1), ("pizza", None)) is None
+
+
+def test_result_cache_returns_copies():
+    cache = SemanticResultCache()
+    cache.put(_unit(1, 0), "k", [{"name": "Napoli"}])
+    cache.lookup(_unit(1, 0), "k")[0][0]["name"] = "zmienione"
+
+    assert cache.lookup(_unit(1, 0), "k")[0] == [{"name": "Napoli"}]
+
+
+def test_result_cache_expires_entries_after_ttl(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(caching.time, "monotonic", lambda: clock[0])
+    cache = SemanticResultCache(ttl_seconds=60)
+    cache.put(_unit(1, 0), "k", [{"name": "Napoli"}])
+
+    clock[0] += 59
+    assert cache.lookup(_unit(1, 0), "k") is not None
+    clock[0] += 2
+    assert cache.lookup(_unit(1, 0), "k") is None
+    assert len(cache) == 0 and cache.stats()["expirations"] == 1
+
+
+def test_result_cache_evicts_least_recently_used_entry():
+    cache = SemanticResultCache(max_entries=2)
+    cache.put(_unit(1, 0, 0), "k", [{"name": "a"}])
+    cache.put(_unit(0, 1, 0), "k", [{"name": "b"}])
+    cache.lookup(_unit(1, 0, 0), "k")
+    cache.put(_unit(0, 0, 1), "k", [{"name": "c"}])
+
+    assert cache.lookup(_unit(0, 1, 0), "k") is None
+    assert cache.lookup(_unit(1, 0, 0), "k") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_result_cache_cleared_when_index_version_changes():
+    cache = SemanticResultCache()
+    cache.set_index_version("v1")
+    cache.put(_unit(1, 0), "k", [{"name": "a"}])
+    cache.set_index_version("v1")
+    assert len(cache) == 1
+
+    cache.set_index_version("v2")
+    assert len(cache) == 0 and cache.stats()["invalidations"] == 1
+
+
+def test_location_cell_groups_nearby_points():
+    assert location_cell((51.76001, 19.45601)) == location_cell((51.76010, 19.45610))
+    assert location_cell((51.7601, 19.4561)) != location_cell((51.7701, 19.4561))
+    assert location_cell(None) is None
@@ -0,0 +1,58 @@
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cuisine_index import CuisineIndex, stem, terms_from_text
+
+
+def _record(oms_id, name, types=(), context=""):
+    return SimpleNamespace(oms_id=oms_id, name=name, types=tuple(types), context=context)
+
+
+RECORDS = [
+    _record(1, "Sushi Bar Kioto", ["Restauracja japońska"]),
+    _record(2, "Pizzeria Napoli", ["Pizza na wynos"]),
+    _record(3, "Bistro", ["Restauracja"], "Serwujemy ramen i pierogi"),
+    _record(4, "Hot Pot House", ["Restauracja chińska"]),
+    _record(5, "Pot Kawiarnia", ["Kawiarnia"]),
+]
+
+
+def _index(tmp_path):
+    csv_path = tmp_path / "osm.csv"
+    csv_path.write_text("osm_id,cuisine\n2,italian;pizza\n5,coffee_shop\n", encoding="utf-8")
+    return CuisineIndex(RECORDS, osm_csv_path=str(csv_path))
+
+
+def test_stem_collapses_inflections():
+    assert stem("azjatycka") == stem("azjatyckie") == stem("azjatyckiej")
+    assert terms_from_text("Kuchnia wietnamska na wynos") == {stem("wietnamska")}
+
+
+def test_synonyms_expand_query(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.ids_for("kuchnia azjatycka").tolist() == [0, 2, 3]
+    assert index.ids_for("włoska").tolist() == [1]
+
+
+def test_multi_word_synonym_requires_all_words(tmp_path):
+    index = _index(tmp_path)
+
+    # "chińska" -> "hot pot": "Pot Kawiarnia" ma tylko jedno z dwóch słów
+    assert index.ids_for("chińska").tolist() == [3]
+
+
+def test_osm_tags_are_translated(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.ids_for("kawa").tolist() == [4]
+    assert index.ids_for("italian").tolist() == [1]
+
+
+def test_unknown_term_gives_empty_mask(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.mask_for("gruzińska").tolist() == [False] * len(RECORDS)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gazetteer import LodzGazetteer, normalize_text
+
+STREETS_CSV = """osm_id,lat,lon,addr:street
+1,51.760,19.457,Piotrkowska
+2,51.770,19.461,Piotrkowska
+3,51.750,19.440,Wólczańska
+4,51.740,19.420,Józefa Kasprzaka
+5,51.741,19.421,Józefa Kasprzaka 47/75
+6,51.700,19.400,Przyjazna
+"""
+
+
+@pytest.fixture(scope="module")
+def landmarks():
+    return LodzGazetteer(csv_path=None)
+
+
+@pytest.fixture(scope="module")
+def with_streets(tmp_path_factory):
+    path = tmp_path_factory.mktemp("gazetteer") / "streets.csv"
+    path.write_text(STREETS_CSV, encoding="utf-8")
+    return LodzGazetteer(csv_path=str(path))
+
+
+def test_normalize_text_drops_diacritics_and_punctuation():
+    assert normalize_text("Łódź, Żubardź!") == "lodz zubardz"
+
+
+@pytest.mark.parametrize("query, name, span", [
+    ("Pizza na pietrynie", "Ulica Piotrkowska", (2, 3)),
+    ("kawa w Manufakturze", "Manufaktura", (2, 3)),
+    ("sushi na Bałutach", "Bałuty", (2, 3)),
+    ("obiad w centrum", "Śródmieście", (2, 3)),
+    ("coś koło galerii łódzkiej", "Galeria Łódzka", (2, 4)),
+])
+def test_landmarks_match_inflected_and_colloquial_names(landmarks, query, name, span):
+    entry, start, end = landmarks.match_span(query)
+
+    assert entry.name == name and (start, end) == span
+
+
+def test_no_location_in_text(landmarks):
+    assert landmarks.match("dobra pizza") is None
+    assert landmarks.lookup("dobra pizza") is None
+
+
+def test_street_centroid_and_inflection(with_streets):
+    entry = with_streets.match("bar na Wólczańskiej")
+
+    assert (entry.name, entry.kind) == ("Wólczańska", "street")
+    # Numer w nazwie ulicy to błąd danych – rekord trafia do tej samej ulicy
+    assert with_streets.lookup("pizza przy Kasprzaka") == pytest.approx((51.7405, 19.4205))
+
+
+def test_landmark_wins_tie_with_street(with_streets):
+    assert with_streets.match("Piotrkowska 100").kind == "landmark"
+
+
+def test_street_stopwords_are_skipped(with_streets):
+    assert with_streets.match("przyjazna atmosfera") is None
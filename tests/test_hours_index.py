@@ -0,0 +1,73 @@
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.hours_index import MINUTES_PER_DAY, OpenHoursIndex, minute_of_week, schedule_to_week_mask
+from src.record_store import DAYS_PL, OpeningHours
+
+# 1 stycznia 2024 to poniedziałek
+MONDAY = datetime(2024, 1, 1)
+
+
+def _at(day: int, hour: int, minute: int = 0) -> datetime:
+    return MONDAY.replace(day=1 + day, hour=hour, minute=minute)
+
+
+def _record(hours):
+    return SimpleNamespace(opening_hours=OpeningHours(hours) if hours else hours)
+
+
+def test_minute_of_week_starts_on_monday():
+    assert minute_of_week(MONDAY) == 0
+    assert minute_of_week(_at(6, 23, 59)) == 7 * MINUTES_PER_DAY - 1
+
+
+def test_interval_across_midnight_spills_into_next_day():
+    mask = schedule_to_week_mask([((22 * 60, 2 * 60),), False, False, False, False, False, False])
+
+    assert mask[minute_of_week(_at(0, 23))]
+    assert mask[minute_of_week(_at(1, 1, 59))]
+    assert not mask[minute_of_week(_at(1, 2))]
+    assert not mask[minute_of_week(_at(0, 21, 59))]
+
+
+def test_sunday_night_wraps_to_monday_morning():
+    index = OpenHoursIndex([_record({"niedziela": "20:00–03:00"})])
+
+    assert index.open_mask(_at(6, 23, 30)).tolist() == [True]
+    assert index.open_mask(MONDAY.replace(hour=2, minute=30)).tolist() == [True]
+    assert index.open_mask(MONDAY.replace(hour=3)).tolist() == [False]
+    # Okno 60 minut od niedzieli 23:30 przechodzi przez koniec tygodnia
+    assert index.open_mask(_at(6, 23, 30), duration_minutes=60).tolist() == [True]
+    assert index.open_mask(MONDAY.replace(hour=2, minute=30), duration_minutes=60).tolist() == [False]
+
+
+def test_open_mask_requires_whole_duration():
+    index = OpenHoursIndex([_record({day: "10:00–12:00" for day in DAYS_PL})])
+
+    assert index.open_mask(_at(2, 11), duration_minutes=60).tolist() == [True]
+    assert index.open_mask(_at(2, 11), duration_minutes=61).tolist() == [False]
+
+
+def test_unknown_hours_excluded_by_default():
+    index = OpenHoursIndex([
+        _record(None),
+        _record({day: "według uznania" for day in DAYS_PL}),
+        _record({day: "całą dobę" for day in DAYS_PL}),
+    ])
+    when = _at(3, 12)
+
+    assert index.open_mask(when).tolist() == [False, False, True]
+    assert index.open_mask(when, include_unknown=True).tolist() == [True, True, True]
+    assert index.known.tolist() == [False, False, True]
+
+
+def test_closed_day_and_all_day_entry():
+    index = OpenHoursIndex([_record({"poniedziałek": "zamknięte", "wtorek": "00:00–00:00"})])
+
+    assert index.open_mask(_at(0, 12)).tolist() == [False]
+    assert index.open_mask(_at(1, 0)).tolist() == [True]
+    assert index.is_open(0, _at(1, 23, 59))
@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.inference_scheduler import InferenceScheduler, MicroBatcher
+
+
+# Zadanie blokujące wypełnia całą paczkę (max_batch_size=10), więc nie dołączają do niego inne
+BLOCKING_JOB = ["blokada"] * 10
+
+
+class _GatedBatchFn:
+    """Pierwsza paczka czeka na `release`, żeby kolejne zadania zebrały się w kolejce."""
+
+    def __init__(self, fail_on=None):
+        self.release = threading.Event()
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, items):
+        if not self.batches:
+            self.batches.append(list(items))
+            self.release.wait(5)
+            return [item.upper() for item in items]
+        self.batches.append(list(items))
+        if self.fail_on in items:
+            raise ValueError(f"zły element: {self.fail_on}")
+        return [item.upper() for item in items]
+
+
+def test_queued_jobs_share_one_batch_and_get_their_own_results():
+    batch_fn = _GatedBatchFn()
+    batcher = MicroBatcher(batch_fn, max_batch_size=10, max_wait_ms=50)
+    first = batcher.submit(BLOCKING_JOB)
+    futures = [batcher.submit(["a", "b"]), batcher.submit(["c"])]
+    batch_fn.release.set()
+
+    assert first.result(5) == ["BLOKADA"] * 10
+    assert [f.result(5) for f in futures] == [["A", "B"], ["C"]]
+    assert batch_fn.batches[1] == ["a", "b", "c"]
+    batcher.close()
+    assert batcher.stats()["batches"] == 2
+
+
+def test_batch_error_propagates_to_every_job_in_the_batch():
+    batch_fn = _GatedBatchFn(fail_on="zły")
+    batcher = MicroBatcher(batch_fn, max_batch_size=10, max_wait_ms=50)
+    batcher.submit(BLOCKING_JOB)
+    healthy, broken = batcher.submit(["dobry"]), batcher.submit(["zły"])
+    batch_fn.release.set()
+
+    for future in (healthy, broken):
+        with pytest.raises(ValueError, match="zły element"):
+            future.result(5)
+    # Wątek działa dalej po błędzie paczki
+    assert batcher(["później"]) == ["PÓŹNIEJ"]
+    batcher.close()
+
+
+def test_empty_job_and_closed_batcher():
+    batcher = MicroBatcher(lambda items: items)
+    assert batcher.submit([]).result(1) == []
+    batcher.close()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit(["a"])
+
+
+def test_scheduler_splits_encoder_rows_and_rerank_scores():
+    scheduler = InferenceScheduler(
+        encode_fn=lambda texts: [[len(t), 1.0] for t in texts],
+        rerank_fn=lambda pairs: [[len(q) + len(c)] for q, c in pairs],
+    )
+    try:
+        vector = scheduler.encode("pizza")
+        scores = scheduler.rerank([["pizza", "abc"], ["pizza", "a"]])
+    finally:
+        scheduler.close()
+
+    assert vector.dtype == np.float32 and vector.tolist() == [5.0, 1.0]
+    assert scores.tolist() == [8.0, 6.0]
@@ -0,0 +1,81 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.cuisine_index import terms_from_text
+from src.gazetteer import LodzGazetteer
+from src.intent_parser import IntentParser, cuisine_vocabulary
+
+RECORDS = (
+    [SimpleNamespace(types=("Restauracja japońska", "Sushi"))] * 3
+    + [SimpleNamespace(types=("Pizza", "Jedzenie z dostawą do domu"))] * 3
+    + [SimpleNamespace(types=("Kuchnia baskijska",))]
+)
+
+
+@pytest.fixture(scope="module")
+def parser():
+    return IntentParser(cuisine_vocabulary(RECORDS), gazetteer=LodzGazetteer(csv_path=None))
+
+
+def test_vocabulary_uses_frequent_types_and_synonyms():
+    vocabulary = cuisine_vocabulary(RECORDS)
+
+    assert {"sush", "pizz", "japon", "azjaty"} <= vocabulary
+    # Typ z mniej niż MIN_TYPE_RECORDS lokali i rdzenie niebędące kuchnią nie trafiają do słownika
+    assert not terms_from_text("baskijska") & vocabulary
+    assert "dostaw" not in vocabulary
+
+
+def test_full_query_is_accepted(parser):
+    result = parser.parse("tanie sushi na Widzewie")
+
+    assert result == {
+        "intent": "recommendation", "location": "Widzew", "cuisine": "sushi", "price": "0-40", "confidence": 1.0
+    }
+    assert parser.accepts(result)
+
+
+@pytest.mark.parametrize("query, price", [
+    ("$$$ pizza", "80-1000"),
+    ("gdzie tanio zjeść?", "0-40"),
+    ("ekskluzywna pizza", "80-1000"),
+])
+def test_price_words_and_dollars(parser, query, price):
+    result = parser.parse(query)
+
+    assert result["price"] == price and parser.accepts(result)
+
+
+def test_price_word_inside_another_word_is_ignored(parser):
+    result = parser.parse("kasztanie sushi")
+
+    assert result["price"] is None and not parser.accepts(result)
+
+
+def test_price_only_remark_is_left_for_llm(parser):
+    for query in ("jest drogo?", "tanio tu"):
+        assert not parser.accepts(parser.parse(query))
+
+
+@pytest.mark.parametrize("query", ["cześć!", "dzięki", "dzień dobry"])
+def test_greetings_are_chitchat(parser, query):
+    result = parser.parse(query)
+
+    assert result["intent"] == "chitchat" and parser.accepts(result)
+
+
+@pytest.mark.parametrize("query", [
+    "co polecisz na obiad?",   # prośba bez treści
+    "nie chcę sushi",          # negacja
+    "pizza do 40 zł",          # kwota liczbowa
+    "hej, szukam czegoś",      # powitanie z prośbą to nie luźna rozmowa
+])
+def test_ambiguous_messages_go_to_llm(parser, query):
+    result = parser.parse(query)
+
+    assert not parser.accepts(result) and result["intent"] == "recommendation"
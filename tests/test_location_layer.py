@@ -7,7 +7,7 @@ from dotenv import load_dotenv
 # Dodajemy katalog główny projektu do ścieżki
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src import PLLuMLLM, ConversationalRAG, LocationService
+from src import PLLuMLLM, ConversationalRAG, get_location_service
 
 # --- LISTA 50 TESTOWYCH ZAPYTAŃ (ŁÓDŹ - SLANG I NAZWY POTOCZNE) ---
 TEST_QUERIES = [
@@ -77,9 +77,9 @@ def main():
     print("--- Inicjalizacja Systemu ---")
     try:
         llm = PLLuMLLM()
-        location_service = LocationService()
+        location_service = get_location_service()
         # Dummy search function, bo testujemy tylko normalizację
-        rag = ConversationalRAG(llm_client=llm, search_function=lambda x: [])
+        rag = ConversationalRAG(llm_client=llm, search_function=lambda x: [], location_service=location_service)
     except Exception as e:
         print(f"Błąd inicjalizacji: {e}")
         return
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ranking import haversine_km, parse_coords_column, rank_results, top_k_indices
+
+
+def _stable_top_k(scores, k):
+    return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
+
+
+def test_top_k_keeps_input_order_for_ties():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1, 0.5])
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_indices(scores, 4).tolist() == [1, 3, 0, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 0, 2, 5, 4]
+
+
+def test_top_k_matches_stable_sort():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        scores = rng.integers(0, 5, size=30).astype("float64")
+        for k in (1, 5, 29, 30):
+            assert top_k_indices(scores, k).tolist() == _stable_top_k(scores.tolist(), k)
+
+
+def test_top_k_empty_input():
+    assert top_k_indices(np.array([]), 5).size == 0
+    assert top_k_indices(np.array([1.0, 2.0]), 0).size == 0
+
+
+def test_haversine_missing_coords_are_infinite():
+    dist = haversine_km(51.7592, 19.4560, np.array([51.7592, np.nan]), np.array([19.4560, 19.0]))
+
+    assert dist[0] == 0.0 and np.isinf(dist[1])
+
+
+def test_parse_coords_column_skips_invalid_values():
+    lats, lons = parse_coords_column(["51.75, 19.45", None, "bez współrzędnych", "51.80,19.50"])
+
+    assert lats[[0, 3]].tolist() == [51.75, 51.80] and lons[[0, 3]].tolist() == [19.45, 19.50]
+    assert np.isnan(lats[1]) and np.isnan(lats[2])
+
+
+def test_rank_results_orders_by_final_score():
+    results = [
+        {"name": "słaby", "semantic_score": 0.2, "google_rating": 3.0, "google_reviews_total": 10},
+        {"name": "dobry", "semantic_score": 0.9, "google_rating": 4.8, "google_reviews_total": 500},
+        {"name": "bez oceny", "semantic_score": 0.9, "google_rating": None, "google_reviews_total": None},
+    ]
+
+    ranked = rank_results(results, k=2)
+
+    assert [r["name"] for r in ranked] == ["dobry", "bez oceny"]
+    assert ranked[0]["final_score"] > ranked[1]["final_score"]
+    assert np.isinf(ranked[0]["distance_km"])
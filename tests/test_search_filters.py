@@ -0,0 +1,63 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search_filters import combine_filters, price_mask
+
+
+def _mask(*values):
+    return np.array(values, dtype=bool)
+
+
+def test_no_constraints_gives_no_mask():
+    assert combine_filters(3) == (None, [])
+
+
+def test_hard_constraints_always_apply():
+    allowed, relaxed = combine_filters(3, hard=[("radius", _mask(1, 1, 0)), ("open_now", _mask(0, 1, 1))])
+
+    assert allowed.tolist() == [False, True, False] and relaxed == []
+
+
+def test_hard_constraints_can_leave_nothing():
+    allowed, relaxed = combine_filters(2, hard=[("radius", _mask(0, 0))], soft=[("price", _mask(1, 1))])
+
+    assert not allowed.any() and relaxed == ["price"]
+
+
+def test_soft_constraint_is_relaxed_when_it_would_empty_the_set():
+    allowed, relaxed = combine_filters(
+        4,
+        hard=[("radius", _mask(1, 1, 1, 0))],
+        soft=[("cuisine", _mask(0, 1, 1, 1)), ("price", _mask(1, 0, 0, 1))],
+    )
+
+    # Cena pasuje tylko do rekordów 0 i 3: 0 odpada przez kuchnię, 3 przez promień
+    assert allowed.tolist() == [False, True, True, False]
+    assert relaxed == ["price"]
+
+
+def test_soft_constraints_are_applied_in_order():
+    allowed, relaxed = combine_filters(
+        3, soft=[("cuisine", _mask(1, 0, 0)), ("price", _mask(0, 1, 1))]
+    )
+
+    # Kuchnia jest ważniejsza – cena zostaje pominięta, choć sama pasowałaby do dwóch lokali
+    assert allowed.tolist() == [True, False, False]
+    assert relaxed == ["price"]
+
+
+def test_price_mask_uses_range_overlap_and_text():
+    records = [SimpleNamespace(google_price_range=r) for r in ("20–40 zł", "100+ zł", None, "tanie")]
+    columns = {
+        "price_min": np.array([20.0, 100.0, np.nan, np.nan]),
+        "price_max": np.array([40.0, np.inf, np.nan, np.nan]),
+    }
+
+    assert price_mask(records, columns, "0-40").tolist() == [True, False, False, False]
+    assert price_mask(records, columns, "80-1000").tolist() == [False, True, False, False]
+    assert price_mask(records, columns, "tanie").tolist() == [True, False, False, True]
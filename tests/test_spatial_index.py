@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ranking import haversine_km
+from src.spatial_index import SpatialIndex
+
+# Manufaktura w Łodzi
+CENTER = (51.7800, 19.4480)
+
+
+def test_radius_mask_matches_brute_force_haversine():
+    rng = np.random.default_rng(0)
+    lats = CENTER[0] + rng.uniform(-0.1, 0.1, 500)
+    lons = CENTER[1] + rng.uniform(-0.15, 0.15, 500)
+    index = SpatialIndex(lats, lons)
+    distances = haversine_km(CENTER[0], CENTER[1], lats, lons)
+
+    for radius_km in (0.5, 1.0, 3.0, 8.0):
+        assert np.array_equal(index.radius_mask(CENTER[0], CENTER[1], radius_km), distances <= radius_km)
+
+
+def test_records_without_coords_are_never_in_radius():
+    index = SpatialIndex(np.array([CENTER[0], np.nan, CENTER[0]]), np.array([CENTER[1], CENTER[1], np.nan]))
+
+    assert index.radius_mask(CENTER[0], CENTER[1], 100.0).tolist() == [True, False, False]
+
+
+def test_point_on_the_boundary_is_included():
+    lats = np.array([CENTER[0], CENTER[0] + 0.01])
+    lons = np.array([CENTER[1], CENTER[1]])
+    boundary_km = float(haversine_km(CENTER[0], CENTER[1], lats[1:], lons[1:])[0])
+    index = SpatialIndex(lats, lons)
+
+    assert index.query_radius(CENTER[0], CENTER[1], boundary_km).tolist() == [0, 1]
+    assert index.query_radius(CENTER[0], CENTER[1], boundary_km * 0.999).tolist() == [0]
+
+
+def test_invalid_radius_and_empty_index():
+    index = SpatialIndex(np.array([CENTER[0]]), np.array([CENTER[1]]))
+
+    assert index.query_radius(CENTER[0], CENTER[1], -1.0).size == 0
+    assert index.query_radius(CENTER[0], CENTER[1], None).size == 0
+    assert SpatialIndex(np.array([np.nan]), np.array([np.nan])).radius_mask(*CENTER, 5.0).tolist() == [False]